@@ -1,4 +1,4 @@
 # -*- coding: utf-8 -*-
 # (c) Nelen & Schuurmans, see LICENSE.rst.
 
-# default_app_config = 'dd_node.apps.LizardConfig'
+default_app_config = 'dd_node.apps.DDNodeConfig'
@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+# (c) Nelen & Schuurmans, see LICENSE.rst.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from django.apps import AppConfig
+
+
+class DDNodeConfig(AppConfig):
+    name = 'dd_node'
+    verbose_name = "DD node"
+
+    def ready(self):
+        """Connect signal receivers once all models have been loaded."""
+        from dd_node import signals  # NOQA
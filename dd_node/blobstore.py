@@ -0,0 +1,357 @@
+# -*- coding: utf-8 -*-
+# (c) Nelen & Schuurmans, see LICENSE.rst.
+
+"""Content-addressed storage of the events of file timeseries.
+
+The files of IMAGE, MOVIE and FILE timeseries are stored once per content,
+as blobs named after their SHA-256 digest:
+
+    EVENT_FILE_DIR/blobs/ab/cd/abcd...
+
+The events of a timeseries refer to blobs, with a small JSON file per
+event, grouped per day:
+
+    EVENT_FILE_DIR/series/<uuid>/<day>/<timestamp>.json
+
+where <day> and <timestamp> are in ms since the epoch. Blobs and refs are
+written to a temporary file and renamed, so readers never see a partly
+written file. Uploads can be spooled to UPLOAD_DIR and hashed on the way,
+see `SpooledFile`, and are then renamed into the store without a copy if
+UPLOAD_DIR is on the same file system.
+
+Blobs are served without passing their content through Python: by the web
+server if EVENT_FILE_ACCEL_REDIRECT (nginx) or EVENT_FILE_SENDFILE (Apache,
+lighttpd) is configured, and streamed from disk otherwise, with support for
+single HTTP byte ranges.
+
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import errno
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.http import StreamingHttpResponse
+
+logger = logging.getLogger(__name__)
+
+BLOB_DIR = os.path.join(settings.EVENT_FILE_DIR, 'blobs')
+SERIES_DIR = os.path.join(settings.EVENT_FILE_DIR, 'series')
+UPLOAD_DIR = settings.UPLOAD_DIR
+
+# Internal location of BLOB_DIR in nginx, e.g. '/protected/blobs/'.
+ACCEL_REDIRECT = getattr(settings, 'EVENT_FILE_ACCEL_REDIRECT', None)
+SENDFILE = getattr(settings, 'EVENT_FILE_SENDFILE', False)
+
+CHUNK_SIZE = 64 * 1024  # in bytes
+FILE_MODE = 0o644  # temporary files are 0600, but web servers read blobs
+DAY = 86400000  # in ms
+
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def blob_path(digest):
+    """Return the path of the blob with a (hex) SHA-256 digest."""
+    return os.path.join(BLOB_DIR, digest[:2], digest[2:4], digest)
+
+
+def atomic_rename(tmp, path):
+    """Move a temporary file into place, making its directory if needed."""
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        try:
+            os.makedirs(directory)
+        except OSError:
+            if not os.path.isdir(directory):  # not made concurrently
+                raise
+    os.chmod(tmp, FILE_MODE)
+    os.rename(tmp, path)
+
+
+class SpooledFile(object):
+    """A stream spooled to a temporary file, hashed along the way.
+
+    The file is deleted when it is discarded or garbage collected, unless
+    it has been moved into the blob store by `put_blob`.
+
+    Args:
+      stream: file-like object or None for empty content
+      directory (str): directory of the temporary file
+
+    """
+    def __init__(self, stream, directory=UPLOAD_DIR):
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        sha256 = hashlib.sha256()
+        self.size = 0
+        self.path = None
+        fd, self.path = tempfile.mkstemp(dir=directory, suffix='.upload')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                if stream is not None:
+                    for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                        sha256.update(chunk)
+                        f.write(chunk)
+                        self.size += len(chunk)
+        except Exception:
+            self.discard()
+            raise
+        self.digest = sha256.hexdigest()
+
+    def open(self):
+        return open(self.path, 'rb')
+
+    def discard(self):
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+        self.path = None
+
+    def __del__(self):
+        self.discard()
+
+
+def put_blob(content):
+    """Store content as a blob, unless it is stored already.
+
+    Args:
+      content: bytes, a file-like object or a SpooledFile
+
+    Returns:
+      (hex) SHA-256 digest of the content
+
+    """
+    if isinstance(content, SpooledFile):
+        return _put_spooled_file(content)
+
+    if not os.path.isdir(BLOB_DIR):
+        os.makedirs(BLOB_DIR)
+
+    sha256 = hashlib.sha256()
+    fd, tmp = tempfile.mkstemp(dir=BLOB_DIR, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            if isinstance(content, bytes):
+                sha256.update(content)
+                f.write(content)
+            else:
+                for chunk in iter(lambda: content.read(CHUNK_SIZE), b''):
+                    sha256.update(chunk)
+                    f.write(chunk)
+        digest = sha256.hexdigest()
+        if not os.path.exists(blob_path(digest)):
+            atomic_rename(tmp, blob_path(digest))
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+    return digest
+
+
+def _put_spooled_file(spooled):
+    digest = spooled.digest
+
+    if os.path.exists(blob_path(digest)):
+        spooled.discard()
+        return digest
+
+    try:
+        atomic_rename(spooled.path, blob_path(digest))
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        # UPLOAD_DIR is on another file system, so copy after all.
+        with spooled.open() as f:
+            put_blob(f)
+        spooled.discard()
+    else:
+        spooled.path = None
+
+    return digest
+
+
+class FileEvents(object):
+    """The refs from the events of a file timeseries to blobs.
+
+    Args:
+      uuid: UUID of the timeseries
+
+    """
+    def __init__(self, uuid):
+        self.path = os.path.join(SERIES_DIR, str(uuid))
+
+    def _filename(self, timestamp):
+        day = timestamp // DAY * DAY
+        return os.path.join(
+            self.path, str(day), '{}.json'.format(timestamp))
+
+    def exists(self):
+        return os.path.isdir(self.path)
+
+    def put(self, timestamp, digest, content_type=None, size=None):
+        """Let the event at timestamp (ms) refer to a blob."""
+        ref = {
+            'digest': digest,
+            'content_type': content_type,
+            'size': size,
+        }
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(ref, f)
+            atomic_rename(tmp, self._filename(timestamp))
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def get(self, timestamp):
+        """Return the ref of the event at timestamp (ms), None if absent."""
+        try:
+            with open(self._filename(timestamp)) as f:
+                return json.load(f)
+        except IOError:
+            return None
+
+    def timestamps(self, start=None, end=None, checkpoint=None):
+        """Return the sorted timestamps (ms) of the events within start,
+        end (inclusive).
+
+        Args:
+          start (int): optional start in ms, inclusive
+          end (int): optional end in ms, inclusive
+          checkpoint (callable): optional, called before every day, may
+            raise to abort, e.g. `Timeseries.check_lock`
+
+        """
+        try:
+            days = sorted(int(day) for day in os.listdir(self.path)
+                          if day.lstrip('-').isdigit())
+        except OSError:
+            return []
+
+        result = []
+        for day in days:
+            if start is not None and day + DAY <= start:
+                continue
+            if end is not None and day > end:
+                break
+            if checkpoint is not None:
+                checkpoint()
+            result.extend(
+                int(filename[:-5])
+                for filename in os.listdir(os.path.join(self.path, str(day)))
+                if filename.endswith('.json')
+            )
+
+        return sorted(
+            timestamp for timestamp in result
+            if (start is None or timestamp >= start) and
+            (end is None or timestamp <= end)
+        )
+
+
+def iter_file(f, length):
+    """Yield up to length bytes of an open file in chunks and close it."""
+    try:
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+def parse_range(header, size):
+    """Return the (first, last) byte of a single HTTP range, inclusive.
+
+    Returns:
+      tuple, or None if the header is absent or not a single byte range
+
+    Raises:
+      ValueError: if the range is not satisfiable.
+
+    """
+    match = RANGE.match(header or '')
+    if match is None or match.groups() == ('', ''):
+        return None
+
+    first, last = match.groups()
+    if first == '':  # suffix range: the last n bytes
+        first, last = max(0, size - int(last)), size - 1
+    else:
+        first = int(first)
+        last = min(int(last), size - 1) if last else size - 1
+
+    if first > last or first >= size:
+        raise ValueError("Range not satisfiable.")
+
+    return first, last
+
+
+def serve_blob(request, digest, content_type=None):
+    """Return a response with the content of a blob."""
+    # Blobs never change, their refs may.
+    return serve_file(request, blob_path(digest), content_type, digest)
+
+
+def serve_file(request, path, content_type=None, etag=None):
+    """Return a response with the content of a file in BLOB_DIR.
+
+    The content is never read into memory: the web server sends it if
+    configured to do so, else it is streamed from disk.
+
+    """
+    content_type = content_type or 'application/octet-stream'
+
+    if ACCEL_REDIRECT:
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = ACCEL_REDIRECT + os.path.relpath(
+            path, BLOB_DIR)
+        return response
+
+    if SENDFILE:
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = os.path.abspath(path)
+        return response
+
+    size = os.path.getsize(path)
+
+    try:
+        byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = 'bytes */{}'.format(size)
+        return response
+
+    f = open(path, 'rb')
+    if byte_range is None:
+        response = StreamingHttpResponse(
+            iter_file(f, size), content_type=content_type)
+        response['Content-Length'] = size
+    else:
+        first, last = byte_range
+        f.seek(first)
+        response = StreamingHttpResponse(
+            iter_file(f, last - first + 1), status=206,
+            content_type=content_type)
+        response['Content-Length'] = last - first + 1
+        response['Content-Range'] = 'bytes {}-{}/{}'.format(first, last, size)
+
+    response['Accept-Ranges'] = 'bytes'
+    if etag is not None:
+        response['ETag'] = '"{}"'.format(etag)
+    return response
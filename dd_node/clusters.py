@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+# (c) Nelen & Schuurmans, see LICENSE.rst.
+
+"""Server-side clustering of locations.
+
+Locations are clustered on a grid per zoom level. The cells of the grid at
+zoom level z are the tiles at zoom level z + CLUSTER_GRID_SHIFT, i.e. with
+a shift of 2, a 256 pixel map tile holds 4 x 4 cells of 64 pixels.
+
+The clusters of all zoom levels are precomputed in LocationCluster. They
+are updated incrementally when a location is saved or deleted, so that a
+clustered view of the map is a simple range query. Use the management
+command `buildlocationclusters` to rebuild them from scratch, e.g. after
+bulk operations, which do not send signals.
+
+Incremental updates use INSERT ... ON CONFLICT, available since PostgreSQL
+9.5.
+
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import logging
+import math
+
+from django.conf import settings
+from django.db import connection
+from django.db import transaction
+
+from dd_node.models import LocationCluster
+from dd_node.utils.tiles import MAX_LATITUDE
+from dd_node.utils.tiles import lonlat_to_tile_index
+from dd_node.utils.tiles import tile_range
+
+logger = logging.getLogger(__name__)
+
+CLUSTER_MAX_ZOOM = getattr(settings, 'LOCATION_CLUSTER_MAX_ZOOM', 16)
+CLUSTER_GRID_SHIFT = 2
+ZOOM_LEVELS = range(CLUSTER_MAX_ZOOM + 1)
+
+ADD_SQL = """
+INSERT INTO dd_node_locationcluster
+    (zoom, cell_x, cell_y, count, sum_lon, sum_lat,
+     min_lon, min_lat, max_lon, max_lat)
+SELECT
+    cell.zoom, cell.x, cell.y, 1, %(lon)s, %(lat)s,
+    %(lon)s, %(lat)s, %(lon)s, %(lat)s
+FROM unnest(%(zooms)s, %(xs)s, %(ys)s) AS cell(zoom, x, y)
+ON CONFLICT (zoom, cell_x, cell_y) DO UPDATE SET
+    count = dd_node_locationcluster.count + 1,
+    sum_lon = dd_node_locationcluster.sum_lon + excluded.sum_lon,
+    sum_lat = dd_node_locationcluster.sum_lat + excluded.sum_lat,
+    min_lon = least(dd_node_locationcluster.min_lon, excluded.min_lon),
+    min_lat = least(dd_node_locationcluster.min_lat, excluded.min_lat),
+    max_lon = greatest(dd_node_locationcluster.max_lon, excluded.max_lon),
+    max_lat = greatest(dd_node_locationcluster.max_lat, excluded.max_lat)
+"""
+
+REMOVE_SQL = """
+UPDATE dd_node_locationcluster c SET
+    count = c.count - 1,
+    sum_lon = c.sum_lon - %(lon)s,
+    sum_lat = c.sum_lat - %(lat)s
+FROM unnest(%(zooms)s, %(xs)s, %(ys)s) AS cell(zoom, x, y)
+WHERE c.zoom = cell.zoom
+    AND c.cell_x = cell.x
+    AND c.cell_y = cell.y
+"""
+
+# The bounding box of a cluster is recalculated from its members if the
+# removed location was on its edge. Candidates are found with the spatial
+# index on the bounds of the cell (in WGS84, up to the poles for the first
+# and last row). A centroid on the edge between two cells counts for both,
+# which at most makes a bounding box touch the neighbouring cell.
+SHRINK_SQL = """
+UPDATE dd_node_locationcluster c SET
+    min_lon = members.min_lon,
+    min_lat = members.min_lat,
+    max_lon = members.max_lon,
+    max_lat = members.max_lat
+FROM unnest(%(zooms)s, %(xs)s, %(ys)s,
+            %(xmins)s, %(ymins)s, %(xmaxs)s, %(ymaxs)s)
+    AS cell(zoom, x, y, xmin, ymin, xmax, ymax)
+CROSS JOIN LATERAL (
+    SELECT
+        min(ST_X(centroid)) AS min_lon,
+        min(ST_Y(centroid)) AS min_lat,
+        max(ST_X(centroid)) AS max_lon,
+        max(ST_Y(centroid)) AS max_lat
+    FROM (
+        SELECT ST_Centroid(geometry) AS centroid
+        FROM dd_node_location
+        WHERE geometry && ST_MakeEnvelope(
+                cell.xmin, cell.ymin, cell.xmax, cell.ymax, 4326)
+            AND NOT ST_IsEmpty(geometry)
+    ) candidates
+    WHERE ST_Intersects(centroid, ST_MakeEnvelope(
+        cell.xmin, cell.ymin, cell.xmax, cell.ymax, 4326))
+) members
+WHERE c.zoom = cell.zoom
+    AND c.cell_x = cell.x
+    AND c.cell_y = cell.y
+    AND members.min_lon IS NOT NULL
+    AND NOT (%(lon)s > c.min_lon AND %(lon)s < c.max_lon AND
+             %(lat)s > c.min_lat AND %(lat)s < c.max_lat)
+"""
+
+CLEAR_SQL = """
+DELETE FROM dd_node_locationcluster
+"""
+
+PRUNE_SQL = """
+DELETE FROM dd_node_locationcluster c
+USING unnest(%(zooms)s, %(xs)s, %(ys)s) AS cell(zoom, x, y)
+WHERE c.zoom = cell.zoom
+    AND c.cell_x = cell.x
+    AND c.cell_y = cell.y
+    AND c.count <= 0
+"""
+
+# The grid cells are calculated like `dd_node.utils.tiles.lonlat_to_tile`.
+
+REBUILD_SQL = """
+INSERT INTO dd_node_locationcluster
+    (zoom, cell_x, cell_y, count, sum_lon, sum_lat,
+     min_lon, min_lat, max_lon, max_lat)
+SELECT
+    zoom, cell_x, cell_y, count(*), sum(lon), sum(lat),
+    min(lon), min(lat), max(lon), max(lat)
+FROM (
+    SELECT
+        zoom.z AS zoom,
+        greatest(0, least(n - 1,
+            floor((lon + 180) / 360 * n)))::integer AS cell_x,
+        greatest(0, least(n - 1,
+            floor((1 - ln(tan(radians(clat)) + 1 / cos(radians(clat))) /
+                   pi()) / 2 * n)))::integer AS cell_y,
+        lon,
+        lat
+    FROM (
+        SELECT
+            ST_X(centroid) AS lon,
+            ST_Y(centroid) AS lat,
+            greatest(-%(max_lat)s, least(%(max_lat)s, ST_Y(centroid)))
+                AS clat
+        FROM (
+            SELECT ST_Centroid(geometry) AS centroid
+            FROM dd_node_location
+            WHERE geometry IS NOT NULL AND NOT ST_IsEmpty(geometry)
+        ) centroids
+    ) points
+    CROSS JOIN LATERAL (
+        SELECT z, 2 ^ (z + %(shift)s) AS n
+        FROM generate_series(0, %(max_zoom)s) AS z
+    ) zoom
+) cells
+GROUP BY zoom, cell_x, cell_y
+"""
+
+
+def location_point(geometry):
+    """Return the (lon, lat) that represents a geometry in clusters."""
+    if geometry is None or geometry.empty:
+        return None
+    centroid = geometry.centroid
+    return centroid.x, centroid.y
+
+
+def _row_latitude(y, n):
+    """Return the latitude of the northern edge of row y of n rows."""
+    return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+
+
+def cell_extent(zoom, x, y):
+    """Return the WGS84 (xmin, ymin, xmax, ymax) of a cell of a zoom level.
+
+    The first and last row extend to the poles, as locations beyond the
+    Web Mercator range are in those cells.
+
+    """
+    n = 2 ** (zoom + CLUSTER_GRID_SHIFT)
+    return (
+        x / n * 360 - 180,
+        -90.0 if y == n - 1 else _row_latitude(y + 1, n),
+        (x + 1) / n * 360 - 180,
+        90.0 if y == 0 else _row_latitude(y, n),
+    )
+
+
+def _cell_params(point):
+    lon, lat = point
+    zooms, xs, ys = [], [], []
+    for z in ZOOM_LEVELS:
+        x, y = lonlat_to_tile_index(lon, lat, z + CLUSTER_GRID_SHIFT)
+        zooms.append(z)
+        xs.append(x)
+        ys.append(y)
+    return dict(lon=lon, lat=lat, zooms=zooms, xs=xs, ys=ys)
+
+
+def _shrink_params(point):
+    params = _cell_params(point)
+    extents = [cell_extent(z, x, y) for z, x, y in zip(
+        params['zooms'], params['xs'], params['ys'])]
+    for name, values in zip(('xmins', 'ymins', 'xmaxs', 'ymaxs'),
+                            zip(*extents)):
+        params[name] = list(values)
+    return params
+
+
+def update_location_clusters(old_geometry, new_geometry):
+    """Move a location from the clusters of its old to its new geometry.
+
+    Both geometries may be None, e.g. for new and deleted locations. Every
+    move takes a constant number of queries, whatever the number of zoom
+    levels. Call it once the location is saved or deleted: the bounding
+    boxes of the old clusters are recalculated from their members.
+
+    """
+    old_point = location_point(old_geometry)
+    new_point = location_point(new_geometry)
+
+    if old_point == new_point:
+        return
+
+    with transaction.atomic():
+        cursor = connection.cursor()
+        if old_point is not None:
+            params = _shrink_params(old_point)
+            cursor.execute(REMOVE_SQL, params)
+            cursor.execute(PRUNE_SQL, params)
+            cursor.execute(SHRINK_SQL, params)
+        if new_point is not None:
+            cursor.execute(ADD_SQL, _cell_params(new_point))
+
+
+def rebuild_location_clusters():
+    """Rebuild the clusters of all zoom levels from scratch."""
+    params = dict(
+        max_lat=MAX_LATITUDE,
+        shift=CLUSTER_GRID_SHIFT,
+        max_zoom=CLUSTER_MAX_ZOOM,
+    )
+    with transaction.atomic():
+        cursor = connection.cursor()
+        cursor.execute(CLEAR_SQL)
+        cursor.execute(REBUILD_SQL, params)
+
+
+def get_location_clusters(zoom, extent=None):
+    """Return the clusters at a zoom level, optionally within an extent.
+
+    Args:
+      zoom (int): zoom level, clipped to the available zoom levels.
+      extent (tuple): optional (xmin, ymin, xmax, ymax) in WGS84.
+
+    Returns:
+      queryset of LocationCluster
+
+    """
+    zoom = max(0, min(CLUSTER_MAX_ZOOM, zoom))
+    clusters = LocationCluster.objects.filter(zoom=zoom, count__gt=0)
+
+    if extent is not None:
+        x1, y1, x2, y2 = tile_range(extent, zoom + CLUSTER_GRID_SHIFT)
+        clusters = clusters.filter(
+            cell_x__range=(x1, x2), cell_y__range=(y1, y2))
+
+    return clusters
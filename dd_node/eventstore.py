@@ -0,0 +1,387 @@
+# -*- coding: utf-8 -*-
+# (c) Nelen & Schuurmans, see LICENSE.rst.
+
+"""Chunked on-disk storage of float array and numeric events.
+
+A FLOAT_ARRAY timeseries has a vector of values per timestamp, e.g. one
+value per meter of a distributed temperature sensing fibre. Its events are
+stored as a time x position matrix, split in chunks of a fixed duration:
+
+    EVENT_STORAGE_DIR/arrays/<uuid>/<chunk>.timestamps.npy
+    EVENT_STORAGE_DIR/arrays/<uuid>/<chunk>.values.npy
+    EVENT_STORAGE_DIR/arrays/<uuid>/<chunk>.flags.npy
+
+The events of a numeric (INTEGER or FLOAT) timeseries are stored the same
+way, with a single position.
+
+<chunk> is the start of the chunk in ms since the epoch. Timestamps (ms,
+int64) are sorted within a chunk, the values are a C-contiguous
+(timestamps, positions) float64 array and the flags are the int8 quality
+flag of every timestamp, see `Timeseries.QualityFlag`. Chunks written
+before flags were stored have no flags file; their events are unflagged.
+
+Chunks are read as memory maps, so that reading a time range and a range
+of positions only touches those rows and columns on disk. Chunk files are
+written to a temporary file and renamed, so readers never see a partly
+written file. The values and flags are renamed before the timestamps, which
+makes a reader that catches a chunk halfway a write see different lengths;
+it then loads the chunk again. Writers of a store hold an exclusive lock on
+its `.lock` file, so that concurrent writers (e.g. the processes of an
+import) do not overwrite each other's chunks.
+
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from contextlib import contextmanager
+import fcntl
+import logging
+import os
+import re
+import tempfile
+
+from django.conf import settings
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ARRAY_STORAGE_DIR = os.path.join(settings.EVENT_STORAGE_DIR, 'arrays')
+CHUNK_DURATION = getattr(settings, 'EVENT_ARRAY_CHUNK_DURATION', 86400000)
+
+TIMESTAMPS = 'timestamps'
+VALUES = 'values'
+FLAGS = 'flags'
+
+LOCK_FILE = '.lock'
+
+# Flag of events that have not been validated, like QualityFlag.NONE.
+NO_FLAG = -1
+
+# Number of times to load a chunk that is being written.
+LOAD_ATTEMPTS = 3
+
+CHUNK_FILE = re.compile(r'^(-?\d+)\.{}\.npy$'.format(TIMESTAMPS))
+
+
+def chunk_start(timestamp):
+    """Return the start (ms) of the chunk that holds a timestamp (ms)."""
+    return timestamp // CHUNK_DURATION * CHUNK_DURATION
+
+
+class ArrayStore(object):
+    """The events of a single float array or numeric timeseries.
+
+    Args:
+      uuid: UUID of the timeseries
+      root (str): optional directory to store arrays in
+
+    """
+    def __init__(self, uuid, root=None):
+        self.path = os.path.join(
+            ARRAY_STORAGE_DIR if root is None else root, str(uuid))
+
+    def _filename(self, chunk, kind):
+        return os.path.join(self.path, '{}.{}.npy'.format(chunk, kind))
+
+    @contextmanager
+    def _write_lock(self):
+        """Hold the exclusive lock of the writers of the store."""
+        with open(os.path.join(self.path, LOCK_FILE), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def chunks(self, start=None, end=None):
+        """Return the sorted starts of the stored chunks within start, end.
+
+        Args:
+          start (int): optional start in ms, inclusive
+          end (int): optional end in ms, inclusive
+
+        """
+        try:
+            filenames = os.listdir(self.path)
+        except OSError:
+            return []
+
+        chunks = sorted(
+            int(match.group(1))
+            for match in map(CHUNK_FILE.match, filenames) if match
+        )
+
+        return [
+            chunk for chunk in chunks
+            if (start is None or chunk + CHUNK_DURATION > start) and
+            (end is None or chunk <= end)
+        ]
+
+    def _load_flags(self, chunk, length):
+        try:
+            return np.load(self._filename(chunk, FLAGS))
+        except IOError:
+            return np.full(length, NO_FLAG, dtype=np.int8)
+
+    def count(self, start=None, end=None):
+        """Return the number of events within start, end.
+
+        Only the timestamps are read.
+
+        """
+        count = 0
+        for chunk in self.chunks(start, end):
+            timestamps = np.load(self._filename(chunk, TIMESTAMPS))
+            i1 = (0 if start is None else
+                  np.searchsorted(timestamps, start, side='left'))
+            i2 = (len(timestamps) if end is None else
+                  np.searchsorted(timestamps, end, side='right'))
+            count += max(0, i2 - i1)
+        return int(count)
+
+    def width(self, start=None, end=None):
+        """Return the number of positions of the events within start, end.
+
+        That is the largest number of positions of the chunks, or 0 if
+        there are none. Only the headers of the values are read.
+
+        """
+        return max([
+            np.load(self._filename(chunk, VALUES), mmap_mode='r').shape[1]
+            for chunk in self.chunks(start, end)
+        ] or [0])
+
+    def load_chunk(self, chunk, mmap_mode='r'):
+        """Return the (timestamps, values, flags) arrays of a chunk."""
+        for _ in range(LOAD_ATTEMPTS):
+            timestamps = np.load(self._filename(chunk, TIMESTAMPS))
+            values = np.load(
+                self._filename(chunk, VALUES), mmap_mode=mmap_mode)
+            flags = self._load_flags(chunk, len(timestamps))
+            if len(timestamps) == len(values) == len(flags):
+                return timestamps, values, flags
+        raise IOError("Chunk {} of {} is inconsistent.".format(
+            chunk, self.path))
+
+    def _save_chunk(self, chunk, timestamps, values, flags):
+        # Timestamps last: a chunk exists as soon as its timestamps do.
+        for kind, array in ((VALUES, values), (FLAGS, flags),
+                            (TIMESTAMPS, timestamps)):
+            fd, tmp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    np.save(f, np.ascontiguousarray(array))
+                os.rename(tmp, self._filename(chunk, kind))
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+
+    def iter_chunks(self, start=None, end=None, positions=None,
+                    max_flag=None, checkpoint=None, unvalidated=False):
+        """Yield the (timestamps, values, flags) per chunk within start, end.
+
+        Only the requested rows and columns are read from disk. With a
+        max_flag, the values of a chunk are not read at all if none of its
+        flags match.
+
+        Args:
+          start (int): optional start in ms, inclusive
+          end (int): optional end in ms, inclusive
+          positions (slice): optional range of positions
+          max_flag (int): optional, only events with a flag <= max_flag
+          checkpoint (callable): optional, called before every chunk, may
+            raise to abort the read, e.g. `Timeseries.check_lock`
+          unvalidated (bool): whether events that have not been validated
+            (NO_FLAG) pass max_flag, False by default
+
+        """
+        if positions is None:
+            positions = slice(None)
+
+        for chunk in self.chunks(start, end):
+            if checkpoint is not None:
+                checkpoint()
+            timestamps, values, flags = self.load_chunk(chunk)
+            i1 = (0 if start is None else
+                  np.searchsorted(timestamps, start, side='left'))
+            i2 = (len(timestamps) if end is None else
+                  np.searchsorted(timestamps, end, side='right'))
+            if i1 >= i2:
+                continue
+
+            rows = slice(i1, i2)
+            if max_flag is not None:
+                matches = flags[rows] <= max_flag
+                if not unvalidated:
+                    matches &= flags[rows] != NO_FLAG
+                rows = np.flatnonzero(matches) + i1
+                if not len(rows):
+                    continue  # without reading any values
+                if len(rows) == i2 - i1:
+                    rows = slice(i1, i2)
+
+            # Only the selected rows of the memory map are read.
+            yield (timestamps[rows], np.array(values[rows, positions]),
+                   flags[rows])
+
+    def read(self, start=None, end=None, positions=None, max_flag=None,
+             checkpoint=None, unvalidated=False):
+        """Return the (timestamps, values, flags) within start, end.
+
+        Args:
+          start (int): optional start in ms, inclusive
+          end (int): optional end in ms, inclusive
+          positions (slice): optional range of positions
+          max_flag (int): optional maximum flag, see `iter_chunks`
+          checkpoint (callable): optional, see `iter_chunks`
+          unvalidated (bool): optional, see `iter_chunks`
+
+        Returns:
+          tuple of a (n, ) int64 array of timestamps in ms, a (n, m)
+          float64 array of values and a (n, ) int8 array of flags
+
+        """
+        chunks = list(self.iter_chunks(
+            start, end, positions, max_flag, checkpoint, unvalidated))
+
+        if not chunks:
+            return (np.empty(0, dtype=np.int64), np.empty((0, 0)),
+                    np.empty(0, dtype=np.int8))
+
+        timestamps, values, flags = zip(*chunks)
+        return (np.concatenate(timestamps), np.concatenate(values),
+                np.concatenate(flags))
+
+    def aggregate(self, start=None, end=None, positions=None, max_flag=None,
+                  checkpoint=None, unvalidated=False):
+        """Return aggregates of the values per flag within start, end.
+
+        The aggregates are built chunk by chunk, so only a chunk is in
+        memory at a time. NaN values are not counted.
+
+        Args:
+          start (int): optional start in ms, inclusive
+          end (int): optional end in ms, inclusive
+          positions (slice): optional range of positions
+          max_flag (int): optional maximum flag, see `iter_chunks`
+          checkpoint (callable): optional, see `iter_chunks`
+          unvalidated (bool): optional, see `iter_chunks`
+
+        Returns:
+          list of dicts with a flag, the number of events and the count,
+          min, max and mean of their values, sorted by flag
+
+        """
+        aggregates = {}
+
+        for timestamps, values, flags in self.iter_chunks(
+                start, end, positions, max_flag, checkpoint, unvalidated):
+            for flag in np.unique(flags).tolist():
+                selected = values[flags == flag]
+                known = selected[~np.isnan(selected)]
+                aggregate = aggregates.setdefault(flag, {
+                    'flag': flag, 'events': 0, 'count': 0,
+                    'min': None, 'max': None, 'sum': 0.0,
+                })
+                aggregate['events'] += len(selected)
+                if not len(known):
+                    continue
+                aggregate['count'] += len(known)
+                aggregate['sum'] += known.sum()
+                low, high = known.min(), known.max()
+                if aggregate['min'] is None or low < aggregate['min']:
+                    aggregate['min'] = low
+                if aggregate['max'] is None or high > aggregate['max']:
+                    aggregate['max'] = high
+
+        result = []
+        for flag in sorted(aggregates):
+            aggregate = aggregates[flag]
+            total = aggregate.pop('sum')
+            aggregate['mean'] = (total / aggregate['count']
+                                 if aggregate['count'] else None)
+            for key in ('min', 'max', 'mean'):
+                if aggregate[key] is not None:
+                    aggregate[key] = float(aggregate[key])
+            result.append(aggregate)
+        return result
+
+    def write(self, timestamps, values, flags=None):
+        """Store events, replacing stored events at the same timestamps.
+
+        Args:
+          timestamps (array_like): (n, ) timestamps in ms
+          values (array_like): (n, m) values
+          flags (array_like): optional (n, ) quality flags
+
+        """
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        if flags is None:
+            flags = np.full(len(timestamps), NO_FLAG, dtype=np.int8)
+        else:
+            flags = np.asarray(flags, dtype=np.int8)
+
+        if values.ndim != 2 or len(values) != len(timestamps):
+            raise ValueError("Expected a value array per timestamp.")
+        if flags.shape != timestamps.shape:
+            raise ValueError("Expected a flag per timestamp.")
+
+        if not os.path.isdir(self.path):
+            try:
+                os.makedirs(self.path)
+            except OSError:  # made by another writer
+                pass
+
+        chunks = chunk_start(timestamps)
+
+        with self._write_lock():
+            for chunk in np.unique(chunks):
+                # Reversed, so that the last of duplicate timestamps wins.
+                mask = chunks == chunk
+                new_timestamps = timestamps[mask][::-1]
+                new_values = values[mask][::-1]
+                new_flags = flags[mask][::-1]
+
+                if os.path.exists(self._filename(chunk, TIMESTAMPS)):
+                    old_timestamps, old_values, old_flags = self.load_chunk(
+                        chunk, None)
+                    if old_values.shape[1] != new_values.shape[1]:
+                        raise ValueError(
+                            "Expected {} values per timestamp, got {}.".format(
+                                old_values.shape[1], new_values.shape[1]))
+                    new_timestamps = np.concatenate(
+                        (new_timestamps, old_timestamps))
+                    new_values = np.concatenate((new_values, old_values))
+                    new_flags = np.concatenate((new_flags, old_flags))
+
+                # np.unique returns the first occurrence of every timestamp,
+                # which is the new event if a timestamp was already stored.
+                new_timestamps, index = np.unique(
+                    new_timestamps, return_index=True)
+                self._save_chunk(
+                    chunk, new_timestamps, new_values[index], new_flags[index])
+
+    def delete(self, start=None, end=None):
+        """Delete the events within start, end."""
+        if not os.path.isdir(self.path):
+            return
+        with self._write_lock():
+            for chunk in self.chunks(start, end):
+                timestamps, values, flags = self.load_chunk(chunk, None)
+                keep = np.zeros(len(timestamps), dtype=bool)
+                if start is not None:
+                    keep |= timestamps < start
+                if end is not None:
+                    keep |= timestamps > end
+                if not keep.any():
+                    # Timestamps first: a chunk exists as long as they do.
+                    for kind in (TIMESTAMPS, VALUES, FLAGS):
+                        if os.path.exists(self._filename(chunk, kind)):
+                            os.remove(self._filename(chunk, kind))
+                elif not keep.all():
+                    self._save_chunk(
+                        chunk, timestamps[keep], values[keep], flags[keep])
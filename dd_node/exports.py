@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+# (c) Nelen & Schuurmans, see LICENSE.rst.
+
+"""Exports of events and locations to files, for asynchronous tasks.
+
+Exports are written to EXPORT_DIR, which is in MEDIA_ROOT, so that the
+`Task` view can link to them. They are written a chunk of rows at a time
+(events are read per chunk of the array store), so that memory use does
+not depend on the size of the export, and report their progress after
+every chunk:
+
+    progress(rows_written, total_rows)
+
+Files are written to a temporary file and renamed, so an export is never
+served partly written.
+
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from contextlib import contextmanager
+import logging
+import os
+import tempfile
+
+from django.conf import settings
+
+from dd_node.blobstore import atomic_rename
+from dd_node.geojson import FETCH_SIZE
+from dd_node.geojson import stream_location_features
+from dd_node.utils.conversion import datetime_as_csv_string
+
+logger = logging.getLogger(__name__)
+
+EXPORT_DIR = os.path.join(settings.MEDIA_ROOT, 'exports')
+
+
+def export_path(name, extension):
+    return os.path.join(EXPORT_DIR, name + extension)
+
+
+@contextmanager
+def _export_file(path):
+    """Open a temporary file, which is renamed to path when closed."""
+    if not os.path.isdir(EXPORT_DIR):
+        os.makedirs(EXPORT_DIR)
+    fd, tmp = tempfile.mkstemp(dir=EXPORT_DIR, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            yield f
+        atomic_rename(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _encode(text):
+    return text if isinstance(text, bytes) else text.encode('utf-8')
+
+
+def check_exportable(timeseries):
+    """Check that the events of timeseries can be exported.
+
+    Only the events in the array store, i.e. those of float array and
+    numeric timeseries, are exported. Check this before an export starts,
+    so that it does not fail halfway.
+
+    Raises:
+      ValueError: naming the timeseries that cannot be exported
+
+    """
+    unstored = [ts for ts in timeseries if not ts.has_array_store]
+    if unstored:
+        raise ValueError(
+            "Cannot export the events of {} timeseries: {}.".format(
+                ' or '.join(sorted(set(
+                    ts.get_value_type() for ts in unstored))),
+                ', '.join(str(ts.uuid) for ts in unstored)))
+
+
+def estimate_rows(timeseries, start=None, end=None):
+    """Return the number of events within start, end.
+
+    Returns:
+      int
+
+    """
+    return timeseries.array_store.count(start, end)
+
+
+def iter_event_rows(timeseries, start=None, end=None):
+    """Yield the events of a timeseries in chunks.
+
+    Yields:
+      lists of (timestamp in ms, list of values)
+
+    """
+    for timestamps, values in iter_event_arrays(timeseries, start, end):
+        yield list(zip(timestamps.tolist(), values.tolist()))
+
+
+def iter_event_arrays(timeseries, start=None, end=None):
+    """Yield the events of a numeric or float array timeseries in chunks.
+
+    Yields:
+      tuples of a (n, ) int64 array of timestamps in ms and a (n, m)
+      float64 array of values, with m = 1 for numeric timeseries
+
+    """
+    check_exportable([timeseries])
+    for timestamps, values, _ in timeseries.array_store.iter_chunks(
+            start, end):
+        yield timestamps, values
+
+
+def _csv_row(uuid, timestamp, values):
+    return '{},{},{}\n'.format(
+        uuid, datetime_as_csv_string(timestamp),
+        ','.join('' if value != value else '{}'.format(value)  # NaN
+                 for value in values))
+
+
+def write_events_csv(path, timeseries, start=None, end=None,
+                     progress=None):
+    """Write the events of timeseries to a CSV file.
+
+    Every row has the UUID of a timeseries, a datetime and the value(s) of
+    an event.
+
+    Args:
+      path (str): path of the file
+      timeseries: iterable of Timeseries
+      start (int): optional start in ms, inclusive
+      end (int): optional end in ms, inclusive
+      progress (callable): optional, see module docstring
+
+    Returns:
+      number of rows written
+
+    """
+    timeseries = list(timeseries)
+    check_exportable(timeseries)
+    total = sum(estimate_rows(ts, start, end) for ts in timeseries)
+
+    rows = 0
+    with _export_file(path) as f:
+        for ts in timeseries:
+            for chunk in iter_event_rows(ts, start, end):
+                f.write(_encode(''.join(
+                    _csv_row(ts.uuid, timestamp, values)
+                    for timestamp, values in chunk)))
+                rows += len(chunk)
+                if progress is not None:
+                    progress(rows, total)
+
+    return rows
+
+
+def write_locations_geojson(path, queryset, url_prefix, url_suffix,
+                            srid=None, progress=None):
+    """Write locations to a GeoJSON file, see `stream_location_features`.
+
+    Args:
+      path (str): path of the file
+      queryset: filtered queryset of Location
+      url_prefix (str): part of the url of a location before its uuid
+      url_suffix (str): part of the url of a location after its uuid
+      srid (int): optional SRID to reproject the geometries to
+      progress (callable): optional, see module docstring
+
+    Returns:
+      number of locations written
+
+    """
+    total = queryset.count()
+
+    rows = 0
+    with _export_file(path) as f:
+        pieces = stream_location_features(
+            queryset, url_prefix, url_suffix, srid)
+        # After the header, every piece has up to FETCH_SIZE features.
+        for index, piece in enumerate(pieces):
+            f.write(_encode(piece))
+            rows = min(total, index * FETCH_SIZE)
+            if progress is not None and index:
+                progress(rows, total)
+
+    return rows
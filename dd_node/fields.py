@@ -7,8 +7,33 @@ from datetime import datetime
 
 from rest_framework import serializers
 from rest_framework.reverse import reverse
+from rest_framework.utils.urls import replace_query_param
+from rest_framework_gis.fields import GeometryField
 
+from dd_node.models import Timeseries
+from dd_node.simplification import get_simplified_geometry
+from dd_node.simplification import parse_simplify_param
+from dd_node.thumbnails import parse_size_param
 from dd_node.utils.conversion import datetime_to_milliseconds as ms
+from dd_node.utils.gis import parse_srid_param
+from dd_node.utils.gis import transform_geometries
+
+
+def file_event_url(timeseries, timestamp, request):
+    """Return the url of the file of an event.
+
+    Requests with ``?size=<size>`` get the url of a thumbnail of images.
+
+    """
+    url = reverse(
+        'timeseries-data-detail',
+        args=[timeseries.uuid, timestamp],
+        request=request)
+    size = parse_size_param(request.query_params.get('size'))
+    if size is not None and \
+            timeseries.value_type == Timeseries.ValueType.IMAGE:
+        url = replace_query_param(url, 'size', size)
+    return url
 
 
 class DisplayValueChoiceField(serializers.ChoiceField):
@@ -66,15 +91,37 @@ class LastValue(serializers.HyperlinkedIdentityField):
         if value.is_file:
             last = value.end
             if last:
-                return reverse(
-                    'timeseries-data-detail',
-                    args=[value.uuid, int(ms(last))],
-                    request=self.context['request']
-                )
+                return file_event_url(
+                    value, int(ms(last)), self.context['request'])
             return None
         return value.last_value
 
 
+class SimplifiedGeometryField(GeometryField):
+    """A GeometryField that is simplified and reprojected on request.
+
+    With ``?simplify=<zoom>``, a precomputed simplified geometry is
+    serialized, see `dd_node.simplification`. With ``?srid=<srid>``, the
+    geometry is reprojected, by PostGIS if the view prefetched it with
+    that SRID. Writes are not affected. The views validate both parameters,
+    see `dd_node.views.generic.parse_geometry_params`.
+
+    """
+    def get_attribute(self, instance):
+        request = self.context.get('request')
+        if request is None:
+            return super(SimplifiedGeometryField, self).get_attribute(instance)
+        params = request.query_params
+        level = parse_simplify_param(params.get('simplify'))
+        srid = parse_srid_param(params.get('srid'))
+        if srid is not None and hasattr(instance, 'transformed_geometry'):
+            return get_simplified_geometry(instance, level, transformed=True)
+        geometry = get_simplified_geometry(instance, level)
+        if srid is not None:
+            (geometry, ) = transform_geometries([geometry], srid)
+        return geometry
+
+
 class TimestampField(serializers.Field):
     def to_internal_value(self, data):
         """Convert milliseconds since epoch to datetime.
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+# (c) Nelen & Schuurmans, see LICENSE.rst.
+
+"""GeoJSON FeatureCollections of locations, rendered by PostgreSQL.
+
+Every feature is built by PostgreSQL (json_build_object, available since
+PostgreSQL 9.4, and ST_AsGeoJSON) and the rows are fetched in batches from
+a server-side cursor. Python only joins the features, so that large
+collections are streamed in constant memory.
+
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import logging
+import uuid
+
+from django.db import connection
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+GEOJSON_CONTENT_TYPE = 'application/vnd.geo+json'
+
+FETCH_SIZE = 2000  # rows per round trip
+
+# The url of a location is prefix || uuid || suffix.
+LOCATION_FEATURE_SQL = """
+json_build_object(
+    'type', 'Feature',
+    'geometry', ST_AsGeoJSON({geometry})::json,
+    'properties', json_build_object(
+        'url', %s || dd_node_location.uuid::text || %s,
+        'id', dd_node_location.id,
+        'uuid', dd_node_location.uuid,
+        'name', dd_node_location.name,
+        'code', dd_node_location.code
+    )
+)::text
+"""
+
+
+def location_features_sql(queryset, url_prefix, url_suffix, srid=None):
+    """Return the (sql, params) that select a GeoJSON feature per location.
+
+    All filters and the ordering of the queryset are kept.
+
+    """
+    geometry = 'dd_node_location.geometry'
+    if srid is not None:
+        geometry = 'ST_Transform({}, {:d})'.format(geometry, srid)
+
+    features = queryset.extra(
+        select={'feature': LOCATION_FEATURE_SQL.format(geometry=geometry)},
+        select_params=(url_prefix, url_suffix),
+    ).values_list('feature', flat=True)
+    return features.query.sql_with_params()
+
+
+def stream_location_features(queryset, url_prefix, url_suffix, srid=None):
+    """Yield a GeoJSON FeatureCollection of locations in pieces.
+
+    Args:
+      queryset: filtered queryset of Location
+      url_prefix (str): part of the url of a location before its uuid
+      url_suffix (str): part of the url of a location after its uuid
+      srid (int): optional SRID to reproject the geometries to
+
+    """
+    sql, params = location_features_sql(
+        queryset, url_prefix, url_suffix, srid)
+
+    header = '{"type": "FeatureCollection", '
+    if srid is not None:
+        header += ('"crs": {{"type": "name", "properties": '
+                   '{{"name": "EPSG:{:d}"}}}}, ').format(srid)
+    header += '"features": ['
+
+    # Server-side cursors only live within a transaction.
+    with transaction.atomic():
+        connection.ensure_connection()
+        cursor = connection.connection.cursor(
+            name='geojson_{}'.format(uuid.uuid4().hex))
+        try:
+            cursor.execute(sql, params)
+            yield header
+            separator = ''
+            while True:
+                rows = cursor.fetchmany(FETCH_SIZE)
+                if not rows:
+                    break
+                yield separator + ','.join(row[0] for row in rows)
+                separator = ','
+            yield ']}'
+        finally:
+            cursor.close()
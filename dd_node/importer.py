@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+# (c) Nelen & Schuurmans, see LICENSE.rst.
+
+"""Incremental import of timeseries files from drop directories.
+
+Loggers and other systems drop files in FILE_IMPORT_DIRS. Every run of
+`import_files` (e.g. by the management command `importfiles`, every
+minute) scans these directories, compares the modification times of the
+files with the FileSource rows in a single query and imports only new and
+changed files, several at a time in a pool of processes. Afterwards, the
+FileSource rows of the imported files are created or updated in bulk.
+
+Files are imported by the function that FILE_IMPORTERS maps their extension
+to, which returns the number of events imported, or raises ValueError if
+(some of) the events of a file can not be stored. Such a file is recorded
+as failed and is not retried until it changes, so it is logged once. A file
+that fails to import for another reason, e.g. an unavailable database, is
+not recorded, so it is retried by the next run. Files that were modified
+less than FILE_IMPORT_MIN_AGE seconds ago may still be being written and are
+left for the next run.
+
+Files of the same timeseries may be imported at the same time: the array
+store serializes its writers and the start and end of a timeseries are only
+ever extended, see `Timeseries.set_array_events`.
+
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from collections import defaultdict
+from multiprocessing import Pool
+import csv
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.db import transaction
+import numpy as np
+
+from dd_node.models import FileSource
+from dd_node.models import Timeseries
+from dd_node.serializers.temporal import parse_datetime_param
+from dd_node.utils.conversion import class_for_name
+
+logger = logging.getLogger(__name__)
+
+IMPORT_DIRS = getattr(settings, 'FILE_IMPORT_DIRS', ())
+IMPORT_MIN_AGE = getattr(settings, 'FILE_IMPORT_MIN_AGE', 5)  # in seconds
+IMPORT_PROCESSES = getattr(settings, 'FILE_IMPORT_PROCESSES', 4)
+IMPORTERS = getattr(settings, 'FILE_IMPORTERS', {
+    '.csv': 'dd_node.importer.import_csv_file',
+    '.xml': 'dd_node.pixml.import_pi_xml_file',
+})
+
+# Result of `import_file` for a file that does not import until it changes.
+FAILED = 'failed'
+
+# Errors of files that do not import until they change: malformed content
+# (ElementTree.ParseError is a SyntaxError) or events that can not be stored.
+FILE_ERRORS = (ValueError, SyntaxError, csv.Error)
+
+UPDATE_SOURCES_SQL = """
+UPDATE dd_node_filesource f SET
+    mtime = source.mtime,
+    failed = source.failed
+FROM unnest(%(fullpaths)s, %(mtimes)s, %(failed)s)
+    AS source(fullpath, mtime, failed)
+WHERE f.fullpath = source.fullpath
+"""
+
+
+def store_events(timeseries, timestamps, values, flags=None):
+    """Store a batch of events of a timeseries.
+
+    Args:
+      timeseries: Timeseries
+      timestamps (array_like): (n, ) timestamps in ms
+      values (array_like): (n, m) values, with m = 1 for numeric timeseries
+      flags (array_like): optional (n, ) quality flags
+
+    Raises:
+      ValueError: if the events of the timeseries can not be stored, see
+        `Timeseries.set_array_events`.
+
+    """
+    timeseries.set_array_events(timestamps, values, flags)
+
+
+def import_csv_file(path):
+    """Import a CSV file with rows of a datetime, a timeseries UUID and one
+    or more values, like `dd_node.parsers.CSVParser`.
+
+    The events of all timeseries that can be stored are stored, before an
+    error about the others is raised.
+
+    Returns:
+      number of events imported
+
+    Raises:
+      ValueError: if timeseries of the file do not exist or their events
+        can not be stored.
+
+    """
+    rows = defaultdict(list)
+    with open(path, 'rb') as f:
+        for row in csv.reader(f):
+            if row:
+                rows[row[1]].append(row)
+
+    timeseries = {
+        str(ts.uuid): ts for ts in Timeseries.objects.filter(uuid__in=rows)}
+
+    count = 0
+    errors = []
+    for uuid, uuid_rows in rows.items():
+        if uuid not in timeseries:
+            errors.append("Timeseries {} does not exist.".format(uuid))
+            continue
+        timestamps = np.array(
+            [parse_datetime_param(row[0], 'timestamp') for row in uuid_rows],
+            dtype=np.int64)
+        values = np.array(
+            [[float(value) if value else np.nan for value in row[2:]]
+             for row in uuid_rows], dtype=np.float64)
+        try:
+            store_events(timeseries[uuid], timestamps, values)
+        except ValueError as e:
+            errors.append('{}'.format(e))
+            continue
+        count += len(timestamps)
+
+    if errors:
+        raise ValueError("{} events stored, but: {}".format(
+            count, ' '.join(errors)))
+    return count
+
+
+def scan(directories=IMPORT_DIRS):
+    """Return {path: mtime} of the files in directories, recursively."""
+    found = {}
+    for directory in directories:
+        for root, _, filenames in os.walk(directory):
+            for filename in filenames:
+                path = os.path.join(root, filename)
+                try:
+                    found[path] = int(os.path.getmtime(path))
+                except OSError:  # removed in the meantime
+                    pass
+    return found
+
+
+def files_to_import(found):
+    """Return {path: mtime} of the new and changed files of a scan.
+
+    Files are compared with the FileSource rows in a single query.
+
+    """
+    now = time.time()
+    found = {path: mtime for path, mtime in found.items()
+             if mtime <= now - IMPORT_MIN_AGE and
+             os.path.splitext(path)[1].lower() in IMPORTERS}
+    known = dict(FileSource.objects.filter(
+        fullpath__in=list(found)).values_list('fullpath', 'mtime'))
+    return {path: mtime for path, mtime in found.items()
+            if known.get(path, -1) != mtime}
+
+
+def import_file(path):
+    """Import a single file with the importer of its extension.
+
+    Returns:
+      number of events imported, FAILED if the file failed to import
+      until it changes (see FILE_ERRORS) or None if it is to be retried
+
+    """
+    try:
+        importer = class_for_name(
+            IMPORTERS[os.path.splitext(path)[1].lower()])
+        return importer(path)
+    except FILE_ERRORS as e:
+        logger.error("Import of %s failed, it is not retried until it "
+                     "changes: %s", path, e)
+        return FAILED
+    except Exception:
+        logger.exception("Import of %s failed.", path)
+        return None
+    finally:
+        # Every process has a database connection of its own.
+        connection.close()
+
+
+def record_imports(imported, failed=None):
+    """Create or update the FileSource rows of files in bulk.
+
+    Args:
+      imported (dict): {path: mtime} of the imported files
+      failed (dict): optional {path: mtime} of the files that failed to
+        import until they change
+
+    """
+    sources = {path: (mtime, False) for path, mtime in imported.items()}
+    sources.update(
+        (path, (mtime, True)) for path, mtime in (failed or {}).items())
+    if not sources:
+        return
+    with transaction.atomic():
+        known = set(FileSource.objects.filter(
+            fullpath__in=list(sources)).values_list('fullpath', flat=True))
+        FileSource.objects.bulk_create(
+            FileSource(fullpath=path, mtime=mtime, failed=is_failed)
+            for path, (mtime, is_failed) in sources.items()
+            if path not in known)
+        changed = [path for path in sources if path in known]
+        if changed:
+            connection.cursor().execute(UPDATE_SOURCES_SQL, {
+                'fullpaths': changed,
+                'mtimes': [sources[path][0] for path in changed],
+                'failed': [sources[path][1] for path in changed],
+            })
+
+
+def import_files(directories=IMPORT_DIRS, processes=IMPORT_PROCESSES):
+    """Import the new and changed files in directories.
+
+    Returns:
+      (number of files imported, number of events imported, number of
+      files that failed to import until they change)
+
+    """
+    paths = files_to_import(scan(directories))
+    if not paths:
+        return 0, 0, 0
+
+    # Forked processes must not share the connection of their parent.
+    connection.close()
+    pool = Pool(min(processes, len(paths)))
+    try:
+        results = dict(zip(
+            sorted(paths),
+            pool.map(import_file, sorted(paths), chunksize=1)))
+    finally:
+        pool.close()
+        pool.join()
+
+    imported, failed, events = {}, {}, 0
+    for path, count in results.items():
+        if count == FAILED:
+            failed[path] = paths[path]
+        elif count is not None:
+            imported[path] = paths[path]
+            events += count
+    record_imports(imported, failed)
+
+    return len(imported), events, len(failed)
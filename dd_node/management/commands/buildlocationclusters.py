@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+# (c) Nelen & Schuurmans, see LICENSE.rst.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from django.core.management.base import BaseCommand
+
+from dd_node.clusters import rebuild_location_clusters
+
+
+class Command(BaseCommand):
+    help = "Rebuild the precomputed clusters of locations of all zoom levels."
+
+    def handle(self, *args, **options):
+        rebuild_location_clusters()
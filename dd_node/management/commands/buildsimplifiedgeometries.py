@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+# (c) Nelen & Schuurmans, see LICENSE.rst.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from django.core.management.base import BaseCommand
+
+from dd_node.simplification import rebuild_simplified_geometries
+
+
+class Command(BaseCommand):
+    help = "Rebuild the simplified geometries of all locations."
+
+    def handle(self, *args, **options):
+        rebuild_simplified_geometries()
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+# (c) Nelen & Schuurmans, see LICENSE.rst.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from watson.management.commands import buildwatson
+
+from dd_node.search import bump_search_index_version
+
+
+class Command(buildwatson.Command):
+    """Watson's `buildwatson`, invalidating cached search results afterwards.
+
+    This command shadows the one of django-watson, because dd_node precedes
+    watson in INSTALLED_APPS.
+
+    """
+    def handle(self, *args, **options):
+        super(Command, self).handle(*args, **options)
+        bump_search_index_version()
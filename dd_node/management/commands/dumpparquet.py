@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+# (c) Nelen & Schuurmans, see LICENSE.rst.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from django.core.management.base import BaseCommand
+
+from dd_node.parquet import PARQUET_PROCESSES
+from dd_node.parquet import dump
+
+
+class Command(BaseCommand):
+    help = "Dump all timeseries and their events to Parquet files."
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory')
+        parser.add_argument(
+            '--processes', type=int, default=PARQUET_PROCESSES,
+            help="Number of timeseries to dump in parallel.")
+
+    def handle(self, *args, **options):
+        timeseries, events, skipped = dump(
+            options['directory'], processes=options['processes'])
+        self.stdout.write("Dumped {} timeseries with {} events.".format(
+            timeseries, events))
+        if skipped:
+            self.stderr.write(
+                "Only the metadata of {} text or file timeseries was "
+                "dumped: their events are not in the array store.".format(
+                    skipped))
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+# (c) Nelen & Schuurmans, see LICENSE.rst.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from django.core.management.base import BaseCommand
+
+from dd_node.importer import IMPORT_DIRS
+from dd_node.importer import IMPORT_PROCESSES
+from dd_node.importer import import_files
+
+
+class Command(BaseCommand):
+    help = ("Import new and changed timeseries files from the drop "
+            "directories (FILE_IMPORT_DIRS).")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'directories', nargs='*',
+            help="Directories to import from, instead of FILE_IMPORT_DIRS.")
+        parser.add_argument(
+            '--processes', type=int, default=IMPORT_PROCESSES,
+            help="Number of files to import in parallel.")
+
+    def handle(self, *args, **options):
+        files, events, failed = import_files(
+            options['directories'] or IMPORT_DIRS,
+            processes=options['processes'])
+        self.stdout.write("Imported {} files with {} events.".format(
+            files, events))
+        if failed:
+            self.stderr.write(
+                "{} files failed to import, they are not retried until they "
+                "change.".format(failed))
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+# (c) Nelen & Schuurmans, see LICENSE.rst.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from django.core.management.base import BaseCommand
+
+from dd_node.pixml import NaturalKeyMap
+from dd_node.pixml import SkippedSeriesError
+from dd_node.pixml import import_pi_xml
+
+
+class Command(BaseCommand):
+    help = "Import the timeseries of FEWS PI-XML files."
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+')
+
+    def handle(self, *args, **options):
+        keys = NaturalKeyMap()  # shared by the files
+        for path in options['paths']:
+            try:
+                events = import_pi_xml(path, keys)
+            except SkippedSeriesError as e:
+                events = e.count
+                self.stderr.write("Skipped series of {}: {}".format(
+                    path, ' '.join(e.skipped)))
+            self.stdout.write("Imported {} events from {}.".format(
+                events, path))
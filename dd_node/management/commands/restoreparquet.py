@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+# (c) Nelen & Schuurmans, see LICENSE.rst.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from django.core.management.base import BaseCommand
+
+from dd_node.parquet import PARQUET_PROCESSES
+from dd_node.parquet import restore
+
+
+class Command(BaseCommand):
+    help = "Restore timeseries and their events from a Parquet dump."
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory')
+        parser.add_argument(
+            '--processes', type=int, default=PARQUET_PROCESSES,
+            help="Number of timeseries to restore in parallel.")
+
+    def handle(self, *args, **options):
+        created, events = restore(
+            options['directory'], processes=options['processes'])
+        self.stdout.write("Created {} timeseries, restored {} events.".format(
+            created, events))
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dd_node', '0003_simplifiedgeometry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timeseries',
+            name='validate_max_hard',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='timeseries',
+            name='validate_max_soft',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='timeseries',
+            name='validate_min_hard',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='timeseries',
+            name='validate_min_soft',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dd_node', '0004_timeseries_validation_thresholds'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='filesource',
+            name='failed',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -16,3 +16,5 @@ class FileSource(BaseModel):
     """Stores properties about a time series file."""
     fullpath = models.CharField(max_length=256, unique=True)
     mtime = models.IntegerField(null=True)  # modification time
+    # Whether the file (at mtime) failed to import, see `dd_node.importer`.
+    failed = models.BooleanField(default=False)
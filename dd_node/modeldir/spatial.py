@@ -6,12 +6,18 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
+from multiprocessing.pool import ThreadPool
 import logging
 import uuid
 
+from django.conf import settings
 from django.contrib.gis.db import models
 from django.utils.translation import ugettext_lazy as _
 from json_field import JSONField
+import numpy as np
+
+from dd_node.utils.timeaxis import align_to_time_axis
+from dd_node.utils.timeaxis import unified_time_axis
 
 from .base import BaseModel
 from .base import ForceGeometry3DMixin
@@ -19,6 +25,10 @@ from .generic import Node, get_default_node
 
 WGS84 = 4326
 
+# Number of timeseries of a location that are read concurrently.
+TIMESERIES_READ_THREADS = getattr(
+    settings, 'LOCATION_TIMESERIES_READ_THREADS', 8)
+
 logger = logging.getLogger(__name__)
 
 
@@ -68,46 +78,73 @@ class Location(ForceGeometry3DMixin, BaseModel):
 
     extra_metadata = JSONField(_("Extra metadata"), null=True, blank=True)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the geometry as loaded from the database.
+
+        Signal receivers use it to find out where a location used to be,
+        e.g. to invalidate cached map tiles, without an extra query.
+
+        """
+        instance = super(Location, cls).from_db(db, field_names, values)
+        if 'geometry' in instance.__dict__:  # not deferred
+            instance._loaded_geometry = instance.geometry
+        return instance
+
+    def fetch_loaded_geometry(self):
+        """Fetch the stored geometry if it was not loaded.
+
+        E.g. when the geometry was deferred, or when a location with an
+        explicit primary key is saved without being loaded first.
+
+        """
+        if self.pk is not None and not hasattr(self, '_loaded_geometry'):
+            self._loaded_geometry = Location.objects.filter(
+                pk=self.pk).values_list('geometry', flat=True).first()
+
     def natural_key(self):
         return (self.uuid, )
 
+    def save(self, *args, **kwargs):
+        self.fetch_loaded_geometry()
+        super(Location, self).save(*args, **kwargs)
+        self._loaded_geometry = self.geometry
+
     def __unicode__(self):
         return self.name or self.uuid
 
-    def get_timeseries(self):
+    def get_timeseries(self, start=None, end=None):
         """
         Gather all timeseries data for this location and return it with a
         unified time dimension.
+
+        Every timeseries is read once, several at a time. The values of a
+        timeseries are None at timestamps where it has no event.
+
+        Args:
+          start: optional start of the events
+          end: optional end of the events
         """
-        timestamps = []
-        for timeseries in self.timeseries.all():
-            timestamps = timestamps + \
-                [instant['datetime']
-                    for instant in timeseries.get_events_raw()]
+        timeseries = list(self.timeseries.select_related('observation_type'))
+        events = _read_events(timeseries, start, end)
 
-        timestamps = sorted(set(timestamps))
+        axis = unified_time_axis([timestamps for timestamps, _ in events])
 
         response = [{
             'name': 'timestamp',
             'type': 'timestamp',
             'quantity': 'time',
             'unit': 'ms',
-            'data': timestamps
+            'data': axis.tolist()
         }]
 
-        for timeseries in self.timeseries.all():
-            data = dict([
-                        (instant['datetime'], instant['value'])
-                        for instant in timeseries.get_events_raw()
-                        ])
-            data = [data.get(timestamp, None) for timestamp in timestamps]
-
+        for ts, (timestamps, values) in zip(timeseries, events):
             response.append({
-                'name': timeseries.name,
-                'type': timeseries.get_value_type(),
-                'quantity': timeseries.parameter,
-                'unit': timeseries.unit,
-                'data': data
+                'name': ts.name,
+                'type': ts.get_value_type(),
+                'quantity': ts.parameter,
+                'unit': ts.unit,
+                'data': align_to_time_axis(axis, timestamps, values)
             })
 
         return response
@@ -119,3 +156,92 @@ class Location(ForceGeometry3DMixin, BaseModel):
             return obj.number_of_values_per_timestamp
         else:
             return 1
+
+
+def _read_events(timeseries, start, end):
+    """Return the (timestamps, values) of several timeseries.
+
+    Numeric timeseries are read with `Timeseries.get_events_raw` and float
+    array timeseries from their array store, several timeseries at a time.
+    There is no store for the events of text and file timeseries, so they
+    have no values here.
+
+    """
+    def read(ts):
+        if ts.is_numeric:
+            events = ts.get_events_raw(start, end)
+            return (np.array([event['datetime'] for event in events],
+                             dtype=np.int64),
+                    np.array([event['value'] for event in events],
+                             dtype=np.float64))
+        if ts.value_type != ts.ValueType.FLOAT_ARRAY:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        timestamps, values, _ = ts.array_store.read(start, end)
+        return timestamps, values
+
+    if len(timeseries) <= 1:
+        return [read(ts) for ts in timeseries]
+
+    pool = ThreadPool(min(TIMESERIES_READ_THREADS, len(timeseries)))
+    try:
+        return pool.map(read, timeseries)
+    finally:
+        pool.close()
+
+
+class LocationCluster(BaseModel):
+    """Aggregate of the locations in a grid cell at a zoom level.
+
+    The cells at a zoom level are the tiles at a deeper zoom level, see
+    `dd_node.clusters`. Together, the clusters of all zoom levels form a
+    hierarchical grid index over (the centroids of) Location.geometry.
+
+    """
+    zoom = models.SmallIntegerField()
+    cell_x = models.IntegerField()
+    cell_y = models.IntegerField()
+
+    count = models.IntegerField(default=0)
+
+    # Sums of coordinates, to calculate the centroid of a cluster:
+    sum_lon = models.FloatField(default=0)
+    sum_lat = models.FloatField(default=0)
+
+    # Bounding box of (the centroids of) the locations of a cluster:
+    min_lon = models.FloatField()
+    min_lat = models.FloatField()
+    max_lon = models.FloatField()
+    max_lat = models.FloatField()
+
+    class Meta(BaseModel.Meta):
+        unique_together = ('zoom', 'cell_x', 'cell_y')
+
+    @property
+    def centroid(self):
+        return (self.sum_lon / self.count, self.sum_lat / self.count)
+
+    @property
+    def extent(self):
+        return (self.min_lon, self.min_lat, self.max_lon, self.max_lat)
+
+
+class SimplifiedGeometry(BaseModel):
+    """Location.geometry simplified for display at a zoom level.
+
+    Simplified geometries are maintained when locations are saved, see
+    `dd_node.simplification`. A location has none for the zoom levels at
+    which simplification does not remove any vertex, e.g. for points.
+
+    """
+    location = models.ForeignKey(
+        Location,
+        related_name='simplified_geometries',
+        on_delete=models.CASCADE,
+    )
+
+    zoom = models.SmallIntegerField()
+
+    geometry = models.GeometryField(srid=WGS84)
+
+    class Meta(BaseModel.Meta):
+        unique_together = ('location', 'zoom')
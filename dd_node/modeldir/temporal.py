@@ -7,27 +7,41 @@ from __future__ import print_function
 from __future__ import unicode_literals
 
 import logging
+import os
 import time
 import uuid
 
+from django.conf import settings
 from django.contrib.gis.db import models
 from django.core.cache import cache
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Greatest, Least
 from django.utils.functional import cached_property
 from django.utils.translation import ugettext_lazy as _
 from json_field import JSONField
 from tls import request
+import numpy as np
+import pytz
 
+from dd_node.blobstore import FileEvents
+from dd_node.blobstore import blob_path
+from dd_node.blobstore import put_blob
+from dd_node.eventstore import ArrayStore
 from dd_node.exceptions import EnhanceYourCalm
 from dd_node.models import BaseModel
 from dd_node.models import Location
 from dd_node.models import Node, get_default_node
 from dd_node.models import ParameterReferencedUnit, DataSource
+from dd_node.utils.conversion import timestamp_ms_as_datetime
 
 
 logger = logging.getLogger(__name__)
 
 PRU_PREFIXES = ['WNS', 'HCT', 'FCT', 'GWm']
 
+# Minimal number of seconds between two looks at a lock in the cache.
+LOCK_CHECK_INTERVAL = getattr(settings, 'TIMESERIES_LOCK_CHECK_INTERVAL', 1)
+
 
 class TimeseriesType(BaseModel):
     code = models.CharField(
@@ -45,6 +59,7 @@ class Timeseries(BaseModel):
 
     _lock_key = None
     _now = None
+    _lock_checked = None
 
     class ValueType:
         INTEGER = 0
@@ -169,6 +184,12 @@ class Timeseries(BaseModel):
 
     extra_metadata = JSONField(_("Extra metadata"), null=True)
 
+    # Validation thresholds, see `validate`.
+    validate_min_hard = models.FloatField(null=True, blank=True)
+    validate_min_soft = models.FloatField(null=True, blank=True)
+    validate_max_soft = models.FloatField(null=True, blank=True)
+    validate_max_hard = models.FloatField(null=True, blank=True)
+
     class Meta(BaseModel.Meta):
         unique_together = (("location", "code"))
         verbose_name = _("Timeseries")
@@ -180,10 +201,23 @@ class Timeseries(BaseModel):
     def natural_key(self):
         return (self.uuid, )
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the location as loaded from the database.
+
+        Signal receivers use it to find out whether a timeseries moved to
+        another location, see `dd_node.signals`.
+
+        """
+        instance = super(Timeseries, cls).from_db(db, field_names, values)
+        instance._loaded_location_id = instance.__dict__.get('location_id')
+        return instance
+
     def save(self, *args, **kwargs):
         """Update num_timeseries of object on save.
         """
         super(Timeseries, self).save(*args, **kwargs)
+        self._loaded_location_id = self.location_id
         try:
             self.location.object.update_num_timeseries()
         except AttributeError:
@@ -211,8 +245,9 @@ class Timeseries(BaseModel):
 
     @cached_property
     def number_of_values_per_timestamp(self):
+        """The number of values per timestamp of the stored events."""
         return (1 if self.value_type != Timeseries.ValueType.FLOAT_ARRAY
-                else self.location.number_of_values_per_timestamp)
+                else self.array_store.width())
 
     @cached_property
     def is_file(self):
@@ -222,6 +257,201 @@ class Timeseries(BaseModel):
             Timeseries.ValueType.FILE
         )
 
+    @cached_property
+    def has_array_store(self):
+        """Whether the events are stored in the array store.
+
+        Those of float array timeseries are, as are those of numeric
+        timeseries, with a single value per timestamp. There is no store
+        for the events of text timeseries.
+
+        """
+        return (self.is_numeric or
+                self.value_type == Timeseries.ValueType.FLOAT_ARRAY)
+
+    @cached_property
+    def array_store(self):
+        return ArrayStore(self.uuid)
+
+    def get_events_raw(self, start=None, end=None):
+        """Return the events of a numeric timeseries.
+
+        Args:
+          start (int): optional start in ms, inclusive
+          end (int): optional end in ms, inclusive
+
+        Returns:
+          list of dicts with a datetime (ms) and a value, which is None
+          if it is missing
+
+        """
+        if not self.is_numeric:
+            raise ValueError("Timeseries {} is not numeric.".format(
+                self.uuid))
+        timestamps, values, _ = self.array_store.read(
+            start, end, checkpoint=self.check_lock)
+        return [
+            {'datetime': timestamp,
+             'value': None if value != value else value}  # NaN
+            for timestamp, value in zip(
+                timestamps.tolist(), values.reshape(-1).tolist())
+        ]
+
+    def get_array_events(self, start=None, end=None, positions=None,
+                         max_flag=None, unvalidated=False):
+        """Return the events of a float array timeseries.
+
+        Only the requested time range and range of positions, and the
+        events with a matching flag, are read.
+
+        Args:
+          start (int): optional start in ms, inclusive
+          end (int): optional end in ms, inclusive
+          positions (slice): optional range of positions
+          max_flag (int): optional, only events with a flag <= max_flag
+          unvalidated (bool): whether events that have not been validated
+            (QualityFlag.NONE) pass max_flag, False by default
+
+        Returns:
+          list of dicts with a timestamp (ms), a list of values and a
+          quality flag
+
+        """
+        timestamps, values, flags = self.array_store.read(
+            start, end, positions, max_flag, checkpoint=self.check_lock,
+            unvalidated=unvalidated)
+        return [
+            {'timestamp': timestamp, 'value': value, 'flag': flag}
+            for timestamp, value, flag in zip(
+                timestamps.tolist(), values.tolist(), flags.tolist())
+        ]
+
+    def get_array_aggregates(self, start=None, end=None, positions=None,
+                             max_flag=None, unvalidated=False):
+        """Return aggregates of a float array timeseries per quality flag.
+
+        See `get_array_events` for the arguments and
+        `dd_node.eventstore.ArrayStore.aggregate` for the aggregates.
+
+        """
+        return self.array_store.aggregate(
+            start, end, positions, max_flag, checkpoint=self.check_lock,
+            unvalidated=unvalidated)
+
+    def set_array_events(self, timestamps, values, flags=None):
+        """Validate and store events in the array store.
+
+        Args:
+          timestamps (array_like): (n, ) timestamps in ms
+          values (array_like): (n, m) values, or (n, ) values of a numeric
+            timeseries
+          flags (array_like): optional (n, ) quality flags, e.g. of events
+            that were validated before; the events are validated if absent
+
+        Raises:
+          ValueError: if the events of the timeseries cannot be stored,
+            see `has_array_store`, or do not fit the stored events
+
+        """
+        if not self.has_array_store:
+            raise ValueError(
+                "Cannot store the events of {} timeseries {}.".format(
+                    self.get_value_type(), self.uuid))
+        if not len(timestamps):
+            return
+
+        values = np.asarray(values, dtype=np.float64)
+        if self.is_numeric:
+            if values.ndim == 1:
+                values = values[:, np.newaxis]
+            if values.ndim != 2 or values.shape[1] != 1:
+                raise ValueError("Expected a single value per timestamp.")
+
+        if flags is None:
+            flags = self.validate(values)
+        self.array_store.write(timestamps, values, flags)
+
+        last_value = None
+        if self.is_numeric:
+            last_value = values[np.argmax(timestamps), 0]
+            last_value = None if np.isnan(last_value) else float(last_value)
+
+        first = timestamp_ms_as_datetime(min(timestamps))
+        last = timestamp_ms_as_datetime(max(timestamps))
+        self._extend_period(
+            first.replace(tzinfo=pytz.UTC), last.replace(tzinfo=pytz.UTC),
+            last_value)
+
+    def _extend_period(self, first, last, last_value=None):
+        """Extend start and end to include first and last.
+
+        A single UPDATE with LEAST and GREATEST (which ignore NULL in
+        PostgreSQL) never moves start or end back, even if several
+        processes store events of the timeseries at the same time. The
+        last value of a numeric timeseries is updated in the same UPDATE
+        if the end moves (all expressions see the old end).
+
+        """
+        updates = {
+            'start': Least(
+                'start', Value(first, output_field=models.DateTimeField())),
+            'end': Greatest(
+                'end', Value(last, output_field=models.DateTimeField())),
+        }
+        fields = ['start', 'end']
+        if self.is_numeric:
+            updates['last_value_decimal'] = Case(
+                When(Q(end__isnull=True) | Q(end__lte=last),
+                     then=Value(last_value)),
+                default=F('last_value_decimal'),
+                output_field=models.FloatField(),
+            )
+            fields.append('last_value_decimal')
+        Timeseries.objects.filter(pk=self.pk).update(**updates)
+        self.refresh_from_db(fields=fields)
+
+    @cached_property
+    def file_events(self):
+        return FileEvents(self.uuid)
+
+    def get_file_events(self, start=None, end=None):
+        """Return the events of a file timeseries.
+
+        Timeseries without files in the blob store fall back to
+        `get_events`.
+
+        Args:
+          start (int): optional start in ms, inclusive
+          end (int): optional end in ms, inclusive
+
+        Returns:
+          list of dicts with a timestamp (ms)
+
+        """
+        if not self.file_events.exists():
+            return self.get_events(start=start, end=end)
+        return [{'timestamp': timestamp}
+                for timestamp in self.file_events.timestamps(
+                    start, end, checkpoint=self.check_lock)]
+
+    def set_file(self, timestamp, content, content_type=None):
+        """Store the file of the event at a timestamp.
+
+        Files are stored once per content, see `dd_node.blobstore`.
+
+        Args:
+          timestamp (int): timestamp in ms
+          content: bytes or a file-like object
+          content_type (str): optional MIME type of the content
+
+        """
+        digest = put_blob(content)
+        size = os.path.getsize(blob_path(digest))
+        self.file_events.put(timestamp, digest, content_type, size)
+
+        dt = timestamp_ms_as_datetime(timestamp).replace(tzinfo=pytz.UTC)
+        self._extend_period(dt, dt)
+
     @property
     def parameter(self):
         return getattr(
@@ -249,8 +479,16 @@ class Timeseries(BaseModel):
         return self.extra_metadata.get('linked', False)
 
     def lock(self):
-        if hasattr(request, 'session'):
-            session = request.session.session_key
+        """Take the lock of the timeseries for the session of the request.
+
+        Requests without a session key, e.g. anonymous or token
+        authenticated ones, are not locked: they would share a single key
+        and abort each other.
+
+        """
+        session = getattr(getattr(request, 'session', None), 'session_key',
+                          None)
+        if session is not None:
             self._lock_key = 'lock_{}_timeseries_{}'.format(session, self.uuid)
             self._now = time.time()
             cache.set(self._lock_key, self._now, 120)
@@ -263,6 +501,73 @@ class Timeseries(BaseModel):
             return True
         raise EnhanceYourCalm("Aborted, in favour of a younger request.")
 
+    def check_lock(self):
+        """Abort if a younger request took the lock.
+
+        Cheap enough to call for every chunk of events read: the cache is
+        consulted at most once per LOCK_CHECK_INTERVAL seconds.
+
+        Raises:
+          EnhanceYourCalm: if the lock was taken by a younger request.
+
+        """
+        if self._lock_key is None:
+            return
+        now = time.time()
+        if (self._lock_checked is not None and
+                now - self._lock_checked < LOCK_CHECK_INTERVAL):
+            return
+        self._lock_checked = now
+        self.has_lock
+
+    @property
+    def thresholds(self):
+        return (self.validate_min_hard, self.validate_min_soft,
+                self.validate_max_soft, self.validate_max_hard)
+
+    def validate(self, values):
+        """Return the quality flags of a batch of events.
+
+        Values beyond a hard threshold are unreliable, values beyond a soft
+        threshold doubtful and other values reliable. An event with several
+        values gets the worst flag of its values. Events are not flagged if
+        all of their values are NaN, or if the thresholds are missing or
+        insane.
+
+        Args:
+          values (array_like): (n, ) values or (n, m) values, m per event
+
+        Returns:
+          (n, ) int8 array of quality flags
+
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if values.ndim == 1:
+            values = values[:, np.newaxis]
+
+        flags = np.full(len(values), Timeseries.QualityFlag.NONE,
+                        dtype=np.int8)
+
+        if not self.__can_validate(self.thresholds):
+            return flags
+
+        flags[~np.isnan(values).all(axis=1)] = Timeseries.QualityFlag.RELIABLE
+
+        # Ordered by flag, so that the worst flag is assigned last.
+        min_hard, min_soft, max_soft, max_hard = self.thresholds
+        checks = (
+            (np.less, min_soft, Timeseries.QualityFlag.DOUBTFUL),
+            (np.greater, max_soft, Timeseries.QualityFlag.DOUBTFUL),
+            (np.less, min_hard, Timeseries.QualityFlag.UNRELIABLE),
+            (np.greater, max_hard, Timeseries.QualityFlag.UNRELIABLE),
+        )
+        with np.errstate(invalid='ignore'):  # NaN compares False anyway
+            for compare, threshold, flag in checks:
+                if threshold is not None:
+                    flags[compare(values, threshold).any(axis=1)] = flag
+
+        return flags
+
     @staticmethod
     def __can_validate(thresholds):
         """Check validation thresholds.
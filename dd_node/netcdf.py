@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+# (c) Nelen & Schuurmans, see LICENSE.rst.
+
+"""Export of timeseries to NetCDF4.
+
+The file follows the CF conventions for discrete sampling geometries
+(featureType timeSeries), as contiguous ragged arrays: the events of all
+numeric timeseries are concatenated along the `obs` dimension and
+`row_size` has the number of events per timeseries (station). This lets
+every timeseries be appended a chunk of events at a time, without a common
+time axis.
+
+Float array timeseries have their own ragged array, with `array_time` and
+`array_value` along the `array_obs` dimension and `array_row_size`, and
+their values along the `position` dimension. Its size is the largest
+number of positions of the float array timeseries, so that the values of
+numeric timeseries take a single value each.
+
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import logging
+
+from netCDF4 import Dataset
+import numpy as np
+
+from dd_node.exports import iter_event_arrays
+
+logger = logging.getLogger(__name__)
+
+NETCDF_CONTENT_TYPE = 'application/x-netcdf4'
+TIME_UNITS = 'milliseconds since 1970-01-01 00:00:00 UTC'
+
+
+def _add_station_variable(dataset, name, values, **attributes):
+    variable = dataset.createVariable(name, str, ('station', ))
+    for index, value in enumerate(values):
+        variable[index] = '' if value is None else '{}'.format(value)
+    variable.setncatts(attributes)
+
+
+def _add_ragged_array(dataset, prefix, dimension, positions, units):
+    """Add a contiguous ragged array of events.
+
+    Returns:
+      the row_size, time and value variables
+
+    """
+    dataset.createDimension(dimension, None)
+
+    row_size = dataset.createVariable(
+        prefix + 'row_size', 'i4', ('station', ))
+    row_size.setncatts({
+        'long_name': "number of events per timeseries",
+        'sample_dimension': dimension,
+    })
+
+    time = dataset.createVariable(prefix + 'time', 'i8', (dimension, ))
+    time.setncatts({
+        'standard_name': 'time',
+        'units': TIME_UNITS,
+        'calendar': 'standard',
+    })
+
+    value = dataset.createVariable(
+        prefix + 'value', 'f8', (dimension, ) + positions, fill_value=np.nan)
+    value.setncatts({
+        'long_name': "value",
+        'coordinates': '{}time lat lon'.format(prefix),
+    })
+    if len(units) == 1 and None not in units:
+        value.units = next(iter(units))
+
+    return row_size, time, value
+
+
+def write_timeseries_netcdf(path, timeseries, start=None, end=None):
+    """Write the events of numeric and float array timeseries to NetCDF4.
+
+    Args:
+      path (str): path of the file
+      timeseries: iterable of Timeseries
+      start (int): optional start in ms, inclusive
+      end (int): optional end in ms, inclusive
+
+    Returns:
+      number of events written
+
+    """
+    timeseries = list(timeseries)
+    locations = [ts.location for ts in timeseries]
+    is_array = [ts.value_type == ts.ValueType.FLOAT_ARRAY
+                for ts in timeseries]
+    positions = max([ts.array_store.width(start, end)
+                     for ts, array in zip(timeseries, is_array) if array] or
+                    [0])
+    units = set(ts.unit for ts in timeseries)
+
+    dataset = Dataset(path, 'w', format='NETCDF4')
+    try:
+        dataset.setncatts({
+            'Conventions': 'CF-1.6',
+            'featureType': 'timeSeries',
+        })
+        dataset.createDimension('station', len(timeseries))
+
+        _add_station_variable(
+            dataset, 'station_id', [ts.uuid for ts in timeseries],
+            cf_role='timeseries_id', long_name="UUID of the timeseries")
+        _add_station_variable(
+            dataset, 'station_name', [ts.name for ts in timeseries],
+            long_name="name of the timeseries")
+        _add_station_variable(
+            dataset, 'location_code', [loc.code for loc in locations],
+            long_name="code of the location")
+        _add_station_variable(
+            dataset, 'location_name', [loc.name for loc in locations],
+            long_name="name of the location")
+        _add_station_variable(
+            dataset, 'parameter', [ts.parameter for ts in timeseries],
+            long_name="observed parameter")
+        _add_station_variable(
+            dataset, 'unit', [ts.unit for ts in timeseries],
+            long_name="unit of the observed parameter")
+
+        centroids = [
+            loc.geometry.centroid
+            if loc.geometry is not None and not loc.geometry.empty else None
+            for loc in locations
+        ]
+        for name, axis, attributes in (
+                ('lon', 'x', {'standard_name': 'longitude',
+                              'units': 'degrees_east'}),
+                ('lat', 'y', {'standard_name': 'latitude',
+                              'units': 'degrees_north'})):
+            variable = dataset.createVariable(
+                name, 'f8', ('station', ), fill_value=np.nan)
+            variable.setncatts(attributes)
+            variable[:] = [np.nan if c is None else getattr(c, axis)
+                           for c in centroids]
+
+        ragged = {
+            False: _add_ragged_array(dataset, '', 'obs', (), units),
+        }
+        if any(is_array):
+            dataset.createDimension('position', positions)
+            ragged[True] = _add_ragged_array(
+                dataset, 'array_', 'array_obs', ('position', ), units)
+
+        # A timeseries has no events in the other ragged array.
+        for row_size, _, _ in ragged.values():
+            row_size[:] = np.zeros(len(timeseries), dtype=np.int32)
+
+        counts = {array: 0 for array in ragged}
+        for index, (ts, array) in enumerate(zip(timeseries, is_array)):
+            row_size, time, value = ragged[array]
+            first = obs = counts[array]
+            for timestamps, values in iter_event_arrays(ts, start, end):
+                last = obs + len(timestamps)
+                time[obs:last] = timestamps
+                if array:
+                    value[obs:last, :values.shape[1]] = values
+                else:
+                    value[obs:last] = values[:, 0]
+                obs = last
+            row_size[index] = obs - first
+            counts[array] = obs
+
+        return sum(counts.values())
+    finally:
+        dataset.close()
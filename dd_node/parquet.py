@@ -0,0 +1,357 @@
+# -*- coding: utf-8 -*-
+# (c) Nelen & Schuurmans, see LICENSE.rst.
+
+"""Bulk dump and restore of timeseries to and from Parquet.
+
+A dump is a directory with the metadata of all timeseries in a single file
+and their events partitioned by node and year:
+
+    <directory>/timeseries.parquet
+    <directory>/events/node=<node>/year=<year>/<uuid>.parquet
+
+Event files have an int64 `timestamp` (ms), a float64 `value` (a list of
+values for float array timeseries) and an int8 `flag` column. They are
+written a chunk of events at a time, as row groups, and timeseries are
+dumped and restored in parallel by a pool of processes.
+
+The events of numeric and float array timeseries are dumped from and
+restored to the array store, with their flags. Text and file timeseries
+have no events in the array store: only their metadata is dumped, and
+`dump` reports how many of them there are. Restored timeseries are matched
+by UUID; missing ones are created if their location and node (also matched
+by UUID) exist.
+
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from multiprocessing import Pool
+import glob
+import json
+import logging
+import os
+
+from django.conf import settings
+from django.db import connection
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytz
+
+from dd_node.models import DataSource
+from dd_node.models import Location
+from dd_node.models import Node
+from dd_node.models import ParameterReferencedUnit
+from dd_node.models import Timeseries
+from dd_node.models import TimeseriesType
+from dd_node.utils.conversion import datetime_to_milliseconds
+from dd_node.utils.conversion import timestamp_ms_as_datetime
+
+logger = logging.getLogger(__name__)
+
+PARQUET_PROCESSES = getattr(settings, 'PARQUET_PROCESSES', 4)
+
+METADATA_FILE = 'timeseries.parquet'
+EVENTS_DIR = 'events'
+
+
+def _ms(dt):
+    return None if dt is None else datetime_to_milliseconds(dt)
+
+
+def _datetime(ms):
+    if ms is None:
+        return None
+    return timestamp_ms_as_datetime(ms).replace(tzinfo=pytz.UTC)
+
+
+def _code(obj):
+    return getattr(obj, 'code', None)
+
+
+def timeseries_metadata(timeseries):
+    """Return a row of metadata of a timeseries, with natural keys."""
+    return {
+        'uuid': str(timeseries.uuid),
+        'node': timeseries.node_id,
+        'node_uuid': str(timeseries.node.uuid),
+        'location_uuid': str(timeseries.location.uuid),
+        'code': timeseries.code,
+        'name': timeseries.name,
+        'description': timeseries.description,
+        'value_type': timeseries.value_type,
+        'observation_type_code': _code(timeseries.observation_type),
+        'timeseries_type_code': _code(timeseries.timeseries_type),
+        'datasource_uuid': (str(timeseries.datasource.uuid)
+                            if timeseries.datasource else None),
+        'device': timeseries.device,
+        'interval': timeseries.interval,
+        'start': _ms(timeseries.start),
+        'end': _ms(timeseries.end),
+        'validate_min_hard': timeseries.validate_min_hard,
+        'validate_min_soft': timeseries.validate_min_soft,
+        'validate_max_soft': timeseries.validate_max_soft,
+        'validate_max_hard': timeseries.validate_max_hard,
+        'extra_metadata': json.dumps(timeseries.extra_metadata),
+    }
+
+
+def _events_table(timestamps, values, flags, is_array):
+    if is_array:
+        n, m = values.shape
+        offsets = np.arange(0, n * m + 1, m, dtype=np.int32)
+        value = pa.ListArray.from_arrays(
+            pa.array(offsets), pa.array(values.ravel()))
+    else:
+        value = pa.array(values[:, 0])
+    return pa.Table.from_arrays(
+        [pa.array(timestamps), value, pa.array(flags)],
+        ['timestamp', 'value', 'flag'])
+
+
+def _years(timestamps):
+    return (timestamps.astype('datetime64[ms]').astype('datetime64[Y]')
+            .astype(np.int64) + 1970)
+
+
+def dump_events(uuid, directory):
+    """Dump the events of a timeseries, a file per year.
+
+    Returns:
+      number of events dumped, None if the events of the timeseries are
+      not in the array store
+
+    """
+    timeseries = Timeseries.objects.get(uuid=uuid)
+    if not timeseries.has_array_store:
+        return None
+    is_array = timeseries.value_type == Timeseries.ValueType.FLOAT_ARRAY
+
+    count = 0
+    writers = {}
+    try:
+        for timestamps, values, flags in (
+                timeseries.array_store.iter_chunks()):
+            years = _years(timestamps)
+            for year in np.unique(years).tolist():
+                mask = years == year
+                table = _events_table(
+                    timestamps[mask], values[mask], flags[mask], is_array)
+                if year not in writers:
+                    path = os.path.join(
+                        directory, EVENTS_DIR,
+                        'node={}'.format(timeseries.node_id),
+                        'year={}'.format(year), '{}.parquet'.format(uuid))
+                    if not os.path.isdir(os.path.dirname(path)):
+                        try:
+                            os.makedirs(os.path.dirname(path))
+                        except OSError:  # made by another process
+                            pass
+                    writers[year] = pq.ParquetWriter(path, table.schema)
+                writers[year].write_table(table)
+                count += int(mask.sum())
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    return count
+
+
+def _dump_events(args):
+    try:
+        return dump_events(*args)
+    finally:
+        connection.close()
+
+
+def dump_metadata(directory):
+    """Dump the metadata of all timeseries.
+
+    Returns:
+      the rows of metadata, see `timeseries_metadata`
+
+    """
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    queryset = Timeseries.objects.select_related(
+        'node', 'location', 'observation_type', 'timeseries_type',
+        'datasource')
+    rows = [timeseries_metadata(ts) for ts in queryset.iterator()]
+    columns = sorted(rows[0]) if rows else ['uuid']
+    table = pa.Table.from_arrays(
+        [pa.array([row[column] for row in rows]) for column in columns],
+        columns)
+    pq.write_table(table, os.path.join(directory, METADATA_FILE))
+    return rows
+
+
+def dump(directory, processes=PARQUET_PROCESSES):
+    """Dump the metadata and events of all timeseries to a directory.
+
+    Returns:
+      (number of timeseries, number of events, number of timeseries of
+      which only the metadata was dumped)
+
+    """
+    rows = dump_metadata(directory)
+
+    # Forked processes must not share the connection of their parent.
+    connection.close()
+    pool = Pool(processes)
+    try:
+        counts = pool.map(
+            _dump_events, [(row['uuid'], directory) for row in rows],
+            chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+    skipped = counts.count(None)
+    if skipped:
+        logger.warning("Only the metadata of %s text or file timeseries "
+                       "was dumped.", skipped)
+    return len(rows), sum(count or 0 for count in counts), skipped
+
+
+def _by_field(model, field, values):
+    """Return {value of field: object} of the objects with those values."""
+    values = set(value for value in values if value is not None)
+    return {
+        '{}'.format(getattr(obj, field)): obj
+        for obj in model.objects.filter(**{field + '__in': values})
+    }
+
+
+def restore_metadata(directory):
+    """Create the timeseries of a dump that do not exist yet.
+
+    Returns:
+      number of timeseries created
+
+    """
+    columns = pq.read_table(os.path.join(directory, METADATA_FILE)).to_pydict()
+    rows = [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+    existing = set('{}'.format(uuid) for uuid in Timeseries.objects.filter(
+        uuid__in=[row['uuid'] for row in rows]).values_list('uuid', flat=True))
+    rows = [row for row in rows if row['uuid'] not in existing]
+
+    nodes = _by_field(Node, 'uuid', [row.get('node_uuid') for row in rows])
+    locations = _by_field(
+        Location, 'uuid', [row['location_uuid'] for row in rows])
+    observation_types = _by_field(
+        ParameterReferencedUnit, 'code',
+        [row['observation_type_code'] for row in rows])
+    timeseries_types = _by_field(
+        TimeseriesType, 'code', [row['timeseries_type_code'] for row in rows])
+    datasources = _by_field(
+        DataSource, 'uuid', [row['datasource_uuid'] for row in rows])
+
+    created = []
+    for row in rows:
+        location = locations.get(row['location_uuid'])
+        if location is None:
+            logger.warning("Location %s of timeseries %s does not exist.",
+                           row['location_uuid'], row['uuid'])
+            continue
+        node = nodes.get(row.get('node_uuid'))
+        if node is None:
+            logger.warning("Node %s of timeseries %s does not exist.",
+                           row.get('node_uuid'), row['uuid'])
+            continue
+        created.append(Timeseries(
+            uuid=row['uuid'],
+            node=node,
+            location=location,
+            code=row['code'],
+            name=row['name'],
+            description=row['description'],
+            value_type=int(row['value_type']),
+            observation_type=observation_types.get(
+                row['observation_type_code']),
+            timeseries_type=timeseries_types.get(
+                row['timeseries_type_code']),
+            datasource=datasources.get(row['datasource_uuid']),
+            device=row['device'] or '',
+            interval=(None if row['interval'] is None
+                      else int(row['interval'])),
+            start=_datetime(row['start']),
+            end=_datetime(row['end']),
+            validate_min_hard=row['validate_min_hard'],
+            validate_min_soft=row['validate_min_soft'],
+            validate_max_soft=row['validate_max_soft'],
+            validate_max_hard=row['validate_max_hard'],
+            extra_metadata=json.loads(row['extra_metadata']),
+        ))
+
+    Timeseries.objects.bulk_create(created)
+    return len(created)
+
+
+def restore_events(uuid, paths):
+    """Load the events of a timeseries from its files of a dump.
+
+    Returns:
+      number of events restored
+
+    """
+    try:
+        timeseries = Timeseries.objects.get(uuid=uuid)
+    except Timeseries.DoesNotExist:
+        logger.warning("Timeseries %s does not exist.", uuid)
+        return 0
+
+    count = 0
+    for path in paths:
+        parquet_file = pq.ParquetFile(path)
+        for index in range(parquet_file.num_row_groups):
+            table = parquet_file.read_row_group(index)
+            if not table.num_rows:
+                continue
+            timestamps = np.array(
+                table.column('timestamp').to_pylist(), dtype=np.int64)
+            flags = np.array(table.column('flag').to_pylist(), dtype=np.int8)
+            # (n, ) values of a numeric or (n, m) of a float array timeseries
+            values = np.array(
+                table.column('value').to_pylist(), dtype=np.float64)
+            timeseries.set_array_events(timestamps, values, flags)
+            count += len(timestamps)
+    return count
+
+
+def _restore_events(args):
+    try:
+        return restore_events(*args)
+    finally:
+        connection.close()
+
+
+def restore(directory, processes=PARQUET_PROCESSES):
+    """Restore the metadata and events of the timeseries of a dump.
+
+    Returns:
+      (number of timeseries created, number of events restored)
+
+    """
+    created = restore_metadata(directory)
+
+    paths = {}
+    for path in sorted(glob.glob(os.path.join(
+            directory, EVENTS_DIR, 'node=*', 'year=*', '*.parquet'))):
+        uuid = os.path.basename(path)[:-len('.parquet')]
+        paths.setdefault(uuid, []).append(path)
+
+    # Forked processes must not share the connection of their parent.
+    connection.close()
+    pool = Pool(processes)
+    try:
+        counts = pool.map(_restore_events, sorted(paths.items()), chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+    return created, sum(counts)
@@ -11,6 +11,8 @@ import logging
 
 from rest_framework.parsers import BaseParser, DataAndFiles, MultiPartParser
 
+from dd_node.blobstore import SpooledFile
+
 logger = logging.getLogger(__name__)
 
 
@@ -27,6 +29,22 @@ class SimpleFileUploadParser(BaseParser):
         return DataAndFiles({}, {'file': content})
 
 
+class StreamingFileUploadParser(SimpleFileUploadParser):
+    """
+    A raw file upload parser that does not read the upload into memory.
+
+    The upload is spooled in chunks to a temporary file in UPLOAD_DIR and
+    hashed along the way. The blob store moves it into place, see
+    `dd_node.blobstore.SpooledFile`.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        logger.debug("Spooling file")
+        spooled = SpooledFile(stream)
+
+        return DataAndFiles({}, {'file': spooled})
+
+
 class CSVParser(BaseParser):
     """
     A csv file upload parser.
@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+# (c) Nelen & Schuurmans, see LICENSE.rst.
+
+"""Streaming import of FEWS PI-XML timeseries.
+
+A PI-XML file is parsed with iterparse, a <series> element at a time, and
+every element is cleared once it is read, so memory use does not depend on
+the size of the file. The header of a series is resolved to a Timeseries by
+its natural key: the locationId is the code of the location and the
+parameterId the code of the timeseries. Timeseries are looked up per
+location, once per import.
+
+Events are collected in preallocated numpy columns of BATCH_SIZE events,
+which are stored a batch at a time. PI flags are mapped to quality flags:
+0-2 (reliable) to RELIABLE, 3-5 (doubtful) to DOUBTFUL and 6-9 (unreliable
+or missing) to UNRELIABLE. Whether a series has PI flags is decided by its
+first event: if it has none, all events of the series are validated
+instead, see `Timeseries.validate`.
+
+Series without a timeseries, or whose events can not be stored (e.g. those
+of text timeseries), are skipped. The other series are imported, after
+which SkippedSeriesError names the skipped ones.
+
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from calendar import timegm
+from datetime import datetime
+import logging
+
+try:
+    import xml.etree.cElementTree as ElementTree
+except ImportError:
+    import xml.etree.ElementTree as ElementTree
+
+from django.conf import settings
+import numpy as np
+
+from dd_node.importer import store_events
+from dd_node.models import Timeseries
+
+logger = logging.getLogger(__name__)
+
+PI_NAMESPACE = 'http://www.wldelft.nl/fews/PI'
+BATCH_SIZE = getattr(settings, 'PI_XML_BATCH_SIZE', 10000)  # events
+
+TIME_ZONE = '{{{}}}timeZone'.format(PI_NAMESPACE)
+SERIES = '{{{}}}series'.format(PI_NAMESPACE)
+HEADER = '{{{}}}header'.format(PI_NAMESPACE)
+EVENT = '{{{}}}event'.format(PI_NAMESPACE)
+LOCATION_ID = '{{{}}}locationId'.format(PI_NAMESPACE)
+PARAMETER_ID = '{{{}}}parameterId'.format(PI_NAMESPACE)
+MISSING_VALUE = '{{{}}}missVal'.format(PI_NAMESPACE)
+
+HOUR = 3600000  # in ms
+
+
+class NaturalKeyMap(object):
+    """Timeseries by (location code, timeseries code), loaded per location.
+
+    Missing timeseries are remembered too, so every location code costs a
+    single query, whatever the number of series.
+
+    """
+    def __init__(self):
+        self._timeseries = {}
+        self._location_codes = set()
+
+    def get(self, location_code, code):
+        if location_code not in self._location_codes:
+            self._location_codes.add(location_code)
+            for ts in Timeseries.objects.filter(
+                    location__code=location_code).select_related('location'):
+                self._timeseries.setdefault(
+                    (ts.location.code, ts.code), ts)
+        return self._timeseries.get((location_code, code))
+
+
+def pi_flags_to_quality_flags(flags):
+    """Return the quality flags of an array of PI flags."""
+    return np.minimum(flags // 3 * 3, Timeseries.QualityFlag.UNRELIABLE)
+
+
+class SkippedSeriesError(ValueError):
+    """Some series of a PI-XML file were skipped, the others imported.
+
+    Attributes:
+      count: number of events imported
+      skipped: list of the reasons the series were skipped
+
+    """
+    def __init__(self, count, skipped):
+        super(SkippedSeriesError, self).__init__(
+            "{} events imported, {} series skipped: {}".format(
+                count, len(skipped), ' '.join(skipped)))
+        self.count = count
+        self.skipped = skipped
+
+
+class _Batch(object):
+    """Preallocated columns of the events of a series."""
+    def __init__(self, size):
+        self.timestamps = np.empty(size, dtype=np.int64)
+        self.values = np.empty(size, dtype=np.float64)
+        self.flags = np.empty(size, dtype=np.int8)
+        self.size = size
+        self.start_series()
+
+    def start_series(self):
+        """Empty the batch for the events of the next series."""
+        self.has_flags = None  # decided by the first event
+        self.length = 0
+
+    def append(self, timestamp, value, flag):
+        if self.has_flags is None:
+            self.has_flags = flag is not None
+        index = self.length
+        self.timestamps[index] = timestamp
+        self.values[index] = value
+        # 0 is the default of PI.
+        self.flags[index] = 0 if flag is None else flag
+        self.length += 1
+
+    @property
+    def full(self):
+        return self.length == self.size
+
+    def store(self, timeseries):
+        """Store the events of the batch and empty it.
+
+        The events of a series without PI flags are validated.
+
+        Returns:
+          number of events stored
+
+        Raises:
+          ValueError: if the events of the timeseries can not be stored.
+
+        """
+        length = self.length
+        self.length = 0
+        if not length:
+            return 0
+        flags = (pi_flags_to_quality_flags(self.flags[:length])
+                 if self.has_flags else None)
+        store_events(timeseries, self.timestamps[:length].copy(),
+                     self.values[:length, np.newaxis].copy(), flags)
+        return length
+
+
+def _timestamp(date, time, offset):
+    """Return ms since the epoch of a PI date, time and time zone (ms)."""
+    dt = datetime.strptime(date + time, '%Y-%m-%d%H:%M:%S')
+    return timegm(dt.timetuple()) * 1000 - offset
+
+
+def _missing_value(text):
+    """Return the missVal of a series header as a float, NaN if absent."""
+    return np.nan if text is None else float(text)
+
+
+def _value(text, missing_value):
+    """Return the value of an event, NaN if absent or missing."""
+    value = np.nan if text is None else float(text)
+    # A NaN missVal matches no value, but those values are NaN already.
+    return np.nan if value == missing_value else value
+
+
+def _store(batch, timeseries, skipped):
+    """Store a batch, or add why its series is skipped to skipped.
+
+    Returns:
+      number of events stored, None if the series is skipped
+
+    """
+    try:
+        return batch.store(timeseries)
+    except ValueError as e:
+        skipped.append('{}'.format(e))
+        return None
+
+
+def import_pi_xml(source, keys=None):
+    """Import the timeseries of a PI-XML file.
+
+    Args:
+      source: path or file-like object
+      keys (NaturalKeyMap): optional, to share across imports
+
+    Returns:
+      number of events imported
+
+    Raises:
+      SkippedSeriesError: if series were skipped, after the others were
+        imported
+
+    """
+    if keys is None:
+        keys = NaturalKeyMap()
+
+    batch = _Batch(BATCH_SIZE)
+    offset = 0  # of the time zone, in ms
+    count = 0
+    skipped = []
+
+    timeseries = None
+    missing_value = np.nan
+    root = None
+
+    for event, element in ElementTree.iterparse(
+            source, events=('start', 'end')):
+        if root is None:
+            root = element
+        if event == 'start':
+            continue
+
+        if element.tag == TIME_ZONE:
+            offset = int(float(element.text) * HOUR)
+
+        elif element.tag == HEADER:
+            location_code = element.findtext(LOCATION_ID)
+            code = element.findtext(PARAMETER_ID)
+            missing_value = _missing_value(element.findtext(MISSING_VALUE))
+            timeseries = keys.get(location_code, code)
+            if timeseries is None:
+                skipped.append(
+                    "Timeseries {} of location {} does not exist.".format(
+                        code, location_code))
+            batch.start_series()
+            element.clear()
+
+        elif element.tag == EVENT:
+            if timeseries is not None:
+                flag = element.get('flag')
+                batch.append(
+                    _timestamp(element.get('date'), element.get('time'),
+                               offset),
+                    _value(element.get('value'), missing_value),
+                    None if flag is None else int(flag))
+                if batch.full:
+                    stored = _store(batch, timeseries, skipped)
+                    if stored is None:
+                        timeseries = None  # skip the rest of the series
+                    else:
+                        count += stored
+            element.clear()
+
+        elif element.tag == SERIES:
+            if timeseries is not None:
+                count += _store(batch, timeseries, skipped) or 0
+            timeseries = None
+            missing_value = np.nan
+            # Drop the series from the tree, it is done.
+            root.clear()
+
+    if skipped:
+        raise SkippedSeriesError(count, skipped)
+    return count
+
+
+def import_pi_xml_file(path):
+    """Import a PI-XML file, for `dd_node.importer`."""
+    return import_pi_xml(path)
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+# (c) Nelen & Schuurmans, see LICENSE.rst.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import logging
+import os
+import tempfile
+
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import BaseRenderer
+from rest_framework.renderers import JSONRenderer
+
+from dd_node.blobstore import iter_file
+from dd_node.geojson import GEOJSON_CONTENT_TYPE
+from dd_node.models import Timeseries
+from dd_node.netcdf import NETCDF_CONTENT_TYPE
+from dd_node.netcdf import write_timeseries_netcdf
+from dd_node.tiles import MVT_CONTENT_TYPE
+from dd_node.xlsx import MAX_COLUMNS
+from dd_node.xlsx import XLSX_CONTENT_TYPE
+from dd_node.xlsx import column_count
+from dd_node.xlsx import write_timeseries_xlsx
+
+logger = logging.getLogger(__name__)
+
+
+class MVTRenderer(BaseRenderer):
+    """Renders a Mapbox Vector Tile, which is rendered by PostGIS already."""
+    media_type = MVT_CONTENT_TYPE
+    format = 'mvt'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data
+
+
+class GeoJSONRenderer(JSONRenderer):
+    """Selects GeoJSON output with ``?format=geojson``.
+
+    Views stream GeoJSON lists themselves, see `dd_node.geojson`. Other
+    responses are rendered as JSON.
+
+    """
+    media_type = GEOJSON_CONTENT_TYPE
+    format = 'geojson'
+
+
+class TimeseriesFileRenderer(BaseRenderer):
+    """Base class of renderers that write the events of timeseries to a
+    file.
+
+    Views do not return data to render, but the `response` of the renderer.
+    Subclasses write the events to a temporary file with `write`, a chunk
+    at a time, and the response streams the file, so that the events are
+    never held in memory as a whole.
+
+    """
+    charset = None
+    render_style = 'binary'
+    suffix = None
+
+    def check(self, timeseries, start=None, end=None):
+        """Raise ParseError (a 400) if timeseries can not be written."""
+        for ts in timeseries:
+            if not (ts.is_numeric or
+                    ts.value_type == Timeseries.ValueType.FLOAT_ARRAY):
+                raise ParseError(
+                    "Timeseries {} is not numeric, it can not be rendered "
+                    "as {}.".format(ts.uuid, self.format))
+
+    def write(self, path, timeseries, start, end):
+        raise NotImplementedError
+
+    def response(self, timeseries, start=None, end=None):
+        """Return a StreamingHttpResponse of the events of timeseries.
+
+        Args:
+          timeseries (list): Timeseries, in the order of the file
+          start (int): optional start in ms, inclusive
+          end (int): optional end in ms, inclusive
+
+        """
+        self.check(timeseries, start, end)
+
+        fd, path = tempfile.mkstemp(suffix=self.suffix)
+        os.close(fd)
+        try:
+            self.write(path, timeseries, start, end)
+            f = open(path, 'rb')
+        finally:
+            # An open file outlives its name: the disk space is freed when
+            # the response closes it.
+            os.remove(path)
+
+        size = os.fstat(f.fileno()).st_size
+        response = StreamingHttpResponse(
+            iter_file(f, size), content_type=self.media_type)
+        response['Content-Length'] = size
+        return response
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        raise NotImplementedError(
+            "Views return the response of the renderer instead.")
+
+
+class NetCDFRenderer(TimeseriesFileRenderer):
+    """Renders the events of timeseries as NetCDF4, see `dd_node.netcdf`."""
+    media_type = NETCDF_CONTENT_TYPE
+    format = 'netcdf'
+    suffix = '.nc'
+
+    def write(self, path, timeseries, start, end):
+        write_timeseries_netcdf(path, timeseries, start, end)
+
+
+class XLSXRenderer(TimeseriesFileRenderer):
+    """Renders the events of timeseries as an Excel spreadsheet, see
+    `dd_node.xlsx`."""
+    media_type = XLSX_CONTENT_TYPE
+    format = 'xlsx'
+    suffix = '.xlsx'
+
+    def check(self, timeseries, start=None, end=None):
+        super(XLSXRenderer, self).check(timeseries, start, end)
+        columns = column_count(timeseries, start, end)
+        if columns > MAX_COLUMNS:
+            raise ParseError(
+                "The timeseries need {} columns, a spreadsheet has at most "
+                "{}.".format(columns, MAX_COLUMNS))
+
+    def write(self, path, timeseries, start, end):
+        write_timeseries_xlsx(path, timeseries, start, end)
@@ -7,9 +7,49 @@ from __future__ import print_function
 from __future__ import unicode_literals
 
 import logging
+import time
+
+from django.core.cache import cache
 
 logger = logging.getLogger(__name__)
 
+SEARCH_INDEX_VERSION_KEY = 'search_index_version'
+
+
+def get_search_index_version():
+    """Return the current version of the search index.
+
+    The version is a counter in the (Redis) cache that is bumped whenever
+    the search index changes. It is part of the keys of cached search
+    results, so bumping it invalidates all of them at once.
+
+    """
+    version = cache.get(SEARCH_INDEX_VERSION_KEY)
+    if version is None:
+        _init_search_index_version()
+        version = cache.get(SEARCH_INDEX_VERSION_KEY)
+    return version
+
+
+def bump_search_index_version():
+    """Increment the version of the search index."""
+    try:
+        return cache.incr(SEARCH_INDEX_VERSION_KEY)
+    except ValueError:
+        # The key does not exist (yet or anymore).
+        _init_search_index_version()
+        return cache.incr(SEARCH_INDEX_VERSION_KEY)
+
+
+def _init_search_index_version():
+    """Initialize the version of the search index if it does not exist.
+
+    Starting at the current time instead of at 1 prevents that results
+    cached before the key got evicted are served again.
+
+    """
+    cache.add(SEARCH_INDEX_VERSION_KEY, int(time.time()), None)
+
 
 class SearchMixin(object):
 
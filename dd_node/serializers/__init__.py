@@ -3,6 +3,7 @@
 
 from .generic import NodeSerializer  # NOQA
 from .search import WatsonSearchSerializer  # NOQA
+from .spatial import LocationClusterSerializer  # NOQA
 from .spatial import LocationPropertiesSerializer  # NOQA
 from .spatial import LocationSerializerDetail  # NOQA
 from .spatial import LocationSerializerList  # NOQA
@@ -15,6 +15,7 @@ from rest_framework_gis.fields import GeometryField
 
 from dd_node import fields
 from dd_node.models import Location
+from dd_node.models import LocationCluster
 from dd_node.serializers.generic import NodeSerializer
 
 logger = logging.getLogger(__name__)
@@ -53,7 +54,7 @@ class LocationSerializerBase(serializers.ModelSerializer):
         view_name='locations-detail')
     node = NodeSerializer()
     uuid = serializers.UUIDField(read_only=True)
-    geometry = GeometryField(allow_null=True)
+    geometry = fields.SimplifiedGeometryField(allow_null=True)
     extra_metadata = fields.JSONSerializerField(
         allow_null=True, required=False)
     object = GenericObjectRelSerializer(read_only=True)
@@ -139,3 +140,24 @@ class LocationPropertiesSerializer(LocationSerializerDetail):
             'name',
             'timeseries',
         )
+
+
+class LocationClusterSerializer(serializers.ModelSerializer):
+    centroid = serializers.SerializerMethodField()
+    bbox = serializers.SerializerMethodField()
+
+    class Meta:
+        model = LocationCluster
+        fields = (
+            'count',
+            'centroid',
+            'bbox',
+        )
+
+    def get_centroid(self, obj):
+        """Return the centroid of the cluster as GeoJSON point."""
+        return {'type': 'Point', 'coordinates': list(obj.centroid)}
+
+    def get_bbox(self, obj):
+        """Return the extent of the cluster as [xmin, ymin, xmax, ymax]."""
+        return list(obj.extent)
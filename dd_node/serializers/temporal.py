@@ -11,9 +11,9 @@ import logging
 
 from django.utils.dateparse import parse_datetime
 from rest_framework import serializers
+from rest_framework.exceptions import ParseError
 from rest_framework.fields import CharField
 from rest_framework.fields import DateTimeField
-from rest_framework.reverse import reverse
 import pytz
 
 from dd_node import fields
@@ -70,6 +70,81 @@ def parse_datetime_param(date_param, return_type='datetime'):
             return parsed_as_timestamp
 
 
+def parse_positions_param(positions_param):
+    """Parse a range of positions, like ``100:250`` or ``100``.
+
+    The range is half-open, like a Python slice: ``100:250`` are positions
+    100 up to and including 249. Either bound may be omitted.
+
+    Returns:
+      slice or None if no positions are given
+
+    """
+    if positions_param is None or positions_param == "":
+        return None
+
+    bounds = positions_param.split(':')
+
+    try:
+        if len(bounds) == 1:
+            position = int(bounds[0])
+            return slice(position, position + 1)
+        elif len(bounds) == 2:
+            start, stop = [int(x) if x else None for x in bounds]
+            return slice(start, stop)
+    except ValueError:
+        pass
+
+    raise ValueError("Not a valid value: {}.".format(positions_param))
+
+
+def parse_max_flag_param(max_flag_param):
+    """Parse a maximum quality flag, like ``3``.
+
+    Returns:
+      int or None if no maximum flag is given
+
+    """
+    if max_flag_param is None or max_flag_param == "":
+        return None
+    try:
+        return int(max_flag_param)
+    except ValueError:
+        raise ValueError("Not a valid value: {}.".format(max_flag_param))
+
+
+def parse_unvalidated_param(unvalidated_param):
+    """Parse whether events that have not been validated pass a max_flag.
+
+    Returns:
+      True for ``true``, False by default
+
+    """
+    return (unvalidated_param or "").lower() == 'true'
+
+
+def check_array_params(params):
+    """Reject the parameters that float array timeseries do not support.
+
+    Float array timeseries are not aggregated by time, except per quality
+    flag with ``window=flag``, and have no fields.
+
+    Raises:
+      ParseError: if such a parameter is given.
+
+    """
+    window = params.get('window')
+    if window not in (None, "", 'flag'):
+        raise ParseError(
+            "Not a valid window for a float array timeseries: {}.".format(
+                window))
+    for name in ('fields', 'min_points'):
+        if name in params:
+            raise ParseError(
+                "Not a valid parameter for a float array timeseries: "
+                "{}.".format(name))
+
+
 class TimeseriesTypeSerializer(serializers.HyperlinkedModelSerializer):
     class Meta:
         model = TimeseriesType
@@ -120,6 +195,29 @@ class TimeseriesSerializerBase(serializers.HyperlinkedModelSerializer):
         timezone = params.get('timezone')
         points = (int(float(params['min_points']))
                   if 'min_points' in params else None)
+        obj.lock()
+
+        if obj.value_type == Timeseries.ValueType.FLOAT_ARRAY:
+            check_array_params(params)
+            get_array_data = (obj.get_array_aggregates if window == 'flag'
+                              else obj.get_array_events)
+            return get_array_data(
+                start=start,
+                end=end,
+                positions=parse_positions_param(params.get('positions')),
+                max_flag=parse_max_flag_param(params.get('max_flag')),
+                unvalidated=parse_unvalidated_param(
+                    params.get('unvalidated')),
+            )
+
+        if obj.is_file:
+            events = obj.get_file_events(start=start, end=end)
+            response = [{
+                'timestamp': event['timestamp'],
+                'url': fields.file_event_url(
+                    obj, event['timestamp'], self.context['request']),
+            } for event in events]
+            return response
 
         events = obj.get_events(
             start=start,
@@ -130,17 +228,6 @@ class TimeseriesSerializerBase(serializers.HyperlinkedModelSerializer):
             min_points=points,
         )
 
-        if obj.is_file:
-            response = [{
-                'timestamp': event['timestamp'],
-                'url': reverse(
-                    'timeseries-data-detail',
-                    args=[obj.uuid, event['timestamp']],
-                    request=self.context['request'],
-                ),
-            } for event in events]
-            return response
-
         return events
 
 
@@ -189,6 +276,10 @@ class TimeseriesSerializerDetail(TimeseriesSerializerBase):
             'timeseries_type',
             'device',
             'extra_metadata',
+            'validate_min_hard',
+            'validate_min_soft',
+            'validate_max_soft',
+            'validate_max_hard',
             'start',
             'end',
             'last_value',
@@ -199,6 +199,26 @@ EVENT_STORAGE_DIR = "var/timeseries/storage"
 EVENT_LOG_HDFS_DIR = "var/timeseries/hdfs"
 EVENT_FILE_DIR = "var/timeseries/files"
 
+# Let the web server send the files of file timeseries, either nginx, with
+# the internal location of EVENT_FILE_DIR/blobs/, or X-Sendfile.
+EVENT_FILE_ACCEL_REDIRECT = None  # e.g. '/protected/blobs/'
+EVENT_FILE_SENDFILE = False
+
+# Thumbnails of images, in pixels, and the number of threads that make them.
+EVENT_FILE_THUMBNAIL_SIZES = (64, 128, 256, 512)
+EVENT_FILE_THUMBNAIL_THREADS = 4
+
+# Float array and numeric events are stored in chunks of this duration
+# (in ms).
+EVENT_ARRAY_CHUNK_DURATION = 86400000
+
+# Long reads look whether a younger request of the same session for the same
+# timeseries took its lock, at most once per this number of seconds.
+TIMESERIES_LOCK_CHECK_INTERVAL = 1
+
+# Number of processes that dump or restore timeseries to or from Parquet.
+PARQUET_PROCESSES = 4
+
 # Django rest framework
 REST_FRAMEWORK = {
     'FORM_METHOD_OVERRIDE': None,
@@ -248,6 +268,19 @@ CACHALOT_UNCACHABLE_TABLES = frozenset([
 # TileStache
 TILESTACHE_CACHE = {"class": "dd_node.tilestache.Redis:CacheAuth"}
 
+# Vector tiles of locations are cached up to and including this zoom level.
+LOCATION_TILE_CACHE_MAX_ZOOM = 16
+LOCATION_TILE_CACHE_TIMEOUT = 86400  # in seconds
+
+# Locations are clustered up to and including this zoom level.
+LOCATION_CLUSTER_MAX_ZOOM = 16
+
+# Zoom levels at which simplified location geometries are precomputed.
+LOCATION_SIMPLIFY_ZOOM_LEVELS = (4, 8, 12)
+
+# Number of timeseries of a location that are read concurrently.
+LOCATION_TIMESERIES_READ_THREADS = 8
+
 # Dealer is used to put git tag and revision info on the request.
 DEALER_TYPE = 'git'
 
@@ -287,6 +320,20 @@ LMW_URL = 'http://www.rijkswaterstaat.nl/rws/opendata/meetdata/meetdata.zip'
 # LMW (Landelijk Meetnet Water) downloads are stored here.
 LMW_DIR = os.path.join(BUILDOUT_DIR, 'var/data/lmw')
 
+# Drop directories of timeseries files, imported by `importfiles`, and the
+# importers per file extension. Files younger than FILE_IMPORT_MIN_AGE
+# seconds may still be being written and are left for the next run.
+FILE_IMPORT_DIRS = ()
+FILE_IMPORT_MIN_AGE = 5
+FILE_IMPORT_PROCESSES = 4
+FILE_IMPORTERS = {
+    '.csv': 'dd_node.importer.import_csv_file',
+    '.xml': 'dd_node.pixml.import_pi_xml_file',
+}
+
+# PI-XML events are stored in batches of this number of events.
+PI_XML_BATCH_SIZE = 10000
+
 # For fetching pi xml. See: https://github.com/nens/fews-pi-service-client.
 FEWS_PI_SERVICE_CLIENT = (
     '/opt/FewsPiServiceClient/dist/FewsPiServiceClient.jar')
@@ -305,3 +352,11 @@ ALARM = {'timelag': '999999999'}
 # Raster Server
 RASTER_SERVER_REDIS_HOST = 'localhost'
 RASTER_SERVER_REDIS_DB = 3
+
+# Search results are cached until the search index changes.
+SEARCH_CACHE_TIMEOUT = 3600  # in seconds
+SEARCH_CACHE_MAX_HITS = 1000
+
+# A search near a point reranks its top hits by distance.
+SEARCH_NEAR_TOP_K = 100
+SEARCH_NEAR_DISTANCE_SCALE = 10000  # in meters
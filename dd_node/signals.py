@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+# (c) Nelen & Schuurmans, see LICENSE.rst.
+
+"""Signal receivers of dd_node.
+
+This module is imported when the app is ready, see `dd_node.apps`.
+
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+from watson import search as watson
+
+from dd_node.clusters import update_location_clusters
+from dd_node.models import Location
+from dd_node.models import Timeseries
+from dd_node.search import bump_search_index_version
+from dd_node.simplification import update_simplified_geometries
+from dd_node.tiles import invalidate_location_tiles
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_search_results(sender, **kwargs):
+    """Invalidate cached search results when a registered model changes.
+
+    Watson updates the search index of registered models on save and
+    delete. Bumping the index version after the transaction commits
+    makes sure no stale hit list is cached under the new version.
+
+    """
+    if watson.default_search_engine.is_registered(sender):
+        transaction.on_commit(bump_search_index_version)
+
+
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def invalidate_tiles_of_location(sender, instance, **kwargs):
+    """Invalidate the cached tiles at the old and new geometry.
+
+    Tiles are invalidated after the transaction commits, so that no tile
+    rendered before the commit is cached again.
+
+    """
+    geometries = [getattr(instance, '_loaded_geometry', None)]
+    if kwargs['signal'] is post_save:
+        geometries.append(instance.geometry)
+    transaction.on_commit(lambda: invalidate_location_tiles(geometries))
+
+
+@receiver(pre_delete, sender=Location)
+def fetch_geometry_of_deleted_location(sender, instance, **kwargs):
+    instance.fetch_loaded_geometry()
+
+
+@receiver(post_save, sender=Location)
+def update_clusters_of_saved_location(sender, instance, **kwargs):
+    """Move a location to the clusters of its new geometry.
+
+    Clusters are updated after the transaction commits, so that a rollback
+    leaves them alone.
+
+    """
+    old_geometry = getattr(instance, '_loaded_geometry', None)
+    new_geometry = instance.geometry
+    transaction.on_commit(
+        lambda: update_location_clusters(old_geometry, new_geometry))
+
+
+@receiver(post_save, sender=Location)
+def update_simplified_geometries_of_location(sender, instance, **kwargs):
+    old_geometry = getattr(instance, '_loaded_geometry', None)
+    if old_geometry is None and instance.geometry is None:
+        return
+    if old_geometry is not None and instance.geometry is not None and \
+            old_geometry.equals_exact(instance.geometry):
+        return
+    update_simplified_geometries(instance)
+
+
+@receiver(post_delete, sender=Location)
+def update_clusters_of_deleted_location(sender, instance, **kwargs):
+    old_geometry = getattr(instance, '_loaded_geometry', None)
+    transaction.on_commit(
+        lambda: update_location_clusters(old_geometry, None))
+
+
+@receiver(post_save, sender=Timeseries)
+@receiver(post_delete, sender=Timeseries)
+def invalidate_tiles_of_timeseries(sender, instance, created=False,
+                                   **kwargs):
+    """Invalidate the cached tiles of the location of a timeseries.
+
+    Tiles hold the number of timeseries of a location, which only changes
+    when a timeseries is created, deleted or moved to another location.
+    Saves that store events, i.e. update the start, end and last value,
+    leave the tiles to expire: they would otherwise invalidate all zoom
+    levels on every batch of events.
+
+    """
+    location_ids = set([instance.location_id])
+    if kwargs['signal'] is post_save and not created:
+        loaded_location_id = getattr(instance, '_loaded_location_id', None)
+        if loaded_location_id == instance.location_id:
+            return
+        location_ids.add(loaded_location_id)
+
+    def invalidate():
+        invalidate_location_tiles(Location.objects.filter(
+            pk__in=location_ids).values_list('geometry', flat=True))
+
+    transaction.on_commit(invalidate)
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+# (c) Nelen & Schuurmans, see LICENSE.rst.
+
+"""Simplified geometries of locations.
+
+Long linestrings and polygons are simplified once per zoom level in
+SIMPLIFY_ZOOM_LEVELS, with a tolerance of about a pixel at that zoom level,
+and stored in SimplifiedGeometry. A request for zoom level z is served from
+the first stored level >= z, so that the simplification is never visible.
+Beyond the deepest level, the full geometry is served.
+
+Simplified geometries are updated when a location is saved. Use the
+management command `buildsimplifiedgeometries` to rebuild them from
+scratch, e.g. after bulk operations, which do not send signals.
+
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import logging
+import math
+
+from django.conf import settings
+from django.contrib.gis.db.models.functions import Transform
+from django.db import transaction
+from django.db.models import Prefetch
+
+from dd_node.models import Location
+from dd_node.models import SimplifiedGeometry
+from dd_node.utils.gis import geometry_force_2D
+
+logger = logging.getLogger(__name__)
+
+SIMPLIFY_ZOOM_LEVELS = tuple(sorted(
+    getattr(settings, 'LOCATION_SIMPLIFY_ZOOM_LEVELS', (4, 8, 12))))
+
+TILE_SIZE = 256  # in pixels
+
+
+def simplify_tolerance(zoom, lat=0):
+    """Return the size of a pixel at a zoom level in degrees.
+
+    Args:
+      zoom (int): zoom level
+      lat (float): latitude, where a degree of longitude is shorter
+
+    """
+    return 360 / (TILE_SIZE * 2 ** zoom) * math.cos(math.radians(lat))
+
+
+def simplify_level(zoom):
+    """Return the stored level to serve at a zoom level.
+
+    Returns:
+      zoom level or None for the full geometry
+
+    """
+    for level in SIMPLIFY_ZOOM_LEVELS:
+        if level >= zoom:
+            return level
+
+
+def parse_simplify_param(simplify):
+    """Return the stored level for e.g. `?simplify=10`, None if absent."""
+    if simplify is None or simplify == "":
+        return None
+    try:
+        return simplify_level(int(simplify))
+    except ValueError:
+        raise ValueError("Invalid simplify parameter: {}.".format(simplify))
+
+
+def simplified_geometries(geometry):
+    """Return {level: simplified geometry} of the levels that simplify.
+
+    Levels at which simplification does not remove any vertex are left
+    out, so points never have simplified geometries.
+
+    """
+    result = {}
+
+    if geometry is None or geometry.empty or geometry.geom_type == 'Point':
+        return result
+
+    num_points = geometry.num_points
+    lat = geometry.centroid.y
+
+    # The deepest level has the smallest tolerance.
+    for level in reversed(SIMPLIFY_ZOOM_LEVELS):
+        tolerance = simplify_tolerance(level, lat)
+        simplified = geometry.simplify(tolerance, preserve_topology=True)
+        if simplified.num_points < num_points:
+            result[level] = geometry_force_2D(simplified)
+
+    return result
+
+
+def update_simplified_geometries(location):
+    """Replace the simplified geometries of a location."""
+    with transaction.atomic():
+        SimplifiedGeometry.objects.filter(location=location).delete()
+        SimplifiedGeometry.objects.bulk_create(
+            SimplifiedGeometry(location=location, zoom=level, geometry=geom)
+            for level, geom in simplified_geometries(location.geometry).items()
+        )
+
+
+def rebuild_simplified_geometries():
+    """Rebuild the simplified geometries of all locations."""
+    locations = Location.objects.exclude(geometry=None).only('geometry')
+    for location in locations.iterator():
+        update_simplified_geometries(location)
+
+
+def _transformed(queryset, srid):
+    if srid is None:
+        return queryset
+    return queryset.annotate(
+        transformed_geometry=Transform('geometry', srid))
+
+
+def prefetch_simplified_geometries(queryset, level, lookup, srid=None):
+    """Prefetch the simplified geometries of a level, if any.
+
+    With an SRID, the geometries of the locations and their simplified
+    geometries are transformed by PostGIS, in the same queries, as
+    `transformed_geometry`.
+
+    Args:
+      queryset: queryset to prefetch for
+      level (int): stored level, see `parse_simplify_param`, or None
+      lookup (str): lookup of the simplified geometries, e.g.
+        'location__simplified_geometries'
+      srid (int): optional SRID, see `dd_node.utils.gis.parse_srid_param`
+
+    """
+    if srid is not None:
+        if '__' in lookup:
+            location_lookup = lookup.rsplit('__', 1)[0]
+            queryset = queryset.prefetch_related(Prefetch(
+                location_lookup,
+                queryset=_transformed(Location.objects.all(), srid)))
+        else:
+            queryset = _transformed(queryset, srid)
+    if level is None:
+        return queryset
+    return queryset.prefetch_related(Prefetch(
+        lookup, queryset=_transformed(
+            SimplifiedGeometry.objects.filter(zoom=level), srid)))
+
+
+def get_simplified_geometry(location, level, transformed=False):
+    """Return the geometry of a location at a stored level.
+
+    Uses the prefetched simplified geometries, if any.
+
+    Args:
+      location: Location
+      level (int): stored level, or None
+      transformed (bool): return the `transformed_geometry`, see
+        `prefetch_simplified_geometries`
+
+    """
+    field = 'transformed_geometry' if transformed else 'geometry'
+    if level is not None:
+        for simplified in location.simplified_geometries.all():
+            if simplified.zoom == level:
+                return getattr(simplified, field)
+    return getattr(location, field)
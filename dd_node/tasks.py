@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+# (c) Nelen & Schuurmans, see LICENSE.rst.
+
+"""Celery tasks.
+
+Export tasks return the path of their file in MEDIA_ROOT, see the `Task`
+view. While running, they are in state PROGRESS with the number of rows
+written and the total as meta data.
+
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import logging
+
+from celery import shared_task
+
+from dd_node.exports import export_path
+from dd_node.exports import write_events_csv
+from dd_node.exports import write_locations_geojson
+from dd_node.models import Timeseries
+
+logger = logging.getLogger(__name__)
+
+PROGRESS = 'PROGRESS'
+
+
+def _report_progress(task):
+    def progress(rows, total):
+        task.update_state(
+            state=PROGRESS, meta={'rows': rows, 'total': total})
+    return progress
+
+
+@shared_task(bind=True)
+def export_timeseries(self, uuids, start=None, end=None):
+    """Export the events of timeseries to CSV.
+
+    Args:
+      uuids (list): UUIDs of the timeseries, in the order of the export
+      start (int): optional start in ms, inclusive
+      end (int): optional end in ms, inclusive
+
+    """
+    timeseries = {str(ts.uuid): ts
+                  for ts in Timeseries.objects.filter(uuid__in=uuids)}
+    path = export_path(self.request.id, '.csv')
+    write_events_csv(
+        path, [timeseries[uuid] for uuid in uuids if uuid in timeseries],
+        start, end, _report_progress(self))
+    return path
+
+
+@shared_task(bind=True)
+def export_locations(self, query_string, url_prefix, url_suffix, srid=None):
+    """Export locations to GeoJSON.
+
+    Args:
+      query_string (str): query string of a request for the list of
+        locations, with its filters and ordering
+      url_prefix (str): part of the url of a location before its uuid
+      url_suffix (str): part of the url of a location after its uuid
+      srid (int): optional SRID to reproject the geometries to
+
+    """
+    # Imported here, because the views import the tasks.
+    from dd_node.views.spatial import filter_locations
+
+    queryset = filter_locations(query_string)
+    path = export_path(self.request.id, '.geojson')
+    write_locations_geojson(
+        path, queryset, url_prefix, url_suffix, srid,
+        _report_progress(self))
+    return path
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+# (c) Nelen & Schuurmans, see LICENSE.rst.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from django.contrib.gis.geos import Point
+from django.test import TestCase
+
+from dd_node.clusters import get_location_clusters
+from dd_node.clusters import rebuild_location_clusters
+from dd_node.clusters import update_location_clusters
+from dd_node.models import Location
+from dd_node.models import Node
+
+
+class LocationClustersTest(TestCase):
+
+    def setUp(self):
+        node = Node.objects.create(name='node', base_url='http://localhost/')
+        self.locations = [
+            Location.objects.create(
+                node=node, code=code, name=code,
+                geometry=Point(lon, lat, 0, srid=4326))
+            for code, lon, lat in (('a', 1, 1), ('b', 2, 2), ('c', 3, 3))]
+        rebuild_location_clusters()
+
+    def extents(self, zoom):
+        return sorted((cluster.count, cluster.extent)
+                      for cluster in get_location_clusters(zoom))
+
+    def test_remove_location_on_the_edge(self):
+        location = self.locations[2]
+        location.delete()
+        update_location_clusters(location.geometry, None)
+
+        self.assertEqual(self.extents(0), [(2, (1.0, 1.0, 2.0, 2.0))])
+        self.assertEqual(self.extents(16), [
+            (1, (1.0, 1.0, 1.0, 1.0)),
+            (1, (2.0, 2.0, 2.0, 2.0)),
+        ])
+
+    def test_remove_location_inside(self):
+        location = self.locations[1]
+        location.delete()
+        update_location_clusters(location.geometry, None)
+
+        self.assertEqual(self.extents(0), [(2, (1.0, 1.0, 3.0, 3.0))])
+
+    def test_move_location(self):
+        location = self.locations[0]
+        old_geometry = location.geometry
+        location.geometry = Point(2.5, 2.5, 0, srid=4326)
+        location.save()
+        update_location_clusters(old_geometry, location.geometry)
+
+        self.assertEqual(self.extents(0), [(3, (2.0, 2.0, 3.0, 3.0))])
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+# (c) Nelen & Schuurmans, see LICENSE.rst.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase
+import numpy as np
+
+from dd_node.eventstore import CHUNK_DURATION
+from dd_node.eventstore import NO_FLAG
+from dd_node.eventstore import ArrayStore
+
+
+class ArrayStoreTest(SimpleTestCase):
+
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        self.store = ArrayStore('uuid', root)
+        self.timestamps = [1000, CHUNK_DURATION + 1000, 2000]
+        self.store.write(
+            self.timestamps, [[1.0, 1.5], [3.0, 3.5], [2.0, 2.5]], [0, 6, 3])
+
+    def test_chunks(self):
+        self.assertEqual(self.store.chunks(), [0, CHUNK_DURATION])
+        self.assertEqual(self.store.chunks(start=CHUNK_DURATION),
+                         [CHUNK_DURATION])
+
+        # A chunk is a sorted time x position matrix, with a flag per row.
+        timestamps, values, flags = self.store.load_chunk(0)
+        self.assertEqual(timestamps.dtype, np.int64)
+        self.assertEqual(timestamps.tolist(), [1000, 2000])
+        self.assertEqual(values.tolist(), [[1.0, 1.5], [2.0, 2.5]])
+        self.assertEqual(flags.dtype, np.int8)
+        self.assertEqual(flags.tolist(), [0, 3])
+
+        self.assertEqual(self.store.count(), 3)
+        self.assertEqual(self.store.count(end=2000), 2)
+        self.assertEqual(self.store.width(), 2)
+
+    def test_read(self):
+        timestamps, values, flags = self.store.read(
+            start=2000, positions=slice(1, 2))
+        self.assertEqual(timestamps.tolist(), [2000, CHUNK_DURATION + 1000])
+        self.assertEqual(values.tolist(), [[2.5], [3.5]])
+        self.assertEqual(flags.tolist(), [3, 6])
+
+    def test_write_replaces_events(self):
+        self.store.write([2000, 2000], [[0.0, 0.0], [4.0, 4.5]])
+        timestamps, values, flags = self.store.read(end=CHUNK_DURATION - 1)
+        self.assertEqual(timestamps.tolist(), [1000, 2000])
+        self.assertEqual(values.tolist(), [[1.0, 1.5], [4.0, 4.5]])
+        self.assertEqual(flags.tolist(), [0, NO_FLAG])
+
+        with self.assertRaises(ValueError):
+            self.store.write([3000], [[1.0, 2.0, 3.0]])
+
+    def test_delete(self):
+        self.store.delete(start=2000)
+        self.assertEqual(self.store.chunks(), [0])
+        self.assertEqual(self.store.read()[0].tolist(), [1000])
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+# (c) Nelen & Schuurmans, see LICENSE.rst.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import io
+import os
+
+from django.test import TestCase
+
+from dd_node.exports import export_path
+from dd_node.exports import write_events_csv
+from dd_node.models import Timeseries
+from dd_node.tests.utils import TemporaryStorageMixin
+from dd_node.tests.utils import create_timeseries
+from dd_node.utils.conversion import datetime_as_csv_string
+
+
+class WriteEventsCSVTest(TemporaryStorageMixin, TestCase):
+
+    def setUp(self):
+        super(WriteEventsCSVTest, self).setUp()
+        self.path = export_path('export', '.csv')
+
+    def read(self):
+        with io.open(self.path, encoding='utf-8') as f:
+            return f.read().splitlines()
+
+    def test_scalar_and_array_timeseries(self):
+        scalar = create_timeseries(Timeseries.ValueType.FLOAT)
+        scalar.set_array_events([1000, 2000], [1.5, float('nan')])
+        array = create_timeseries(
+            Timeseries.ValueType.FLOAT_ARRAY, location=scalar.location)
+        array.set_array_events([1000], [[1.0, 2.0]])
+
+        progress = []
+        rows = write_events_csv(
+            self.path, [scalar, array],
+            progress=lambda rows, total: progress.append((rows, total)))
+
+        self.assertEqual(rows, 3)
+        self.assertEqual(progress[-1], (3, 3))
+        self.assertEqual(self.read(), [
+            '{},{},1.5'.format(scalar.uuid, datetime_as_csv_string(1000)),
+            '{},{},'.format(scalar.uuid, datetime_as_csv_string(2000)),
+            '{},{},1.0,2.0'.format(array.uuid, datetime_as_csv_string(1000)),
+        ])
+
+    def test_start_and_end(self):
+        scalar = create_timeseries(Timeseries.ValueType.INTEGER)
+        scalar.set_array_events([1000, 2000, 3000], [1, 2, 3])
+
+        rows = write_events_csv(self.path, [scalar], start=2000, end=2000)
+
+        self.assertEqual(rows, 1)
+        self.assertEqual(self.read(), [
+            '{},{},2.0'.format(scalar.uuid, datetime_as_csv_string(2000)),
+        ])
+
+    def test_text_timeseries_are_refused_up_front(self):
+        scalar = create_timeseries(Timeseries.ValueType.FLOAT)
+        scalar.set_array_events([1000], [1.0])
+        text = create_timeseries(
+            Timeseries.ValueType.TEXT, location=scalar.location)
+
+        with self.assertRaises(ValueError):
+            write_events_csv(self.path, [scalar, text])
+        self.assertFalse(os.path.exists(self.path))
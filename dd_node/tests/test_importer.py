@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+# (c) Nelen & Schuurmans, see LICENSE.rst.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import io
+import os
+
+from django.test import TestCase
+import mock
+
+from dd_node import importer
+from dd_node.models import FileSource
+from dd_node.models import Timeseries
+from dd_node.tests.utils import TemporaryStorageMixin
+from dd_node.tests.utils import create_timeseries
+
+
+class ImportCSVFileTest(TemporaryStorageMixin, TestCase):
+
+    def setUp(self):
+        super(ImportCSVFileTest, self).setUp()
+        self.scalar = create_timeseries(Timeseries.ValueType.FLOAT)
+        self.array = create_timeseries(
+            Timeseries.ValueType.FLOAT_ARRAY, location=self.scalar.location)
+        self.path = os.path.join(self.storage_dir, 'events.csv')
+
+    def write(self, *lines):
+        with io.open(self.path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+
+    def test_scalar_and_array_timeseries(self):
+        self.write('1000,{},1.5'.format(self.scalar.uuid),
+                   '2000,{},'.format(self.scalar.uuid),
+                   '1000,{},1,2'.format(self.array.uuid))
+
+        self.assertEqual(importer.import_csv_file(self.path), 3)
+        self.assertEqual(self.scalar.get_events_raw(), [
+            {'datetime': 1000, 'value': 1.5},
+            {'datetime': 2000, 'value': None},
+        ])
+        self.assertEqual(self.array.array_store.read()[1].tolist(),
+                         [[1.0, 2.0]])
+
+    def test_events_that_can_not_be_stored(self):
+        text = create_timeseries(
+            Timeseries.ValueType.TEXT, location=self.scalar.location)
+        self.write('1000,{},1.5'.format(self.scalar.uuid),
+                   '1000,{},1.5'.format(text.uuid),
+                   '1000,00000000-0000-0000-0000-000000000000,1.5')
+
+        with self.assertRaises(ValueError):
+            importer.import_csv_file(self.path)
+        # The events that can be stored are.
+        self.assertEqual(self.scalar.array_store.count(), 1)
+
+
+@mock.patch('dd_node.importer.connection', mock.Mock())
+class ImportFileTest(TemporaryStorageMixin, TestCase):
+
+    def setUp(self):
+        super(ImportFileTest, self).setUp()
+        self.path = os.path.join(self.storage_dir, 'events.csv')
+        with io.open(self.path, 'w', encoding='utf-8') as f:
+            f.write('1000,00000000-0000-0000-0000-000000000000,1.5\n')
+
+    def test_failed_for_good(self):
+        self.assertEqual(importer.import_file(self.path), importer.FAILED)
+
+    def test_retried(self):
+        with mock.patch('dd_node.importer.import_csv_file',
+                        side_effect=IOError):
+            self.assertIsNone(importer.import_file(self.path))
+
+
+class RecordImportsTest(TestCase):
+
+    def failed(self):
+        return dict(FileSource.objects.values_list('fullpath', 'failed'))
+
+    def test_failed_files_are_not_imported_until_they_change(self):
+        importer.record_imports({'imported.csv': 1}, {'failed.csv': 1})
+
+        self.assertEqual(
+            self.failed(), {'imported.csv': False, 'failed.csv': True})
+        with mock.patch('time.time', return_value=100):
+            self.assertEqual(importer.files_to_import(
+                {'imported.csv': 1, 'failed.csv': 1}), {})
+            self.assertEqual(importer.files_to_import(
+                {'imported.csv': 1, 'failed.csv': 2}), {'failed.csv': 2})
+
+        importer.record_imports({'failed.csv': 2})
+
+        self.assertEqual(
+            self.failed(), {'imported.csv': False, 'failed.csv': False})
+        self.assertEqual(
+            FileSource.objects.get(fullpath='failed.csv').mtime, 2)
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+# (c) Nelen & Schuurmans, see LICENSE.rst.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import os
+
+from django.test import TestCase
+from netCDF4 import Dataset
+
+from dd_node.models import Timeseries
+from dd_node.netcdf import write_timeseries_netcdf
+from dd_node.tests.utils import TemporaryStorageMixin
+from dd_node.tests.utils import create_timeseries
+
+
+class WriteTimeseriesNetCDFTest(TemporaryStorageMixin, TestCase):
+
+    def setUp(self):
+        super(WriteTimeseriesNetCDFTest, self).setUp()
+        self.path = os.path.join(self.storage_dir, 'events.nc')
+        self.scalar = create_timeseries(Timeseries.ValueType.FLOAT)
+        self.scalar.set_array_events([1000, 2000], [1.0, 2.0])
+
+    def test_scalar_and_array_timeseries(self):
+        array = create_timeseries(
+            Timeseries.ValueType.FLOAT_ARRAY, location=self.scalar.location)
+        array.set_array_events([1000], [[1.0, 2.0, 3.0]])
+
+        self.assertEqual(
+            write_timeseries_netcdf(self.path, [self.scalar, array]), 3)
+
+        dataset = Dataset(self.path)
+        try:
+            self.assertEqual(dataset['row_size'][:].tolist(), [2, 0])
+            self.assertEqual(dataset['time'][:].tolist(), [1000, 2000])
+            self.assertEqual(dataset['value'][:].tolist(), [1.0, 2.0])
+            self.assertEqual(dataset['array_row_size'][:].tolist(), [0, 1])
+            self.assertEqual(dataset['array_time'][:].tolist(), [1000])
+            self.assertEqual(dataset['array_value'][:].tolist(),
+                             [[1.0, 2.0, 3.0]])
+        finally:
+            dataset.close()
+
+    def test_scalar_timeseries_only(self):
+        self.assertEqual(
+            write_timeseries_netcdf(self.path, [self.scalar], start=2000), 1)
+
+        dataset = Dataset(self.path)
+        try:
+            self.assertNotIn('position', dataset.dimensions)
+            self.assertNotIn('array_value', dataset.variables)
+            self.assertEqual(dataset['value'][:].tolist(), [2.0])
+        finally:
+            dataset.close()
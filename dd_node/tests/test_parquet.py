@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+# (c) Nelen & Schuurmans, see LICENSE.rst.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import glob
+import os
+
+from django.test import TestCase
+import numpy as np
+
+from dd_node.models import Timeseries
+from dd_node.parquet import dump_events
+from dd_node.parquet import dump_metadata
+from dd_node.parquet import restore_events
+from dd_node.parquet import restore_metadata
+from dd_node.tests.utils import TemporaryStorageMixin
+from dd_node.tests.utils import create_timeseries
+
+
+class DumpAndRestoreTest(TemporaryStorageMixin, TestCase):
+
+    def setUp(self):
+        super(DumpAndRestoreTest, self).setUp()
+        self.directory = os.path.join(self.storage_dir, 'dump')
+        self.scalar = create_timeseries(
+            Timeseries.ValueType.FLOAT, validate_max_hard=10.0)
+        self.scalar.set_array_events(
+            [1000, 2000, 3000], [1.0, float('nan'), 20.0])
+        self.array = create_timeseries(
+            Timeseries.ValueType.FLOAT_ARRAY, location=self.scalar.location)
+        self.array.set_array_events(
+            [1000, 2000], [[1.0, 2.0], [3.0, float('nan')]], [0, 1])
+        self.text = create_timeseries(
+            Timeseries.ValueType.TEXT, location=self.scalar.location)
+
+    def dump(self):
+        rows = dump_metadata(self.directory)
+        return rows, [dump_events(row['uuid'], self.directory)
+                      for row in rows]
+
+    def restore(self, uuid):
+        paths = sorted(glob.glob(os.path.join(
+            self.directory, 'events', '*', '*', '{}.parquet'.format(uuid))))
+        return restore_events(uuid, paths)
+
+    def test_dump(self):
+        rows, counts = self.dump()
+
+        counts = {row['uuid']: count for row, count in zip(rows, counts)}
+        self.assertEqual(counts, {
+            str(self.scalar.uuid): 3,
+            str(self.array.uuid): 2,
+            str(self.text.uuid): None,
+        })
+
+    def test_restore_numeric_and_float_array_events(self):
+        self.dump()
+        expected = [ts.array_store.read() for ts in (self.scalar, self.array)]
+        for ts in (self.scalar, self.array):
+            ts.array_store.delete()
+        self.scalar.delete()
+
+        self.assertEqual(restore_metadata(self.directory), 1)
+        scalar = Timeseries.objects.get(uuid=self.scalar.uuid)
+        self.assertEqual(scalar.validate_max_hard, 10.0)
+        self.assertEqual(self.restore(self.scalar.uuid), 3)
+        self.assertEqual(self.restore(self.array.uuid), 2)
+
+        for ts, (timestamps, values, flags) in zip(
+                (scalar, self.array), expected):
+            restored = ts.array_store.read()
+            np.testing.assert_array_equal(restored[0], timestamps)
+            np.testing.assert_array_equal(restored[1], values)
+            np.testing.assert_array_equal(restored[2], flags)
+        self.assertEqual(
+            Timeseries.objects.get(uuid=self.scalar.uuid).last_value, 20.0)
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+# (c) Nelen & Schuurmans, see LICENSE.rst.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import io
+
+from django.test import TestCase
+import mock
+
+from dd_node.models import Timeseries
+from dd_node.pixml import SkippedSeriesError
+from dd_node.pixml import import_pi_xml
+from dd_node.tests.utils import TemporaryStorageMixin
+from dd_node.tests.utils import create_timeseries
+
+PI_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<TimeSeries xmlns="http://www.wldelft.nl/fews/PI" version="1.2">
+  <timeZone>0.0</timeZone>
+  <series>
+    <header>
+      <locationId>location</locationId>
+      <parameterId>flagged</parameterId>
+      <missVal>-999.0</missVal>
+    </header>
+    <event date="1970-01-01" time="00:00:01" value="1.0" flag="3"/>
+    <event date="1970-01-01" time="00:00:02" value="-999"/>
+  </series>
+  <series>
+    <header>
+      <locationId>location</locationId>
+      <parameterId>validated</parameterId>
+    </header>
+    <event date="1970-01-01" time="00:00:01" value="1.0"/>
+    <event date="1970-01-01" time="00:00:02" value="20.0" flag="0"/>
+  </series>
+  <series>
+    <header>
+      <locationId>location</locationId>
+      <parameterId>text</parameterId>
+    </header>
+    <event date="1970-01-01" time="00:00:01" value="1.0"/>
+  </series>
+  <series>
+    <header>
+      <locationId>location</locationId>
+      <parameterId>missing</parameterId>
+    </header>
+    <event date="1970-01-01" time="00:00:01" value="1.0"/>
+  </series>
+</TimeSeries>
+"""
+
+
+# A batch per event, so that a series is stored in several batches.
+@mock.patch('dd_node.pixml.BATCH_SIZE', 1)
+class ImportPIXMLTest(TemporaryStorageMixin, TestCase):
+
+    def setUp(self):
+        super(ImportPIXMLTest, self).setUp()
+        self.flagged = create_timeseries(code='flagged')
+        self.validated = create_timeseries(
+            location=self.flagged.location, code='validated',
+            validate_max_hard=10.0)
+        create_timeseries(
+            Timeseries.ValueType.TEXT, location=self.flagged.location,
+            code='text')
+
+    def test_import(self):
+        with self.assertRaises(SkippedSeriesError) as context:
+            import_pi_xml(io.BytesIO(PI_XML.encode('utf-8')))
+
+        self.assertEqual(context.exception.count, 4)
+        self.assertEqual(len(context.exception.skipped), 2)
+
+        # Flags are decided once per series, by its first event.
+        timestamps, values, flags = self.flagged.array_store.read()
+        self.assertEqual(timestamps.tolist(), [1000, 2000])
+        self.assertEqual(values[0].tolist(), [1.0])
+        self.assertTrue(values[1, 0] != values[1, 0])  # missing, NaN
+        self.assertEqual(flags.tolist(), [
+            Timeseries.QualityFlag.DOUBTFUL,
+            Timeseries.QualityFlag.RELIABLE,
+        ])
+
+        _, _, flags = self.validated.array_store.read()
+        self.assertEqual(flags.tolist(), [
+            Timeseries.QualityFlag.RELIABLE,
+            Timeseries.QualityFlag.UNRELIABLE,
+        ])
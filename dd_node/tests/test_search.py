@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+# (c) Nelen & Schuurmans, see LICENSE.rst.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import RequestFactory
+from django.test import TestCase
+import mock
+
+from dd_node.views.search import SearchViewSet
+
+HITS = [(1, 0.9, None, None), (2, 0.8, None, None), (3, 0.7, None, None)]
+
+
+class SearchCacheTest(TestCase):
+
+    def setUp(self):
+        self.version = 1
+        self.queryset = mock.MagicMock()
+        self.queryset.count.return_value = 5
+        self.queryset.__getitem__.side_effect = (
+            lambda key: ['c', 'd', 'e'][key.start - 2:key.stop - 2])
+        for target, new in (
+                ('cache', LocMemCache('search', {})),
+                ('get_search_index_version', lambda: self.version),
+                ('get_hits', mock.Mock(return_value=HITS))):
+            patcher = mock.patch('dd_node.views.search.' + target, new)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def get_queryset(self):
+        view = SearchViewSet()
+        view.request = RequestFactory().get('/', {'q': 'water'})
+        view.search = mock.Mock(return_value=self.queryset)
+        return view.search, view.get_queryset()
+
+    def test_hits_are_cached(self):
+        search, results = self.get_queryset()
+        self.assertEqual(search.call_count, 1)
+        search, results = self.get_queryset()
+        self.assertEqual(search.call_count, 0)
+        self.assertEqual(results.hits, HITS)
+        self.assertEqual(results.count(), 3)
+
+    def test_index_change_invalidates_hits(self):
+        self.get_queryset()
+        self.version += 1
+        search, results = self.get_queryset()
+        self.assertEqual(search.call_count, 1)
+
+    @mock.patch('dd_node.views.search.SEARCH_CACHE_MAX_HITS', 2)
+    def test_many_hits_fall_back_to_queryset(self):
+        search, results = self.get_queryset()
+        self.assertEqual(results.hits, HITS[:2])
+        self.assertEqual(results.count(), 5)
+        self.assertEqual(results[2:4], ['c', 'd'])
+        # Not cached.
+        search, results = self.get_queryset()
+        self.assertEqual(search.call_count, 1)
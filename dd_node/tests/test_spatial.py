@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+# (c) Nelen & Schuurmans, see LICENSE.rst.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import json
+
+from django.http import QueryDict
+from django.test import TestCase
+from rest_framework.exceptions import ParseError
+
+from dd_node.models import Timeseries
+from dd_node.tests.utils import TemporaryStorageMixin
+from dd_node.tests.utils import create_timeseries
+from dd_node.utils.gis import parse_srid_param
+from dd_node.views.generic import parse_geometry_params
+
+
+class LocationTimeseriesTest(TemporaryStorageMixin, TestCase):
+
+    def test_unified_time_axis(self):
+        scalar = create_timeseries(Timeseries.ValueType.FLOAT)
+        scalar.set_array_events([1000, 2000], [1.0, float('nan')])
+        array = create_timeseries(
+            Timeseries.ValueType.FLOAT_ARRAY, location=scalar.location)
+        array.set_array_events([2000, 3000], [[1.0, 2.0], [3.0, 4.0]])
+        create_timeseries(
+            Timeseries.ValueType.TEXT, location=scalar.location)
+
+        response = scalar.location.get_timeseries()
+
+        data = {item['type']: item['data'] for item in response}
+        self.assertEqual(data['timestamp'], [1000, 2000, 3000])
+        self.assertEqual(data['float'], [1.0, None, None])
+        self.assertEqual(data['float array'],
+                         [None, [1.0, 2.0], [3.0, 4.0]])
+        self.assertEqual(data['text'], [None, None, None])
+        # NaN is not valid JSON.
+        json.dumps(response, allow_nan=False)
+
+    def test_start_and_end(self):
+        scalar = create_timeseries(Timeseries.ValueType.INTEGER)
+        scalar.set_array_events([1000, 2000, 3000], [1, 2, 3])
+
+        response = scalar.location.get_timeseries(start=2000, end=3000)
+
+        self.assertEqual(response[0]['data'], [2000, 3000])
+        self.assertEqual(response[1]['data'], [2.0, 3.0])
+
+
+class GeometryParamsTest(TestCase):
+
+    def test_srid(self):
+        self.assertEqual(parse_srid_param('28992'), 28992)
+        self.assertIsNone(parse_srid_param(''))
+        for srid in ('rd', '999999'):
+            with self.assertRaises(ValueError):
+                parse_srid_param(srid)
+
+    def test_invalid_params_are_bad_requests(self):
+        self.assertEqual(parse_geometry_params(QueryDict('srid=4326')),
+                         (None, 4326))
+        for query in ('srid=rd', 'srid=999999', 'simplify=far'):
+            with self.assertRaises(ParseError):
+                parse_geometry_params(QueryDict(query))
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+# (c) Nelen & Schuurmans, see LICENSE.rst.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from django.http import QueryDict
+from django.test import TestCase
+from rest_framework.exceptions import ParseError
+from rest_framework.test import APIRequestFactory
+
+from dd_node.models import Timeseries
+from dd_node.serializers.temporal import check_array_params
+from dd_node.tests.utils import TemporaryStorageMixin
+from dd_node.tests.utils import create_timeseries
+from dd_node.utils.conversion import datetime_to_milliseconds
+from dd_node.views.temporal import TimeseriesDataDetail
+
+
+class NumericEventsTest(TemporaryStorageMixin, TestCase):
+
+    def setUp(self):
+        super(NumericEventsTest, self).setUp()
+        self.timeseries = create_timeseries(Timeseries.ValueType.FLOAT)
+
+    def test_get_events_raw(self):
+        self.timeseries.set_array_events(
+            [2000, 1000, 3000], [2.0, 1.0, float('nan')])
+
+        self.assertEqual(self.timeseries.get_events_raw(), [
+            {'datetime': 1000, 'value': 1.0},
+            {'datetime': 2000, 'value': 2.0},
+            {'datetime': 3000, 'value': None},
+        ])
+        self.assertEqual(self.timeseries.get_events_raw(start=2000, end=2000),
+                         [{'datetime': 2000, 'value': 2.0}])
+
+    def test_period_and_last_value(self):
+        self.timeseries.set_array_events([2000, 3000], [2.0, 3.0])
+        self.timeseries.set_array_events([1000], [1.0])
+
+        timeseries = Timeseries.objects.get(pk=self.timeseries.pk)
+        self.assertEqual(datetime_to_milliseconds(timeseries.start), 1000)
+        self.assertEqual(datetime_to_milliseconds(timeseries.end), 3000)
+        self.assertEqual(timeseries.last_value, 3.0)
+
+        self.timeseries.set_array_events([4000], [4.0])
+        self.assertEqual(self.timeseries.last_value, 4.0)
+
+    def test_single_value_per_timestamp(self):
+        with self.assertRaises(ValueError):
+            self.timeseries.set_array_events([1000], [[1.0, 2.0]])
+
+    def test_text_events_are_not_stored(self):
+        text = create_timeseries(
+            Timeseries.ValueType.TEXT, location=self.timeseries.location)
+        with self.assertRaises(ValueError):
+            text.set_array_events([1000], [1.0])
+        with self.assertRaises(ValueError):
+            text.get_events_raw()
+
+
+class ArrayEventsTest(TemporaryStorageMixin, TestCase):
+
+    def setUp(self):
+        super(ArrayEventsTest, self).setUp()
+        self.timeseries = create_timeseries(
+            Timeseries.ValueType.FLOAT_ARRAY)
+        self.timeseries.set_array_events(
+            [1000, 2000, 3000], [[1.0, 1.5], [2.0, 2.5], [3.0, 3.5]],
+            [Timeseries.QualityFlag.NONE, Timeseries.QualityFlag.RELIABLE,
+             Timeseries.QualityFlag.UNRELIABLE])
+
+    def timestamps(self, **kwargs):
+        return [event['timestamp'] for event in
+                self.timeseries.get_array_events(**kwargs)]
+
+    def test_max_flag(self):
+        self.assertEqual(self.timestamps(), [1000, 2000, 3000])
+        self.assertEqual(self.timestamps(max_flag=3), [2000])
+        self.assertEqual(
+            self.timestamps(max_flag=3, unvalidated=True), [1000, 2000])
+
+    def test_unsupported_params(self):
+        check_array_params(QueryDict('window=flag&positions=0:1'))
+        for query in ('window=hour', 'fields=min', 'min_points=10'):
+            with self.assertRaises(ParseError):
+                check_array_params(QueryDict(query))
+
+
+class FileEventsTest(TemporaryStorageMixin, TestCase):
+
+    storage_settings = TemporaryStorageMixin.storage_settings + (
+        'dd_node.blobstore.BLOB_DIR',
+        'dd_node.blobstore.SERIES_DIR',
+    )
+
+    def get(self, timeseries, timestamp):
+        request = APIRequestFactory().get('/')
+        return TimeseriesDataDetail.as_view()(
+            request, uuid=str(timeseries.uuid), dt=str(timestamp))
+
+    def test_file_name(self):
+        timeseries = create_timeseries(Timeseries.ValueType.FILE)
+        timeseries.set_file(1000, b'%PDF', 'application/pdf')
+        timeseries.set_file(2000, b'data')  # without a content type
+
+        response = self.get(timeseries, 1000)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.filename,
+                         '{}-1000.pdf'.format(timeseries.uuid))
+
+        response = self.get(timeseries, 2000)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.filename,
+                         '{}-2000'.format(timeseries.uuid))
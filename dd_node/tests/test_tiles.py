@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+# (c) Nelen & Schuurmans, see LICENSE.rst.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from django.contrib.gis.geos import Point
+from django.contrib.gis.geos import Polygon
+from django.test import TestCase
+import mock
+
+from dd_node.tiles import invalidate_location_tiles
+from dd_node.tiles import tile_cache_key
+
+
+@mock.patch('dd_node.tiles.TILE_CACHE_MAX_ZOOM', 5)
+@mock.patch('dd_node.tiles.cache')
+class InvalidateLocationTilesTest(TestCase):
+
+    def deleted_keys(self, cache):
+        (keys, ), _ = cache.delete_many.call_args
+        return set(keys)
+
+    def test_point(self, cache):
+        invalidate_location_tiles([Point(5, 52, srid=4326), None])
+        keys = self.deleted_keys(cache)
+        self.assertEqual(len(keys), 6)
+        self.assertIn(tile_cache_key(5, 16, 10), keys)
+        cache.delete_pattern.assert_not_called()
+
+    def test_buffer(self, cache):
+        # On the corner of the 4 tiles of zoom level 1.
+        invalidate_location_tiles([Point(0, 0, srid=4326)])
+        keys = self.deleted_keys(cache)
+        for x, y in ((0, 0), (0, 1), (1, 0), (1, 1)):
+            self.assertIn(tile_cache_key(1, x, y), keys)
+
+    def test_large_geometry(self, cache):
+        invalidate_location_tiles(
+            [Polygon.from_bbox((-180, -85, 180, 85))])
+        # 1024 tiles at zoom level 5, 256 (the limit) at zoom level 4.
+        cache.delete_pattern.assert_called_once_with(
+            tile_cache_key(5, '*', '*'))
+        keys = self.deleted_keys(cache)
+        self.assertEqual(len(keys), 1 + 4 + 16 + 64 + 256)
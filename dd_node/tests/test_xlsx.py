@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+# (c) Nelen & Schuurmans, see LICENSE.rst.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import os
+
+from django.test import TestCase
+from openpyxl import load_workbook
+from rest_framework.exceptions import ParseError
+
+from dd_node.models import Timeseries
+from dd_node.renderers import XLSXRenderer
+from dd_node.tests.utils import TemporaryStorageMixin
+from dd_node.tests.utils import create_timeseries
+from dd_node.xlsx import MAX_COLUMNS
+from dd_node.xlsx import column_count
+from dd_node.xlsx import write_timeseries_xlsx
+
+
+class WriteTimeseriesXLSXTest(TemporaryStorageMixin, TestCase):
+
+    def setUp(self):
+        super(WriteTimeseriesXLSXTest, self).setUp()
+        self.path = os.path.join(self.storage_dir, 'events.xlsx')
+        self.scalar = create_timeseries(Timeseries.ValueType.FLOAT)
+        self.scalar.set_array_events([1000, 2000], [1.0, 2.0])
+        self.array = create_timeseries(
+            Timeseries.ValueType.FLOAT_ARRAY, location=self.scalar.location)
+
+    def test_columns_of_the_stored_events(self):
+        self.array.set_array_events([2000, 3000], [[1.0, 2.0], [3.0, 4.0]])
+
+        self.assertEqual(column_count([self.scalar, self.array]), 4)
+        rows = write_timeseries_xlsx(self.path, [self.scalar, self.array])
+
+        self.assertEqual(rows, 3)
+        sheet = load_workbook(self.path, read_only=True).active
+        values = [[cell.value for cell in row][1:] for row in sheet.rows]
+        self.assertEqual(values, [
+            ['location - timeseries',
+             'location - timeseries (0)', 'location - timeseries (1)'],
+            [1.0, None, None],
+            [2.0, 1.0, 2.0],
+            [None, 3.0, 4.0],
+        ])
+
+    def test_column_limit(self):
+        self.array.set_array_events([1000], [[1.0] * MAX_COLUMNS])
+
+        self.assertEqual(column_count([self.array]), MAX_COLUMNS + 1)
+        with self.assertRaises(ValueError):
+            write_timeseries_xlsx(self.path, [self.array])
+        with self.assertRaises(ParseError):
+            XLSXRenderer().response([self.array])
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+# (c) Nelen & Schuurmans, see LICENSE.rst.
+
+"""Helpers of the tests."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+
+import mock
+
+from dd_node.models import Location
+from dd_node.models import Node
+from dd_node.models import Timeseries
+
+
+def create_timeseries(value_type=Timeseries.ValueType.FLOAT, location=None,
+                      code='timeseries', **kwargs):
+    """Return a new timeseries, by default at a new location."""
+    if location is None:
+        node = Node.objects.create(
+            name='node', base_url='http://localhost/')
+        location = Location.objects.create(
+            node=node, code='location', name='location')
+    return Timeseries.objects.create(
+        node=location.node, location=location, code=code, name=code,
+        value_type=value_type, **kwargs)
+
+
+class TemporaryStorageMixin(object):
+    """Store events and exports in a temporary directory."""
+
+    storage_settings = (
+        'dd_node.eventstore.ARRAY_STORAGE_DIR',
+        'dd_node.exports.EXPORT_DIR',
+    )
+
+    def setUp(self):
+        super(TemporaryStorageMixin, self).setUp()
+        self.storage_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.storage_dir)
+        for name in self.storage_settings:
+            patcher = mock.patch(
+                name, os.path.join(self.storage_dir, name.split('.')[-1]))
+            patcher.start()
+            self.addCleanup(patcher.stop)
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+# (c) Nelen & Schuurmans, see LICENSE.rst.
+
+"""Thumbnails of the images of IMAGE timeseries.
+
+Thumbnails are made on demand, once per blob and size, and stored as JPEG
+next to the blob:
+
+    EVENT_FILE_DIR/blobs/ab/cd/abcd....256.jpg
+
+They are made by a pool of worker threads per process. Concurrent requests
+for the same thumbnail wait for the same job, so it is made only once.
+
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from multiprocessing.pool import ThreadPool
+import logging
+import os
+import tempfile
+import threading
+
+from django.conf import settings
+from PIL import Image
+
+from dd_node.blobstore import atomic_rename
+from dd_node.blobstore import blob_path
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_CONTENT_TYPE = 'image/jpeg'
+THUMBNAIL_QUALITY = 85
+THUMBNAIL_SIZES = getattr(
+    settings, 'EVENT_FILE_THUMBNAIL_SIZES', (64, 128, 256, 512))
+THUMBNAIL_THREADS = getattr(settings, 'EVENT_FILE_THUMBNAIL_THREADS', 4)
+THUMBNAIL_TIMEOUT = 60  # in seconds
+
+_pool = None
+_lock = threading.Lock()
+_in_flight = {}  # (digest, size) -> AsyncResult
+
+
+def thumbnail_path(digest, size):
+    return '{}.{}.jpg'.format(blob_path(digest), size)
+
+
+def parse_size_param(size):
+    """Return the thumbnail size of e.g. `?size=256`, None if absent."""
+    if size is None or size == "":
+        return None
+    try:
+        size = int(size)
+    except ValueError:
+        size = None
+    if size not in THUMBNAIL_SIZES:
+        raise ValueError("Invalid size parameter, expected one of {}.".format(
+            ', '.join(str(s) for s in THUMBNAIL_SIZES)))
+    return size
+
+
+def _make_thumbnail(digest, size):
+    path = thumbnail_path(digest, size)
+    if os.path.exists(path):
+        return
+
+    image = Image.open(blob_path(digest))
+    image.thumbnail((size, size), Image.ANTIALIAS)
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            image.save(f, 'JPEG', quality=THUMBNAIL_QUALITY)
+        atomic_rename(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _get_pool():
+    # The pool is made lazily, so that it is not shared by forked workers.
+    global _pool
+    if _pool is None:
+        _pool = ThreadPool(THUMBNAIL_THREADS)
+    return _pool
+
+
+def get_thumbnail(digest, size):
+    """Return the path of a thumbnail of a blob, make it if needed.
+
+    Args:
+      digest (str): digest of an image blob
+      size (int): maximum width and height, one of THUMBNAIL_SIZES
+
+    """
+    path = thumbnail_path(digest, size)
+    if os.path.exists(path):
+        return path
+
+    key = (digest, size)
+    with _lock:
+        result = _in_flight.get(key)
+        if result is None:
+            result = _get_pool().apply_async(_make_thumbnail, key)
+            _in_flight[key] = result
+
+    try:
+        result.get(THUMBNAIL_TIMEOUT)
+    finally:
+        with _lock:
+            if _in_flight.get(key) is result:
+                del _in_flight[key]
+
+    return path
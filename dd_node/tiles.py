@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+# (c) Nelen & Schuurmans, see LICENSE.rst.
+
+"""Mapbox Vector Tiles of locations.
+
+Tiles are rendered by PostGIS (ST_AsMVT, available since PostGIS 2.4) and
+cached per tile in the default (Redis) cache. Cached tiles are invalidated
+per tile when locations, or their timeseries, are written.
+
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from dd_node.utils.tiles import WEB_MERCATOR
+from dd_node.utils.tiles import tile_bounds
+from dd_node.utils.tiles import tile_count
+from dd_node.utils.tiles import tiles_for_extent
+
+logger = logging.getLogger(__name__)
+
+MVT_CONTENT_TYPE = 'application/vnd.mapbox-vector-tile'
+MVT_LAYER = 'locations'
+MVT_EXTENT = 4096  # tile resolution
+MVT_BUFFER = 64  # in tile resolution units
+
+# Tiles beyond this zoom level hold few locations and are not cached.
+TILE_CACHE_MAX_ZOOM = getattr(settings, 'LOCATION_TILE_CACHE_MAX_ZOOM', 16)
+TILE_CACHE_TIMEOUT = getattr(settings, 'LOCATION_TILE_CACHE_TIMEOUT', 86400)
+
+# When a (large) geometry touches more tiles than this at a zoom level,
+# all cached tiles at that zoom level are invalidated instead.
+TILE_INVALIDATION_LIMIT = 256
+
+LOCATION_TILE_SQL = """
+SELECT ST_AsMVT(tile, %(layer)s, %(extent)s, 'geom') FROM (
+    SELECT
+        ST_AsMVTGeom(
+            ST_Transform(ST_Force2D(location.geometry), {srid}),
+            ST_MakeEnvelope(%(xmin)s, %(ymin)s, %(xmax)s, %(ymax)s, {srid}),
+            %(extent)s, %(buffer)s, true
+        ) AS geom,
+        location.uuid::text AS uuid,
+        location.code,
+        location.name,
+        count(timeseries.id) AS timeseries_count,
+        (array_agg(timeseries.last_value_decimal
+                   ORDER BY timeseries."end" DESC NULLS LAST))[1]
+            AS last_value,
+        (extract(epoch FROM max(timeseries."end")) * 1000)::bigint
+            AS last_value_timestamp
+    FROM dd_node_location location
+    LEFT JOIN dd_node_timeseries timeseries
+        ON timeseries.location_id = location.id
+    WHERE location.geometry && ST_Transform(ST_MakeEnvelope(
+        %(bxmin)s, %(bymin)s, %(bxmax)s, %(bymax)s, {srid}), 4326)
+    GROUP BY location.id
+) tile
+WHERE tile.geom IS NOT NULL
+""".format(srid=WEB_MERCATOR)
+
+
+def tile_cache_key(z, x, y):
+    return 'location_tile_{}_{}_{}'.format(z, x, y)
+
+
+def render_location_tile(z, x, y):
+    """Return a Mapbox Vector Tile of the locations in a tile.
+
+    Every feature has the number of timeseries of the location and the
+    last value (and its timestamp in ms) of its most recent timeseries
+    as attributes.
+
+    """
+    xmin, ymin, xmax, ymax = tile_bounds(z, x, y)
+    margin = (xmax - xmin) * MVT_BUFFER / MVT_EXTENT
+    params = dict(
+        layer=MVT_LAYER,
+        extent=MVT_EXTENT,
+        buffer=MVT_BUFFER,
+        xmin=xmin,
+        ymin=ymin,
+        xmax=xmax,
+        ymax=ymax,
+        bxmin=xmin - margin,
+        bymin=ymin - margin,
+        bxmax=xmax + margin,
+        bymax=ymax + margin,
+    )
+    cursor = connection.cursor()
+    cursor.execute(LOCATION_TILE_SQL, params)
+    (tile, ) = cursor.fetchone()
+    return bytes(tile) if tile is not None else b''
+
+
+def get_location_tile(z, x, y):
+    """Return a Mapbox Vector Tile of locations, from cache if possible."""
+    if z > TILE_CACHE_MAX_ZOOM:
+        return render_location_tile(z, x, y)
+
+    key = tile_cache_key(z, x, y)
+    tile = cache.get(key)
+
+    if tile is None:
+        tile = render_location_tile(z, x, y)
+        cache.set(key, tile, TILE_CACHE_TIMEOUT)
+
+    return tile
+
+
+def invalidate_location_tiles(geometries):
+    """Invalidate the cached tiles that intersect any of the geometries.
+
+    Tiles whose buffer (MVT_BUFFER) intersects a geometry are invalidated
+    too, as they render it as well.
+
+    Args:
+      geometries (iterable): WGS84 GEOS geometries or None.
+
+    """
+    extents = [g.extent for g in geometries if g is not None and not g.empty]
+    if not extents:
+        return
+
+    margin = MVT_BUFFER / MVT_EXTENT  # in tiles
+    keys = set()
+    for z in range(TILE_CACHE_MAX_ZOOM + 1):
+        # Tiles shared by extents are counted twice, which errs on the
+        # safe side: the tiles themselves are only listed under the limit.
+        count = sum(tile_count(extent, z, margin) for extent in extents)
+        if count > TILE_INVALIDATION_LIMIT:
+            # NB: delete_pattern is specific to django-redis.
+            cache.delete_pattern(tile_cache_key(z, '*', '*'))
+            continue
+        for extent in extents:
+            keys.update(tile_cache_key(z, x, y)
+                        for x, y in tiles_for_extent(extent, z, margin))
+
+    cache.delete_many(list(keys))
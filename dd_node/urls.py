@@ -14,6 +14,7 @@ from django.shortcuts import redirect
 
 from dd_node.routers import OrderedDefaultRouter
 from dd_node.views import domain, generic, spatial, temporal, SearchViewSet
+from dd_node.views.async import Task, TaskStart
 
 admin.autodiscover()
 
@@ -52,6 +53,13 @@ urlpatterns = [
     url(r'^api-auth/', include('rest_framework.urls',
         namespace='rest_framework')),
 
+    url(r'^api/locations/tiles/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)\.mvt$',
+        spatial.LocationTile.as_view(), name='locations-tile'),
+
+    url(r'^api/tasks/(?P<uuid>[0-9a-f-]+)/$', Task.as_view(), name='task'),
+    url(r'^api/tasks/(?P<task_id>[0-9a-f-]+)/start/$', TaskStart.as_view(),
+        name='task-start'),
+
     url(r'^api/', include(router.urls)),
 
 ]
@@ -14,11 +14,11 @@ from datetime import datetime
 import logging
 
 import importlib
+import numpy as np
 import pytz
 import uuid
 
 from pyproj import Geod
-from math import sqrt
 from osgeo.ogr import osr
 
 logger = logging.getLogger(__name__)
@@ -28,6 +28,14 @@ EPOCH_AWARE = EPOCH_NAIVE.replace(tzinfo=pytz.UTC)
 
 WGS84 = 4326
 
+EARTH_RADIUS = 6371008.8  # mean radius in meters
+
+GEOD = Geod(ellps="WGS84")
+
+# Coordinate transformations are expensive to build, so they are cached
+# per (source, target) spatial reference.
+_coord_transformations = {}
+
 CSV_DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
 """string: template for MS Excel readable datetime string format
 """
@@ -43,14 +51,75 @@ def distances_in_meters(distances, coords):
     """
     start, end = coords  # in ((lon, lat), (lon, lat))
 
-    geod = Geod(ellps="WGS84")
-    angle1, angle2, distance = geod.inv(start[0], start[1], end[0], end[1])
+    d_in_m = distances * meters_per_degree([start], [end])[0]
+    return d_in_m
 
-    pyth_dist = sqrt(((start[0] - end[0]) ** 2) +
-                     ((start[1] - end[1]) ** 2))
 
-    d_in_m = distances * distance / pyth_dist
-    return d_in_m
+def geodesic_distances(starts, ends):
+    """
+    geodesic distances between many pairs of points on the WGS84 ellipsoid,
+    in a single call to pyproj
+
+    :param starts: (n, 2) array_like of (lon, lat)
+    :param ends: (n, 2) array_like of (lon, lat)
+    :returns: numpy array of n distances in meters
+    """
+    starts = np.asarray(starts, dtype=float).reshape(-1, 2)
+    ends = np.asarray(ends, dtype=float).reshape(-1, 2)
+
+    _, _, distances = GEOD.inv(
+        starts[:, 0], starts[:, 1], ends[:, 0], ends[:, 1])
+    return np.asarray(distances)
+
+
+def meters_per_degree(starts, ends):
+    """
+    ratios of geodesic to planar (degree) distance of many segments, to
+    convert distances along each segment from degrees to meters
+
+    :param starts: (n, 2) array_like of (lon, lat)
+    :param ends: (n, 2) array_like of (lon, lat)
+    :returns: numpy array of n ratios
+    """
+    starts = np.asarray(starts, dtype=float).reshape(-1, 2)
+    ends = np.asarray(ends, dtype=float).reshape(-1, 2)
+
+    planar = np.hypot(*(ends - starts).T)
+    return geodesic_distances(starts, ends) / planar
+
+
+def cumulative_geodesic_distances(coords):
+    """
+    geodesic distances from the start of a path to each of its vertices,
+    e.g. to position the samples of a profile along a transect
+
+    :param coords: (n, 2) array_like of (lon, lat)
+    :returns: numpy array of n distances in meters, starting at 0
+    """
+    coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+    distances = geodesic_distances(coords[:-1], coords[1:])
+    return np.concatenate(([0.0], np.cumsum(distances)))
+
+
+def haversine_distances(lon, lat, lons, lats):
+    """Return great-circle distances from one point to many points.
+
+    A spherical approximation, which is accurate to within 0.5% and a lot
+    faster than a geodesic computation on the ellipsoid.
+
+    :param lon: longitude of the point in degrees
+    :param lat: latitude of the point in degrees
+    :param lons: numpy array of longitudes in degrees
+    :param lats: numpy array of latitudes in degrees
+    :returns: numpy array of distances in meters
+    """
+    lon, lat = np.radians(lon), np.radians(lat)
+    lons, lats = np.radians(lons), np.radians(lats)
+
+    a = (np.sin((lats - lat) / 2) ** 2 +
+         np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2)
+
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
 
 
 def get_wgs84_transform(geometry):
@@ -59,12 +128,25 @@ def get_wgs84_transform(geometry):
     :param geometry: ogr geometry
     :returns: CoordinateTransformation
     """
-    source_srs = geometry.GetSpatialReference()
-    target_srs = osr.SpatialReference()
-    target_srs.ImportFromEPSG(WGS84)
-    coord_transformation = osr.CoordinateTransformation(source_srs, target_srs)
+    return get_coord_transformation(geometry.GetSpatialReference(), WGS84)
+
+
+def get_coord_transformation(source_srs, target_epsg):
+    """Return a cached CoordinateTransformation to an EPSG code.
+
+    :param source_srs: osr SpatialReference
+    :param target_epsg: EPSG code, e.g. 4326
+    :returns: CoordinateTransformation
+    """
+    key = (source_srs.ExportToWkt(), target_epsg)
+
+    if key not in _coord_transformations:
+        target_srs = osr.SpatialReference()
+        target_srs.ImportFromEPSG(target_epsg)
+        _coord_transformations[key] = osr.CoordinateTransformation(
+            source_srs, target_srs)
 
-    return coord_transformation
+    return _coord_transformations[key]
 
 
 def class_for_name(fqcn):
@@ -13,22 +13,105 @@ from __future__ import unicode_literals
 from __future__ import print_function
 
 import logging
-import math
 
+from django.contrib.gis.gdal import CoordTransform
+from django.contrib.gis.gdal import GDALException
+from django.contrib.gis.gdal import SpatialReference
+from django.contrib.gis.gdal import SRSException
 from django.contrib.gis.geos import GEOSGeometry
 from django.contrib.gis.geos import LineString
 from django.contrib.gis.geos import Point
 from django.contrib.gis.geos import GEOSException
 from django.db import connection
+from psycopg2 import Binary
+from shapely import wkb as shapely_wkb
+from shapely.ops import nearest_points
+import numpy as np
+
+from dd_node.utils.conversion import geodesic_distances
 
 logger = logging.getLogger(__name__)
 
+WGS84 = 4326
+
+# CoordTransforms per (source, target) SRID, see `get_coord_transform`.
+_coord_transforms = {}
+
+# SRIDs in spatial_ref_sys, see `parse_srid_param`.
+_known_srids = set()
+
+
+def get_coord_transform(source_srid, target_srid):
+    """Return a cached CoordTransform between two SRIDs.
+
+    Raises:
+      ValueError: if an SRID is unknown.
+
+    """
+    key = (source_srid, target_srid)
+
+    if key not in _coord_transforms:
+        try:
+            _coord_transforms[key] = CoordTransform(
+                SpatialReference(source_srid), SpatialReference(target_srid))
+        except (GDALException, SRSException):
+            raise ValueError("Unknown SRID: {} or {}.".format(
+                source_srid, target_srid))
+
+    return _coord_transforms[key]
+
+
+def parse_srid_param(srid):
+    """Return the SRID of e.g. `?srid=28992`, None if absent.
+
+    Geometries are transformed by PostGIS, so the SRID has to be in its
+    spatial_ref_sys table. Known SRIDs are remembered per process.
+
+    Raises:
+      ValueError: if the SRID is invalid or unknown.
+
+    """
+    if srid is None or srid == "":
+        return None
+    try:
+        srid = int(srid)
+    except ValueError:
+        raise ValueError("Invalid srid parameter: {}.".format(srid))
+    if srid not in _known_srids:
+        spatial_ref_sys = connection.ops.spatial_ref_sys()
+        if not spatial_ref_sys.objects.filter(srid=srid).exists():
+            raise ValueError("Unknown srid parameter: {}.".format(srid))
+        _known_srids.add(srid)
+    return srid
+
+
+def transform_geometries(geometries, srid):
+    """Reproject geometries, reusing a CoordTransform per source SRID.
+
+    Args:
+      geometries (list): GEOS geometries or None
+      srid (int): target SRID
+
+    Returns:
+      list of GEOS geometries (or None), in order
+
+    """
+    return [
+        geometry if geometry is None or geometry.srid == srid
+        else geometry.transform(
+            get_coord_transform(geometry.srid, srid), clone=True)
+        for geometry in geometries
+    ]
+
 
 def geometry_force_3D(geometry):
     """Force geometry to 3D.
 
-    Accepts 2D and 3D geos geometry's. Wrapper around PostGIS ST_Force3D:
-    http://postgis.net/docs/ST_Force_3D.html
+    Accepts 2D and 3D geos geometry's. Missing z values are set to 0, like
+    PostGIS ST_Force3D: http://postgis.net/docs/ST_Force_3D.html
+
+    The conversion is done in-process. ST_Force3D is only used as a
+    fallback, for geometries that cannot be rebuilt from coordinates.
 
     Args:
       geometry (obj or string): GEOS geometry (2D or 3D) or its (e)wkt.
@@ -36,20 +119,17 @@ def geometry_force_3D(geometry):
     Returns:
       3D geos geometry
     """
-    sql = "SELECT ST_Force3D('{}')".format(geometry)
-
-    cursor = connection.cursor()
-    cursor.execute(sql)
-    threed_geometry = GEOSGeometry(cursor.fetchone()[0])
-
-    return threed_geometry
+    return _force_dimensions(geometry, 3, 'ST_Force3D')
 
 
 def geometry_force_2D(geometry):
-    """Force geometry to 3D.
+    """Force geometry to 2D.
 
-    Accepts 2D and 3D geometry wkt's. Wrapper around PostGIS ST_Force2D:
-    http://postgis.net/docs/ST_Force_2D.html
+    Accepts 2D and 3D geos geometry's. Z values are dropped, like PostGIS
+    ST_Force2D: http://postgis.net/docs/ST_Force_2D.html
+
+    The conversion is done in-process. ST_Force2D is only used as a
+    fallback, for geometries that cannot be rebuilt from coordinates.
 
     Args:
       geometry (obj or string): GEOS geometry (2D or 3D) or its (e)wkt.
@@ -57,13 +137,118 @@ def geometry_force_2D(geometry):
     Returns:
       2D geos geometry
     """
-    sql = "SELECT ST_Force2D('{}')".format(geometry)
+    return _force_dimensions(geometry, 2, 'ST_Force2D')
+
+
+def _force_dimensions(geometry, dims, fallback):
+    if not isinstance(geometry, GEOSGeometry):
+        geometry = GEOSGeometry(geometry)
+
+    try:
+        return _rebuild_geometry(geometry, dims)
+    except (GEOSException, TypeError, ValueError):
+        logger.debug("Forcing %s with %s", geometry.geom_type, fallback)
+
+    sql = "SELECT {}(%s::geometry)".format(fallback)
 
     cursor = connection.cursor()
-    cursor.execute(sql)
-    twod_geometry = GEOSGeometry(cursor.fetchone()[0])
+    cursor.execute(sql, [geometry.ewkt])
+    forced_geometry = GEOSGeometry(cursor.fetchone()[0])
+
+    return forced_geometry
+
+
+def _rebuild_geometry(geometry, dims):
+    """Return a copy of a geometry with coordinates of 2 or 3 dimensions.
+
+    Raises:
+      TypeError: if the geometry cannot be rebuilt from its coordinates.
+
+    """
+    if geometry.empty:
+        raise TypeError("Cannot rebuild an empty geometry.")
+
+    geom_type = geometry.geom_type
+
+    if geom_type == 'Point':
+        rebuilt = Point(_force_coords(geometry.coords, dims))
+    elif geom_type in ('LineString', 'LinearRing'):
+        rebuilt = geometry.__class__(
+            [_force_coords(coords, dims) for coords in geometry.coords])
+    elif geom_type in ('Polygon', 'MultiPoint', 'MultiLineString',
+                       'MultiPolygon', 'GeometryCollection'):
+        # A polygon iterates over its rings, a collection over its members.
+        rebuilt = geometry.__class__(
+            *[_rebuild_geometry(part, dims) for part in geometry])
+    else:
+        raise TypeError("Cannot rebuild a {}.".format(geom_type))
 
-    return twod_geometry
+    rebuilt.srid = geometry.srid
+    return rebuilt
+
+
+def _force_coords(coords, dims):
+    if dims == 2:
+        return coords[:2]
+    elif len(coords) == 2:
+        return coords + (0.0, )
+    return coords
+
+
+def geometry_force_3D_many(geometries):
+    """Force geometries to 3D, see `geometry_force_3D`.
+
+    Geometries that cannot be converted in-process are converted by PostGIS
+    in a single query.
+
+    Args:
+      geometries (list): GEOS geometries (2D or 3D) or their (e)wkt.
+
+    Returns:
+      list of 3D geos geometries, in order
+    """
+    return _force_dimensions_many(geometries, 3, 'ST_Force3D')
+
+
+def geometry_force_2D_many(geometries):
+    """Force geometries to 2D, see `geometry_force_2D`.
+
+    Geometries that cannot be converted in-process are converted by PostGIS
+    in a single query.
+
+    Args:
+      geometries (list): GEOS geometries (2D or 3D) or their (e)wkt.
+
+    Returns:
+      list of 2D geos geometries, in order
+    """
+    return _force_dimensions_many(geometries, 2, 'ST_Force2D')
+
+
+def _force_dimensions_many(geometries, dims, fallback):
+    forced = []
+    remaining = []  # indices of geometries to be forced by PostGIS
+
+    for i, geometry in enumerate(geometries):
+        if not isinstance(geometry, GEOSGeometry):
+            geometry = GEOSGeometry(geometry)
+        try:
+            forced.append(_rebuild_geometry(geometry, dims))
+        except (GEOSException, TypeError, ValueError):
+            forced.append(geometry)
+            remaining.append(i)
+
+    if remaining:
+        sql = """
+        SELECT {}(ST_GeomFromEWKB(g.wkb))
+        FROM unnest(%s::bytea[]) WITH ORDINALITY AS g(wkb, i)
+        ORDER BY g.i
+        """.format(fallback)
+        results = _fetch_many(sql, [forced[i] for i in remaining])
+        for i, (result, ) in zip(remaining, results):
+            forced[i] = GEOSGeometry(result)
+
+    return forced
 
 
 def closest_point(geom1, geom2):
@@ -77,14 +262,41 @@ def closest_point(geom1, geom2):
     Returns:
         point geometry
     """
+    return closest_point_many([geom1], [geom2])[0]
+
+
+def closest_point_many(geoms1, geoms2, postgis=True):
+    """Get the closest points on geometries 1 from geometries 2.
+
+    Array version of `closest_point`: all pairs are handled by a single
+    query. With `postgis=False` the points are computed in-process by
+    GEOS (via Shapely), which does not need the database at all.
+
+    Args:
+        geoms1 (list): geometries
+        geoms2 (list): geometries, as many as geoms1
+
+    Returns:
+        list of point geometries, in order
+    """
+    if not postgis:
+        return [_closest_point_geos(g1, g2) for g1, g2 in zip(geoms1, geoms2)]
+
     sql = """
-    SELECT ST_ClosestPoint(ST_GeomFromText('{}'), ST_GeomFromText('{}'))
-    """.format(geom1.ewkt, geom2.ewkt)
-    cursor = connection.cursor()
-    cursor.execute(sql)
-    point = GEOSGeometry(cursor.fetchone()[0])
+    SELECT ST_ClosestPoint(ST_GeomFromEWKB(pair.g1), ST_GeomFromEWKB(pair.g2))
+    FROM unnest(%s::bytea[], %s::bytea[]) WITH ORDINALITY AS pair(g1, g2, i)
+    ORDER BY pair.i
+    """
+    return [GEOSGeometry(point) for (point, ) in
+            _fetch_many(sql, geoms1, geoms2)]
+
 
-    return point
+def _closest_point_geos(geom1, geom2):
+    point, _ = nearest_points(
+        shapely_wkb.loads(bytes(geom1.wkb)),
+        shapely_wkb.loads(bytes(geom2.wkb)),
+    )
+    return Point(point.x, point.y, srid=geom1.srid)
 
 
 def distance_along_line(point, line):
@@ -99,15 +311,45 @@ def distance_along_line(point, line):
     Returns:
         distance in meters (float)
     """
+    return distance_along_line_many([point], [line])[0]
+
+
+def distance_along_line_many(points, lines, postgis=True):
+    """Get the distances in meters of the closest points on lines to points,
+    on those lines.
+
+    Array version of `distance_along_line`: all pairs are handled by a
+    single query. With `postgis=False` the distances are computed
+    in-process: the position of the point by GEOS and the (WGS84) length
+    of the line by pyproj, on the ellipsoid like PostGIS.
+
+    Args:
+        points (list): Point geometries
+        lines (list): Linestring geometries, as many as points
+
+    Returns:
+        list of distances in meters (float), in order
+    """
+    if not postgis:
+        return [_line_length(line) * line.project_normalized(point)
+                for point, line in zip(points, lines)]
+
     sql = """
-    SELECT ST_Length(ST_GeomFromText('{}')::geography),
-    ST_LineLocatePoint(ST_GeomFromText('{}'), ST_GeomFromText('{}'))
-    """.format(line.ewkt, line.ewkt, point.ewkt)
-    cursor = connection.cursor()
-    cursor.execute(sql)
-    (length, fraction) = cursor.fetchone()
+    SELECT ST_Length(pair.line::geography) *
+        ST_LineLocatePoint(pair.line, pair.point)
+    FROM (
+        SELECT ST_GeomFromEWKB(p) AS point, ST_GeomFromEWKB(l) AS line, i
+        FROM unnest(%s::bytea[], %s::bytea[]) WITH ORDINALITY AS pair(p, l, i)
+    ) pair
+    ORDER BY pair.i
+    """
+    return [distance for (distance, ) in _fetch_many(sql, points, lines)]
+
 
-    return length * fraction
+def _line_length(line):
+    """Return the geodesic length in meters of a WGS84 linestring."""
+    coords = np.array(line.coords, dtype=float)[:, :2]
+    return float(np.sum(geodesic_distances(coords[:-1], coords[1:])))
 
 
 def calculate_area(geometry):
@@ -119,14 +361,40 @@ def calculate_area(geometry):
     Returns:
         (float) Area on the geoid in square meters.
     """
+    return calculate_area_many([geometry])[0]
+
+
+def calculate_area_many(geometries):
+    """Get the areas of geometries in square meters, in a single query.
+
+    Args:
+        geometries (list): Geos geometries.
+
+    Returns:
+        list of (float) areas on the geoid in square meters, in order.
+    """
     sql = """
-    SELECT ST_Area(ST_GeomFromText('{}')::geography)
-    """.format(geometry.ewkt)
-    cursor = connection.cursor()
-    cursor.execute(sql)
-    (area, ) = cursor.fetchone()
+    SELECT ST_Area(ST_GeomFromEWKB(g.wkb)::geography)
+    FROM unnest(%s::bytea[]) WITH ORDINALITY AS g(wkb, i)
+    ORDER BY g.i
+    """
+    return [area for (area, ) in _fetch_many(sql, geometries)]
+
 
-    return area
+def _fetch_many(sql, *geometry_lists, **kwargs):
+    """Execute a query over arrays of geometries and return all rows.
+
+    Every list of geometries is passed as an array of EWKB, to be unnested
+    in the query. Extra query parameters can be passed as `params`, these
+    follow the arrays.
+
+    """
+    params = [[Binary(bytes(g.ewkb)) for g in geometries]
+              for geometries in geometry_lists]
+    params.extend(kwargs.get('params', []))
+    cursor = connection.cursor()
+    cursor.execute(sql, params)
+    return cursor.fetchall()
 
 
 def connect_lines(geom1, geom2):
@@ -180,6 +448,35 @@ def connect_lines(geom1, geom2):
     point1 = closest_point(geom1, geom2)
     point2 = closest_point(geom2, geom1)
 
+    return _connect_lines(geom1, geom2, point1, point2)
+
+
+def connect_lines_many(pairs, postgis=True):
+    """Connect many pairs of disjoint line geometries, see `connect_lines`.
+
+    The closest points of all pairs, in both directions, are found at once
+    by `closest_point_many`.
+
+    Args:
+        pairs (list): (geom1, geom2) tuples of geos line geometries
+        postgis (bool): False to find closest points in-process
+
+    Returns:
+        list of (geom, changed_geom) tuples, in order
+    """
+    geoms1 = [geom1 for geom1, geom2 in pairs]
+    geoms2 = [geom2 for geom1, geom2 in pairs]
+    points = closest_point_many(
+        geoms1 + geoms2, geoms2 + geoms1, postgis=postgis)
+    n = len(pairs)
+
+    return [_connect_lines(geom1, geom2, point1, point2)
+            for (geom1, geom2), point1, point2
+            in zip(pairs, points[:n], points[n:])]
+
+
+def _connect_lines(geom1, geom2, point1, point2):
+    """Connect geom1 and geom2, given their closest points on each other."""
     if point1 == point2:
         # intersecting lines
         distances = {'d1': point1.distance(Point(geom1.coords[0])),
@@ -248,29 +545,53 @@ def orthogonal_lines(line, polygon, buffer_size=0.1):
         (list) orthogonal lines at start point and end point of `line`
 
     """
-    if not (polygon.contains(line)):
-        raise GEOSException("Error: line is outside polygon")
+    return orthogonal_lines_many([line], [polygon], buffer_size)[0]
+
+
+def orthogonal_lines_many(lines, polygons, buffer_size=0.1):
+    """Get orthogonal lines for many lines in polygons, in a single query.
+
+    Array version of `orthogonal_lines`.
+
+    Args:
+        lines (list): line geometries
+        polygons (list): polygon geometries, as many as lines
+        buffer_size (int): buffer size in projection units
 
-    mid_point = line.interpolate_normalized(0.5)
-    mid_point.set_srid(line.srid)
+    Returns:
+        list of orthogonal lines at start point and end point of every line,
+        in order
+
+    """
+    for line, polygon in zip(lines, polygons):
+        if not (polygon.contains(line)):
+            raise GEOSException("Error: line is outside polygon")
 
     sql = """
-    SELECT ortho.geom FROM ST_Dump(ST_Intersection(
-        ST_Boundary(ST_Buffer(ST_GeomFromText('{}'), {}, 'endcap=flat')),
-        ST_GeomFromText('{}'))) ortho
-    ORDER BY ST_Distance(ST_GeomFromText('{}'), ortho.geom)
-    """.format(line.ewkt, buffer_size, polygon.ewkt, mid_point.ewkt)
+    SELECT pair.i, ortho.geom
+    FROM (
+        SELECT ST_GeomFromEWKB(l) AS line, ST_GeomFromEWKB(p) AS polygon, i
+        FROM unnest(%s::bytea[], %s::bytea[]) WITH ORDINALITY AS pair(l, p, i)
+    ) pair
+    CROSS JOIN LATERAL ST_Dump(ST_Intersection(
+        ST_Boundary(ST_Buffer(pair.line, %s, 'endcap=flat')),
+        pair.polygon)) ortho
+    ORDER BY pair.i, ST_Distance(
+        ST_LineInterpolatePoint(pair.line, 0.5), ortho.geom)
+    """
+    results = [[] for line in lines]
+    for i, geom in _fetch_many(sql, lines, polygons, params=[buffer_size]):
+        results[i - 1].append(geom)
 
-    cursor = connection.cursor()
-    cursor.execute(sql)
-    results = cursor.fetchall()
-    line1 = GEOSGeometry(results[0][0])
-    line2 = GEOSGeometry(results[1][0])
-    line1.srid = line.srid
-    line2.srid = line.srid
-    lines = [line2, line2]
+    orthogonal = []
+    for line, result in zip(lines, results):
+        line1 = GEOSGeometry(result[0])
+        line2 = GEOSGeometry(result[1])
+        line1.srid = line.srid
+        line2.srid = line.srid
+        orthogonal.append([line1, line2])
 
-    return lines
+    return orthogonal
 
 
 def point_list_to_point_pairs(point_list):
@@ -298,11 +619,25 @@ def point_distance(p1, p2):
       Distance in units of input points coordinate system.
 
     """
-    dx = p2[0] - p1[0]
-    dy = p2[1] - p1[1]
+    return float(point_distances([p1[:2]], [p2[:2]])[0])
+
+
+def point_distances(p1s, p2s):
+    """Returns the distances between many pairs of points.
+
+    Assumes a projection where coordinates are in meters!, like RD.
+
+    Args:
+      p1s (array_like): (n, 2) points with x and y coordinate
+      p2s (array_like): (n, 2) points with x and y coordinate
 
-    dist = math.sqrt(dx ** 2 + dy ** 2)
-    return dist
+    Returns:
+      numpy array of n distances in units of the coordinate system.
+
+    """
+    p1s = np.asarray(p1s, dtype=float).reshape(-1, 2)
+    p2s = np.asarray(p2s, dtype=float).reshape(-1, 2)
+    return np.hypot(*(p2s - p1s).T)
 
 
 def points_to_intervals(points, length):
@@ -323,23 +658,118 @@ def points_to_intervals(points, length):
     Returns:
       sorted list of point tuples with x and y
     """
+    points = np.sort(np.array([float(point) for point in points]))
+    points = points[(0 <= points) & (points <= length)]
+
+    if not len(points):
+        return []
 
-    points = sorted(float(point) for point in points)
-    points = [point for point in points if 0 <= point <= length]
+    bounds = np.concatenate(([0.0], (points[:-1] + points[1:]) / 2, [length]))
 
-    result = []
-    start = 0.0
+    return list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
 
-    while len(points) > 1:
-        end = (points[0] + points[1]) / 2
-        result.append((start, end))
-        points.pop(0)
-        start = end
 
-    if len(points) == 1:
-        result.append((start, length))
+class LinearReference(object):
+    """Linear referencing along a linestring.
 
-    return result
+    The cumulative lengths of the segments are computed once. Positions,
+    in meters from the start of the linestring, are then located by binary
+    search, for many positions at once.
+
+    Assumes a projection where coordinates are in meters!, like RD.
+
+    Args:
+      linestring (list): list of coordinate tuples with x and y
+
+    """
+    def __init__(self, linestring):
+        self.linestring = list(linestring)
+        self.coords = np.array(
+            [coords[:2] for coords in self.linestring], dtype=float)
+        segments = point_distances(self.coords[:-1], self.coords[1:])
+        self.cumulative = np.concatenate(([0.0], np.cumsum(segments)))
+
+    @property
+    def length(self):
+        return float(self.cumulative[-1])
+
+    def locate(self, positions, side='left'):
+        """Return the segments that contain positions and the points there.
+
+        Args:
+          positions (array_like): positions in meters
+          side (str): a position on a vertex is located in the segment
+            that ends ('left') or starts ('right') there.
+
+        Returns:
+          tuple of an array of segment indices and an (n, 3) array of
+          (x, y, 0) points. Both are masked where a position is not on
+          the linestring.
+
+        """
+        positions = np.asarray(positions, dtype=float)
+        indices = np.searchsorted(self.cumulative[1:], positions, side=side)
+        invalid = (positions < 0) | (positions > self.cumulative[-1])
+        indices = np.minimum(indices, len(self.coords) - 2)
+        indices = np.where(invalid, 0, indices)
+
+        starts = self.cumulative[indices]
+        lengths = self.cumulative[indices + 1] - starts
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fractions = np.where(
+                lengths > 0, (positions - starts) / lengths, 0.0)
+
+        p1 = self.coords[indices]
+        p2 = self.coords[indices + 1]
+        points = np.zeros((len(positions), 3))
+        points[:, :2] = p1 + fractions[:, np.newaxis] * (p2 - p1)
+
+        mask = np.repeat(invalid[:, np.newaxis], 3, axis=1)
+        return (np.ma.masked_array(indices, invalid),
+                np.ma.masked_array(points, mask))
+
+    def points(self, positions):
+        """Return the (x, y, 0) tuples at positions, None if not on the
+        linestring."""
+        _, points = self.locate(positions)
+        return [None if point.mask.any() else tuple(point.tolist())
+                for point in points]
+
+    def intervals(self, intervals):
+        """Cut intervals from the linestring.
+
+        Args:
+          intervals (list): list of (pos1, pos2) pairs
+
+        Returns:
+          list of lists of point tuples
+
+        Raises:
+          ValueError: if a position is not on the linestring.
+
+        """
+        if not len(intervals):
+            return []
+
+        intervals = np.asarray(intervals, dtype=float)
+        starts, p1s = self.locate(intervals[:, 0], side='right')
+        ends, p2s = self.locate(intervals[:, 1], side='left')
+
+        if np.ma.is_masked(starts) or np.ma.is_masked(ends):
+            raise ValueError("Interval not on linestring.")
+
+        # The vertices between p1 and p2 are the ends of the segments from
+        # the one that contains p1 up to the one that contains p2.
+        return [
+            [tuple(p1)] + self.linestring[i1 + 1:i2 + 1] + [tuple(p2)]
+            for i1, i2, p1, p2 in zip(
+                starts.data.tolist(), ends.data.tolist(),
+                p1s.data.tolist(), p2s.data.tolist())
+        ]
+
+    def interval(self, interval):
+        """Cut an interval, a (pos1, pos2) pair, from the linestring."""
+        return self.intervals([interval])[0]
 
 
 def linestring_intervals(linestring, intervals):
@@ -356,14 +786,15 @@ def linestring_intervals(linestring, intervals):
     Returns:
       list of point tuples with x and y coordinate
     """
-
-    for interval in intervals:
-        yield find_linestring_interval(linestring, interval)
+    for result in LinearReference(linestring).intervals(intervals):
+        yield result
 
 
 def find_linestring_interval(linestring, interval):
     """Cut interval from linestring.
 
+    Use a `LinearReference` to cut many intervals from the same linestring.
+
     Args:
       linestring (list): list of coordinate tuples with x and y
       interval (tuple): tuple of pos1, pos2
@@ -372,14 +803,7 @@ def find_linestring_interval(linestring, interval):
       list of point tuples
 
     """
-    start, end = interval
-
-    point_pairs = point_list_to_point_pairs(linestring)
-
-    i1, p1 = find_position_in_point_pairs(point_pairs, start)
-    i2, p2 = find_position_in_point_pairs(point_pairs, end)
-
-    return [p1] + linestring[i1 + 1:i2] + [p2]
+    return LinearReference(linestring).interval(interval)
 
 
 def position_in_point_pair(p1, p2, pos):
@@ -400,9 +824,30 @@ def position_in_point_pair(p1, p2, pos):
 
     assert 0.0 <= pos <= 1.0
 
-    delta = (p2[0] - p1[0], p2[1] - p1[1])
+    x, y, _ = positions_in_point_pairs([p1[:2]], [p2[:2]], [pos])[0].tolist()
+
+    return (x, y, 0)
 
-    return (p1[0] + pos * delta[0], p1[1] + pos * delta[1], 0)
+
+def positions_in_point_pairs(p1s, p2s, positions):
+    """Return interpolations of many pairs of points.
+
+    Args:
+      p1s (array_like): (n, 2) points with x and y coordinate
+      p2s (array_like): (n, 2) points with x and y coordinate
+      positions (array_like): n relative positions between p1 and p2
+
+    Returns:
+      (n, 3) numpy array of (x, y, z) where z is always `0`
+
+    """
+    p1s = np.asarray(p1s, dtype=float).reshape(-1, 2)
+    p2s = np.asarray(p2s, dtype=float).reshape(-1, 2)
+    positions = np.asarray(positions, dtype=float).reshape(-1, 1)
+
+    points = np.zeros((len(p1s), 3))
+    points[:, :2] = p1s + positions * (p2s - p1s)
+    return points
 
 
 def find_position_in_point_pairs(point_pairs, pos):
@@ -418,12 +863,22 @@ def find_position_in_point_pairs(point_pairs, pos):
 
     """
 
-    for i, (p1, p2) in enumerate(point_pairs):
-        distance = point_distance(p1, p2)
+    point_pairs = list(point_pairs)
+
+    if not point_pairs or pos < 0:
+        return None, None
+
+    p1s = np.array([p1[:2] for p1, _ in point_pairs], dtype=float)
+    p2s = np.array([p2[:2] for _, p2 in point_pairs], dtype=float)
+    ends = np.cumsum(point_distances(p1s, p2s))
+
+    i = int(np.searchsorted(ends, pos, side='left'))
 
-        if pos <= distance:
-            return i, position_in_point_pair(p1, p2, pos/distance)
+    if i == len(ends):
+        return None, None
 
-        pos -= distance
+    distance = ends[i] - (ends[i - 1] if i else 0.0)
+    relative = (pos - ends[i] + distance) / distance if distance else 0.0
+    relative = min(max(relative, 0.0), 1.0)  # rounding
 
-    return None, None
+    return i, position_in_point_pair(p1s[i], p2s[i], relative)
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+# (c) Nelen & Schuurmans, see LICENSE.rst.
+
+"""
+Tile utils
+~~~~~~~~~~~~~~~~~~~~
+Utilities for map tiles in the XYZ tiling scheme (Web Mercator, top left
+origin), as used by OpenStreetMap, Google Maps, Mapbox, etc.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import math
+
+WEB_MERCATOR = 3857
+
+# Half the circumference of the earth in Web Mercator meters.
+ORIGIN_SHIFT = 20037508.342789244
+
+# The latitude beyond which Web Mercator is not defined.
+MAX_LATITUDE = 85.0511287798066
+
+
+def tile_bounds(z, x, y):
+    """Return the bounds of a tile in Web Mercator meters.
+
+    Args:
+      z (int): zoom level
+      x (int): column, from west to east
+      y (int): row, from north to south
+
+    Returns:
+      tuple of (xmin, ymin, xmax, ymax)
+
+    """
+    size = 2 * ORIGIN_SHIFT / 2 ** z
+    xmin = -ORIGIN_SHIFT + x * size
+    ymax = ORIGIN_SHIFT - y * size
+    return xmin, ymax - size, xmin + size, ymax
+
+
+def lonlat_to_tile(lon, lat, z):
+    """Return the (fractional) tile coordinates of a WGS84 coordinate.
+
+    The integer parts are the column and row of the tile that contains
+    the coordinate. Latitudes are clipped to the Web Mercator range.
+
+    Args:
+      lon (float): longitude in degrees
+      lat (float): latitude in degrees
+      z (int): zoom level
+
+    Returns:
+      tuple of (x, y) floats
+
+    """
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    n = 2 ** z
+    x = (lon + 180) / 360 * n
+    lat_rad = math.radians(lat)
+    y = (1 - math.log(math.tan(lat_rad) + 1 / math.cos(lat_rad)) /
+         math.pi) / 2 * n
+    return x, y
+
+
+def lonlat_to_tile_index(lon, lat, z):
+    """Return the column and row of the tile that contains a coordinate.
+
+    Args:
+      lon (float): longitude in degrees
+      lat (float): latitude in degrees
+      z (int): zoom level
+
+    Returns:
+      tuple of (x, y) ints
+
+    """
+    n = 2 ** z
+    x, y = lonlat_to_tile(lon, lat, z)
+    return max(0, min(n - 1, int(x))), max(0, min(n - 1, int(y)))
+
+
+def tile_range(extent, z, margin=0):
+    """Return the range of tiles that intersect a WGS84 extent.
+
+    Args:
+      extent (tuple): (xmin, ymin, xmax, ymax) in degrees
+      z (int): zoom level
+      margin (float): optional margin around the extent, in tiles
+
+    Returns:
+      tuple of (xmin, ymin, xmax, ymax) tile indices, inclusive
+
+    """
+    n = 2 ** z
+    xmin, ymin, xmax, ymax = extent
+    x1, y1 = lonlat_to_tile(xmin, ymax, z)  # top left
+    x2, y2 = lonlat_to_tile(xmax, ymin, z)  # bottom right
+
+    def index(t):
+        return max(0, min(n - 1, int(math.floor(t))))
+
+    return (index(x1 - margin), index(y1 - margin),
+            index(x2 + margin), index(y2 + margin))
+
+
+def tile_count(extent, z, margin=0):
+    """Return the number of tiles that intersect a WGS84 extent."""
+    x1, y1, x2, y2 = tile_range(extent, z, margin)
+    return (x2 - x1 + 1) * (y2 - y1 + 1)
+
+
+def tiles_for_extent(extent, z, margin=0):
+    """Return the tiles that intersect a WGS84 extent at a zoom level.
+
+    Args:
+      extent (tuple): (xmin, ymin, xmax, ymax) in degrees
+      z (int): zoom level
+      margin (float): optional margin around the extent, in tiles
+
+    Returns:
+      list of (x, y) tuples
+
+    """
+    x1, y1, x2, y2 = tile_range(extent, z, margin)
+    return [(x, y) for x in range(x1, x2 + 1) for y in range(y1, y2 + 1)]
+
+
+def is_valid_tile(z, x, y):
+    """Return True if (z, x, y) is an existing tile."""
+    return 0 <= x < 2 ** z and 0 <= y < 2 ** z
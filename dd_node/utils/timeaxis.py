@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+# (c) Nelen & Schuurmans, see LICENSE.rst.
+
+"""
+Time axis utils
+~~~~~~~~~~~~~~~~~~~~
+Utilities to align the events of several timeseries on a single time axis.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def unified_time_axis(timestamps):
+    """Return the sorted union of several arrays of timestamps.
+
+    Args:
+      timestamps (list): arrays of timestamps (e.g. in ms)
+
+    Returns:
+      sorted numpy array of unique timestamps
+    """
+    # Empty arrays are left out, they would turn integers into floats.
+    timestamps = [np.asarray(t) for t in timestamps if len(t)]
+    if not timestamps:
+        return np.empty(0, dtype=np.int64)
+    return np.unique(np.concatenate(timestamps))
+
+
+def align_to_time_axis(axis, timestamps, values, missing=None):
+    """Return the values of a timeseries at every timestamp of an axis.
+
+    Args:
+      axis (array): sorted timestamps, including all of `timestamps`
+      timestamps (array): timestamps of the timeseries
+      values (array): (n, ) or (n, m) values of the timeseries, a value or
+        a row of values per timestamp
+      missing: value at timestamps without an event
+
+    Returns:
+      list of len(axis) values (or lists of values), with None for NaN
+      values, which JSON does not have
+    """
+    values = np.asarray(values, dtype=np.float64)
+    index = np.searchsorted(axis, timestamps)
+
+    aligned = np.full((len(axis), ) + values.shape[1:], np.nan)
+    aligned[index] = values
+    present = np.zeros(len(axis), dtype=bool)
+    present[index] = True
+
+    unknown = np.isnan(aligned)
+    aligned = aligned.astype(object)
+    aligned[unknown] = None
+
+    # Only the timestamps without an event are visited in Python.
+    aligned = aligned.tolist()
+    for i in np.flatnonzero(~present).tolist():
+        aligned[i] = missing
+    return aligned
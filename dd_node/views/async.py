@@ -13,10 +13,13 @@ import os
 from celery import states
 from celery.result import AsyncResult
 from django.conf import settings
+from django.http import HttpResponseRedirect
 from rest_framework.response import Response
 from rest_framework.reverse import reverse
 from rest_framework.views import APIView
 
+from dd_node.tasks import PROGRESS
+
 logger = logging.getLogger(__name__)
 
 
@@ -37,7 +40,19 @@ def _reverse(*args, **kwargs):
 
     """
     url = reverse(*args, **kwargs)
-    return url[:url.find('?')]
+    return url.split('?')[0]
+
+
+def is_async(request):
+    """Return True if a request asks for an asynchronous task."""
+    return request.query_params.get('async', '').lower() == 'true'
+
+
+def start_task(request, task, *args, **kwargs):
+    """Enqueue a Celery task and redirect to its `TaskStart` url."""
+    result = task.delay(*args, **kwargs)
+    return HttpResponseRedirect(
+        _reverse('task-start', args=[result.id], request=request))
 
 
 class Task(APIView):
@@ -54,9 +69,13 @@ class Task(APIView):
         else:
             url = None
 
+        # The number of rows written and the total.
+        progress = result.info if result.status == PROGRESS else None
+
         response = {
             'task_id': result.task_id,
             'task_status': result.status,
+            'task_progress': progress,
             'result_url': url,
         }
 
@@ -9,11 +9,14 @@ from __future__ import unicode_literals
 import logging
 import mimetypes
 
+from rest_framework.exceptions import ParseError
 from rest_framework.viewsets import ModelViewSet
 
 from dd_node.mixins import ExceptionMixin
 from dd_node.models import Node
 from dd_node.serializers import generic
+from dd_node.simplification import parse_simplify_param
+from dd_node.utils.gis import parse_srid_param
 
 logger = logging.getLogger(__name__)
 
@@ -52,6 +55,20 @@ def add_filename_to_response(response, request, filename):
         response.filename = filename
 
 
+def parse_geometry_params(params):
+    """Return the simplify level and SRID of the geometries of a request.
+
+    Raises:
+      ParseError: if either parameter is invalid (a 400).
+
+    """
+    try:
+        return (parse_simplify_param(params.get('simplify')),
+                parse_srid_param(params.get('srid')))
+    except ValueError as e:
+        raise ParseError('{}'.format(e))
+
+
 class NodeViewSet(ExceptionMixin, ModelViewSet):
     lookup_field = 'uuid'
     model = Node
@@ -6,16 +6,23 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import hashlib
+import json
 import logging
 
+from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
 from django.db.models import FloatField, Q, Value
+import numpy as np
 from rest_framework.viewsets import ReadOnlyModelViewSet
 from watson import search as watson
 from watson.models import SearchEntry
 
 from dd_node.mixins import ExceptionMixin
+from dd_node.search import get_search_index_version
 from dd_node.serializers import WatsonSearchSerializer
+from dd_node.utils.conversion import haversine_distances
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +39,21 @@ CONDITIONS = dict(
     rasterstore=Q(result__isnull=True),
 )
 
+# Hit lists of (identical) searches are cached until the search index
+# changes. Searches with more hits than this are not cached: their top hits
+# are served from the hit list, their count and further pages from the
+# (paginated) search queryset.
+
+SEARCH_CACHE_TIMEOUT = getattr(settings, 'SEARCH_CACHE_TIMEOUT', 3600)
+SEARCH_CACHE_MAX_HITS = getattr(settings, 'SEARCH_CACHE_MAX_HITS', 1000)
+
+# A search `near` a point reranks the top hits by distance. The rank of a
+# hit is divided by 2 at NEAR_DISTANCE_SCALE, by 3 at twice that, etc.
+
+SEARCH_NEAR_TOP_K = getattr(settings, 'SEARCH_NEAR_TOP_K', 100)
+SEARCH_NEAR_DISTANCE_SCALE = getattr(
+    settings, 'SEARCH_NEAR_DISTANCE_SCALE', 10000)  # in meters
+
 
 def build_model_list(types):
     model_list = []
@@ -46,6 +68,135 @@ def build_model_list(types):
     return model_list
 
 
+def search_cache_key(query, types, exclude):
+    """Return the cache key of the hit list of a search.
+
+    The query is normalised, so that e.g. `?q=Riool plantsoen` and
+    `?q=plantsoen&q=riool` share a key. The key contains the version
+    of the search index: bumping it invalidates all cached hit lists.
+
+    """
+    normalised = [
+        sorted(set(query.lower().split())),
+        sorted(set(types)),
+        sorted(set(exclude)),
+    ]
+    digest = hashlib.md5(json.dumps(normalised).encode('utf-8')).hexdigest()
+    return 'search_hits_{}_{}'.format(get_search_index_version(), digest)
+
+
+def get_hits(results):
+    """Return the hit list of a search: a list of (id, rank, x, y) tuples.
+
+    The coordinates are read from the meta data stored in the search
+    index, see `dd_node.search.SearchMixin.get_meta`. They are None
+    for search entries without geometry.
+
+    """
+    hits = []
+    for pk, rank, meta_encoded in results.values_list(
+            'id', 'watson_rank', 'meta_encoded')[:SEARCH_CACHE_MAX_HITS + 1]:
+        meta = json.loads(meta_encoded)
+        hits.append((pk, rank, meta.get('x'), meta.get('y')))
+    return hits
+
+
+def rerank_near(hits, lon, lat):
+    """Rerank the top hits by their distance to a point.
+
+    The distances of all top hits are computed in a single vectorised
+    pass from the coordinates in the hit list: no geometries are queried.
+    Hits without coordinates are treated as if they were as far away as
+    the farthest hit with coordinates.
+
+    Args:
+      hits (list): (id, rank, x, y) tuples ordered by rank.
+      lon (float): longitude of the point.
+      lat (float): latitude of the point.
+
+    Returns:
+      list: (id, rank, x, y) tuples ordered by the new rank.
+
+    """
+    top, rest = hits[:SEARCH_NEAR_TOP_K], hits[SEARCH_NEAR_TOP_K:]
+    if not top:
+        return hits
+
+    # No query means no text ranking: rank by distance only.
+    ranks = np.array(
+        [1.0 if rank is None else rank for _, rank, _, _ in top])
+    xs = np.array([np.nan if x is None else x for _, _, x, _ in top])
+    ys = np.array([np.nan if y is None else y for _, _, _, y in top])
+
+    distances = haversine_distances(lon, lat, xs, ys)
+    unknown = np.isnan(distances)
+    distances[unknown] = 0.0 if unknown.all() else distances[~unknown].max()
+
+    ranks = ranks / (1 + distances / SEARCH_NEAR_DISTANCE_SCALE)
+    order = np.argsort(-ranks, kind='mergesort')  # stable
+
+    reranked = [
+        (top[i][0], float(ranks[i]), top[i][2], top[i][3]) for i in order]
+    return reranked + rest
+
+
+def parse_near(near):
+    """Return (lon, lat) from a `near` query parameter, e.g. `5.1,52.1`."""
+    try:
+        lon, lat = [float(x) for x in near.split(',')]
+    except ValueError:
+        raise ValueError("Invalid near parameter: {}.".format(near))
+    return lon, lat
+
+
+class RankedSearchResults(object):
+    """A sliceable sequence of search entries backed by a hit list.
+
+    The hit list is a list of (id, rank, x, y) tuples in order of ranking.
+    Only the entries of the requested slice (i.e. page) are fetched.
+
+    If the hit list has only the top hits of a search, the queryset of the
+    search is given as well. The search is then counted and sliced beyond
+    the hit list in the database.
+
+    """
+    def __init__(self, hits, queryset=None):
+        self.hits = hits
+        self.queryset = queryset
+        self._count = None
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1 or None][0]
+        start, stop, _ = key.indices(len(self))
+        hits = self.hits[start:stop]
+        entries = SearchEntry.objects.in_bulk([hit[0] for hit in hits])
+        results = []
+        for pk, rank, x, y in hits:
+            entry = entries.get(pk)
+            if entry is None:
+                continue  # Deleted in the meantime.
+            entry.watson_rank = rank
+            results.append(entry)
+        if self.queryset is not None and stop > len(self.hits):
+            results.extend(
+                self.queryset[max(start, len(self.hits)):stop])
+        return results
+
+    def count(self):
+        if self.queryset is None:
+            return len(self.hits)
+        if self._count is None:
+            self._count = self.queryset.count()
+        return self._count
+
+
 class SearchViewSet(ExceptionMixin, ReadOnlyModelViewSet):
     """A full-text search ViewSet.
 
@@ -57,6 +208,10 @@ class SearchViewSet(ExceptionMixin, ReadOnlyModelViewSet):
         *Optional* full-text search filter. A search query filter should at
         least contain two characters.
 
+    near
+        *Optional* ``lon,lat`` (WGS84) to boost the top hits that are near
+        this point, e.g. the center of the map.
+
     """
     serializer_class = WatsonSearchSerializer
 
@@ -83,10 +238,34 @@ class SearchViewSet(ExceptionMixin, ReadOnlyModelViewSet):
         if not query and len(types) == 0:
             return []
 
+        key = search_cache_key(query, types, exclude)
+        hits = cache.get(key)
+
+        near = self.request.GET.get('near')
+
+        queryset = None
+        if hits is None:
+            results = self.search(query, types, exclude)
+            hits = get_hits(results)
+            if len(hits) <= SEARCH_CACHE_MAX_HITS:
+                cache.set(key, hits, SEARCH_CACHE_TIMEOUT)
+            else:
+                hits = hits[:SEARCH_CACHE_MAX_HITS]
+                queryset = results
+
+        if near:
+            # Only the top hits are reranked, the hits beyond the hit list
+            # keep the order of the queryset.
+            hits = rerank_near(hits, *parse_near(near))
+
+        return RankedSearchResults(hits, queryset)
+
+    def search(self, query, types, exclude):
+        """Return a queryset of search entries, ordered by ranking."""
         models = build_model_list(types)
 
         if not models:
-            return []
+            return SearchEntry.objects.none()
 
         # If `search` is called with a queryset instead of just the model,
         # authorisation is obeyed. Search results are instances of
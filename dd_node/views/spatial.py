@@ -8,13 +8,35 @@ from __future__ import unicode_literals
 
 import logging
 
+from django.http import Http404
+from django.http import HttpRequest
+from django.http import QueryDict
+from django.http import StreamingHttpResponse
+from rest_framework.decorators import detail_route
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.reverse import reverse
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 
+from dd_node.clusters import get_location_clusters
 from dd_node.filters import LocationFilter
+from dd_node.geojson import stream_location_features
 from dd_node.mixins import ExceptionMixin
 from dd_node.mixins import MultiSerializerViewSetMixin
 from dd_node.models import Location
+from dd_node.renderers import GeoJSONRenderer
+from dd_node.renderers import MVTRenderer
 from dd_node.serializers import spatial as serializers
+from dd_node.serializers.temporal import parse_datetime_param
+from dd_node.simplification import prefetch_simplified_geometries
+from dd_node.tasks import export_locations
+from dd_node.tiles import get_location_tile
+from dd_node.utils.tiles import is_valid_tile
+from dd_node.views.async import is_async
+from dd_node.views.async import start_task
+from dd_node.views.generic import parse_geometry_params
 
 logger = logging.getLogger(__name__)
 
@@ -38,10 +60,37 @@ class LocationViewSet(ExceptionMixin,
         *Optional* one of ``True`` or ``False`` to select or omit objects
         without geometry respectively.
 
+    cluster
+        *Optional* zoom level at which to return clusters of locations
+        instead of locations. Clusters have a ``count``, ``centroid`` and
+        ``bbox``. Only ``in_bbox`` is applied to clusters, other filters
+        are ignored. Clusters are not paginated.
+
+    simplify
+        *Optional* zoom level at which the geometries are displayed. Long
+        linestrings and polygons are simplified to about a pixel at that
+        zoom level.
+
+    srid
+        *Optional* SRID to reproject the geometries to, e.g. ``28992`` for
+        RD New. Defaults to WGS84 (``4326``).
+
+    format
+        *Optional* ``geojson`` to return all matching locations as a GeoJSON
+        FeatureCollection, which is streamed and not paginated. Features have
+        properties ``url``, ``id``, ``uuid``, ``name`` and ``code``.
+
+    async
+        *Optional* ``true`` to export all matching locations to a GeoJSON
+        file in a background task. Redirects to the task, which links to the
+        file when done.
+
     **Ordering:** field ``name`` can be used for ordering.
 
     """
     model = Location
+    renderer_classes = (
+        tuple(api_settings.DEFAULT_RENDERER_CLASSES) + (GeoJSONRenderer, ))
     lookup_field = 'uuid'
     filter_class = LocationFilter
     bbox_filter_field = 'geometry'
@@ -57,4 +106,113 @@ class LocationViewSet(ExceptionMixin,
     }
 
     def get_queryset(self):
-        return Location.objects.all().select_related('organisation')
+        queryset = Location.objects.all().select_related('organisation')
+        params = self.request.query_params
+        level, srid = parse_geometry_params(params)
+        return prefetch_simplified_geometries(
+            queryset, level, 'simplified_geometries', srid)
+
+    def list(self, request, *args, **kwargs):
+        if 'cluster' in request.query_params:
+            return self.list_clusters(request)
+        if is_async(request):
+            return self.export_geojson(request)
+        if request.accepted_renderer.format == GeoJSONRenderer.format:
+            return self.list_geojson(request)
+        return super(LocationViewSet, self).list(request, *args, **kwargs)
+
+    def _feature_url_parts(self, request):
+        """Return the parts of a location url before and after its uuid."""
+        placeholder = '00000000-0000-0000-0000-000000000000'
+        url = reverse('locations-detail', args=[placeholder], request=request)
+        url_prefix, url_suffix = url.split('?')[0].split(placeholder)
+        return url_prefix, url_suffix
+
+    def list_geojson(self, request):
+        """Stream the filtered locations as a GeoJSON FeatureCollection."""
+        queryset = self.filter_queryset(self.get_queryset())
+        url_prefix, url_suffix = self._feature_url_parts(request)
+        _, srid = parse_geometry_params(request.query_params)
+        return StreamingHttpResponse(
+            stream_location_features(queryset, url_prefix, url_suffix, srid),
+            content_type=GeoJSONRenderer.media_type,
+        )
+
+    def export_geojson(self, request):
+        """Export the filtered locations to GeoJSON in a Celery task.
+
+        The task filters and orders the locations itself, with the query
+        parameters of the request, see `filter_locations`.
+
+        """
+        url_prefix, url_suffix = self._feature_url_parts(request)
+        _, srid = parse_geometry_params(request.query_params)
+        return start_task(
+            request, export_locations, request.query_params.urlencode(),
+            url_prefix, url_suffix, srid)
+
+    @detail_route(methods=['get'])
+    def timeseries(self, request, uuid=None):
+        """Return the events of all timeseries of a location on a single
+        time axis.
+
+        The response has a column of timestamps (ms) and a column of values
+        per timeseries, with null where a timeseries has no event. Events
+        can be limited by ``start`` and ``end``.
+
+        """
+        location = self.get_object()
+        params = request.query_params
+        start = parse_datetime_param(params.get('start'), 'timestamp')
+        end = parse_datetime_param(params.get('end'), 'timestamp')
+        return Response(location.get_timeseries(start=start, end=end))
+
+    def list_clusters(self, request):
+        """Return the precomputed clusters at a zoom level."""
+        zoom = int(request.query_params['cluster'])
+        bbox = request.query_params.get('in_bbox')
+        extent = parse_bbox(bbox) if bbox else None
+        clusters = get_location_clusters(zoom, extent)
+        serializer = serializers.LocationClusterSerializer(clusters, many=True)
+        return Response(serializer.data)
+
+
+def filter_locations(query_string):
+    """Return the locations of a list request with a query string.
+
+    All filters and the ordering of `LocationViewSet` are applied, e.g. in
+    a task that runs outside of the request.
+
+    """
+    request = HttpRequest()
+    request.GET = QueryDict(query_string)
+    view = LocationViewSet(
+        request=Request(request), action='list', format_kwarg=None)
+    return view.filter_queryset(view.get_queryset())
+
+
+def parse_bbox(bbox):
+    """Return (xmin, ymin, xmax, ymax) from e.g. `?in_bbox=4,51,6,53`."""
+    try:
+        x1, y1, x2, y2 = [float(x) for x in bbox.split(',')]
+    except ValueError:
+        raise ValueError("Invalid bbox parameter: {}.".format(bbox))
+    return min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)
+
+
+class LocationTile(ExceptionMixin, APIView):
+    """Mapbox Vector Tile of locations.
+
+    * Example: `</api/locations/tiles/8/131/84.mvt>`_
+
+    Features have attributes ``uuid``, ``code``, ``name``,
+    ``timeseries_count``, ``last_value`` and ``last_value_timestamp``.
+
+    """
+    renderer_classes = (MVTRenderer, )
+
+    def get(self, request, z, x, y):
+        z, x, y = int(z), int(x), int(y)
+        if not is_valid_tile(z, x, y):
+            raise Http404("Tile does not exist.")
+        return Response(get_location_tile(z, x, y))
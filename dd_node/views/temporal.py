@@ -15,25 +15,47 @@ from django.http import HttpResponse
 from django.utils.text import slugify
 
 from rest_framework.exceptions import MethodNotAllowed
+from rest_framework.exceptions import ParseError
 from rest_framework.mixins import CreateModelMixin
 from rest_framework.parsers import FormParser, JSONParser
 from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
 from rest_framework.response import Response
 from rest_framework.reverse import reverse
+from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 
+from dd_node.blobstore import serve_blob
+from dd_node.blobstore import serve_file
+from dd_node.exports import check_exportable
+from dd_node.fields import file_event_url
 from dd_node.filters import TimeseriesFilter
 from dd_node.mixins import ExceptionMixin
 from dd_node.mixins import MultiSerializerViewSetMixin
 from dd_node.models import Timeseries, TimeseriesType
 from dd_node.parsers import CSVParser
 from dd_node.parsers import MultiPartCSVParser
-from dd_node.parsers import SimpleFileUploadParser
+from dd_node.parsers import StreamingFileUploadParser
+from dd_node.renderers import NetCDFRenderer
+from dd_node.renderers import TimeseriesFileRenderer
+from dd_node.renderers import XLSXRenderer
 from dd_node.serializers import temporal as serializers
+from dd_node.serializers.temporal import check_array_params
 from dd_node.serializers.temporal import parse_datetime_param
+from dd_node.serializers.temporal import parse_max_flag_param
+from dd_node.serializers.temporal import parse_positions_param
+from dd_node.serializers.temporal import parse_unvalidated_param
+from dd_node.thumbnails import THUMBNAIL_CONTENT_TYPE
+from dd_node.thumbnails import get_thumbnail
+from dd_node.thumbnails import parse_size_param
+from dd_node.simplification import prefetch_simplified_geometries
+from dd_node.tasks import export_timeseries
+from dd_node.utils.conversion import datetime_to_milliseconds as ms
 from dd_node.utils.conversion import is_uuid
+from dd_node.views.async import is_async
+from dd_node.views.async import start_task
 from dd_node.views.generic import add_filename_to_response
+from dd_node.views.generic import parse_geometry_params
 
 logger = logging.getLogger(__name__)
 
@@ -69,6 +91,21 @@ class TimeseriesViewSet(
         , ``hour``, ``day``, ``week``, ``month``, ``year``. Takes precedence
         over ``min_points``.
 
+    positions
+        *Optional* range of positions of ``float array`` timeseries, e.g.
+        ``100:250``, when used in combination with ``start`` and ``end``.
+        Half-open, like a Python slice.
+
+    max_flag
+        *Optional* maximum quality flag of the events of ``float array``
+        timeseries, e.g. ``0`` for reliable events only. Events that have not
+        been validated (flag ``-1``) are left out, unless ``unvalidated`` is
+        ``true``.
+
+    unvalidated
+        *Optional* ``true`` to include the events that have not been
+        validated with ``max_flag``.
+
     name
         *Optional* text filter on ``name``
 
@@ -85,6 +122,10 @@ class TimeseriesViewSet(
         *Optional* case insensitive partial search on timeseries ``name`` and
         location ``name``.
 
+    simplify
+        *Optional* zoom level at which the location geometries are displayed,
+        see `Locations`_.
+
     **Ordering:** fields ``name`` and ``last_modified`` can be used for
     ordering.
 
@@ -113,7 +154,11 @@ class TimeseriesViewSet(
     }
 
     def get_queryset(self):
-        return Timeseries.objects.all()
+        queryset = Timeseries.objects.all()
+        params = self.request.query_params
+        level, srid = parse_geometry_params(params)
+        return prefetch_simplified_geometries(
+            queryset, level, 'location__simplified_geometries', srid)
 
     def filter_queryset(self, queryset):
         result = (super(TimeseriesViewSet, self)
@@ -123,12 +168,48 @@ class TimeseriesViewSet(
         return result
 
 
+def export_response(request, uuids, start, end):
+    """Start an export of the events of timeseries to CSV.
+
+    See `dd_node.tasks.export_timeseries`. Exports of timeseries whose
+    events cannot be exported are refused up front.
+
+    """
+    try:
+        check_exportable(Timeseries.objects.filter(uuid__in=uuids))
+    except ValueError as e:
+        raise ParseError('{}'.format(e))
+    return start_task(
+        request, export_timeseries, uuids,
+        parse_datetime_param(start, 'timestamp'),
+        parse_datetime_param(end, 'timestamp'))
+
+
+def file_response(request, uuids, start, end, filename):
+    """Return the events of timeseries as a file of the accepted renderer.
+
+    See `dd_node.renderers.TimeseriesFileRenderer`.
+
+    """
+    timeseries = {
+        str(ts.uuid): ts for ts in Timeseries.objects.filter(
+            uuid__in=uuids).select_related('location', 'observation_type')
+    }
+    response = request.accepted_renderer.response(
+        [timeseries[uuid] for uuid in uuids if uuid in timeseries],
+        parse_datetime_param(start, 'timestamp'),
+        parse_datetime_param(end, 'timestamp'))
+    add_filename_to_response(response, request, filename)
+    return response
+
+
 class MultiTimeseriesDataList(ExceptionMixin, APIView):
     """
     Used to read data from / write data to multiple time series at once.
     """
     parser_classes = JSONParser, FormParser, CSVParser, MultiPartCSVParser
-    renderer_classes = (JSONRenderer, BrowsableAPIRenderer)
+    renderer_classes = (
+        JSONRenderer, BrowsableAPIRenderer, NetCDFRenderer, XLSXRenderer)
 
     def get(self, request):
         # The `uuid` query parameter represents the UUID of a single time
@@ -142,6 +223,11 @@ class MultiTimeseriesDataList(ExceptionMixin, APIView):
 
         if not uuids or start is None or end is None:
             raise ValueError("Invalid request parameters.")
+        if is_async(request):
+            return export_response(request, uuids, start, end)
+        if isinstance(request.accepted_renderer, TimeseriesFileRenderer):
+            return file_response(
+                request, uuids, start, end, "multi_timeseries")
         data = {'uuids': uuids, 'start': start, 'end': end}
         response = Response(data)
         if request.accepted_renderer.format not in DEFAULT_CONTENT_RENDERERS:
@@ -153,7 +239,8 @@ class TimeseriesDataList(ExceptionMixin, CreateModelMixin, APIView):
     """
     Used to read data from / write data to a timeseries in json or csv format.
     """
-    renderer_classes = (JSONRenderer, BrowsableAPIRenderer)
+    renderer_classes = (
+        JSONRenderer, BrowsableAPIRenderer, NetCDFRenderer, XLSXRenderer)
 
     def get(self, request, uuid=None):
         """
@@ -161,10 +248,26 @@ class TimeseriesDataList(ExceptionMixin, CreateModelMixin, APIView):
 
         * start: not-specified or a timestamp or datetime;
         * end: not-specified or a timestamp or datetime;
-        * format: not-specified or 'csv';
-        * combine_with: not-specified or a timeseries UUID.
+        * format: not-specified, 'csv', 'netcdf' or 'xlsx';
+        * combine_with: not-specified or a timeseries UUID;
+        * positions: not-specified or a range of positions (e.g. 100:250)
+          of a float array timeseries;
+        * max_flag: not-specified or the maximum quality flag of the events
+          of a float array timeseries (e.g. 0 for reliable events);
+        * unvalidated: not-specified or 'true', to include the events that
+          have not been validated with max_flag;
+        * window: not-specified, an aggregation window or, for a float array
+          timeseries, only 'flag' for aggregates per quality flag;
+        * fields, min_points: not for a float array timeseries;
+        * async: not-specified or 'true', to export the events to CSV in a
+          background task. Redirects to the task, which links to the file
+          when done.
+        * size: not-specified or a thumbnail size, to link to thumbnails of
+          the images of an image timeseries.
         """
         ts = Timeseries.objects.get(uuid=uuid)
+        # A younger request for the same timeseries aborts this one.
+        ts.lock()
 
         # grab GET parameters
         params = request.query_params
@@ -177,16 +280,37 @@ class TimeseriesDataList(ExceptionMixin, CreateModelMixin, APIView):
         points = long(params['min_points']) if 'min_points' in params else None
         fields = params.getlist('fields')
 
-        if ts.is_file:
-            events = ts.get_events(start=start, end=end)
+        if is_async(request):
+            return export_response(
+                request, [str(ts.uuid)], params.get('start'),
+                params.get('end'))
+
+        if isinstance(request.accepted_renderer, TimeseriesFileRenderer):
+            return file_response(
+                request, [str(ts.uuid)], params.get('start'),
+                params.get('end'), "{} - {}".format(
+                    slugify(ts.location.name), slugify(ts.name)))
+        elif ts.is_file:
+            events = ts.get_file_events(start=start, end=end)
             data = [{
                 'timestamp': event['timestamp'],
-                'url': reverse(
-                    'timeseries-data-detail',
-                    args=[ts.uuid, event['timestamp']],
-                    request=request),
+                'url': file_event_url(ts, event['timestamp'], request),
             } for event in events]
             filename = None
+        elif ts.value_type == Timeseries.ValueType.FLOAT_ARRAY:
+            check_array_params(params)
+            filename = "{} - {}".format(
+                slugify(ts.location.name), slugify(ts.name))
+            get_array_data = (ts.get_array_aggregates if window == 'flag'
+                              else ts.get_array_events)
+            data = get_array_data(
+                start=start,
+                end=end,
+                positions=parse_positions_param(params.get('positions')),
+                max_flag=parse_max_flag_param(params.get('max_flag')),
+                unvalidated=parse_unvalidated_param(
+                    params.get('unvalidated')),
+            )
         else:
             filename = "{} - {}".format(
                 slugify(ts.location.name), slugify(ts.name))
@@ -209,9 +333,15 @@ class TimeseriesDataDetail(ExceptionMixin, APIView):
     Get a single data point of a timeseries.
 
     This only works / makes sense for timeseries that look like fileseries.
+
+    Files in the blob store are streamed, with support for HTTP byte ranges,
+    or sent by the web server, see `dd_node.blobstore`.
+
+    Thumbnails of images in the blob store can be requested with ``size``,
+    one of 64, 128, 256 or 512 pixels by default.
     """
 
-    parser_classes = (SimpleFileUploadParser, )
+    parser_classes = (StreamingFileUploadParser, )
 
     def get(self, request, uuid=None, dt=None):
         ts = Timeseries.objects.get(uuid=uuid)
@@ -219,20 +349,49 @@ class TimeseriesDataDetail(ExceptionMixin, APIView):
             raise MethodNotAllowed(
                 "Cannot GET single event detail of non-file timeseries.")
         timestamp = serializers.parse_datetime_param(dt)
-        (file_data, file_mime, file_size) = ts.get_file(timestamp)
-        response = HttpResponse(file_data, content_type=file_mime)
-        if file_mime is not None:
-            response['Content-Type'] = file_mime
+        ref = ts.file_events.get(ms(timestamp))
+        size = parse_size_param(request.query_params.get('size'))
+        if ref is not None and size is not None and \
+                ts.value_type == Timeseries.ValueType.IMAGE:
+            file_mime = THUMBNAIL_CONTENT_TYPE
+            response = serve_file(
+                request, get_thumbnail(ref['digest'], size), file_mime,
+                '{}.{}'.format(ref['digest'], size))
+        elif ref is not None:
+            file_mime = ref['content_type']
+            response = serve_blob(request, ref['digest'], file_mime)
+        else:
+            (file_data, file_mime, file_size) = ts.get_file(timestamp)
+            response = HttpResponse(file_data, content_type=file_mime)
+            if file_mime is not None:
+                response['Content-Type'] = file_mime
+            if (file_size > 0):
+                response['Content-Length'] = file_size
         if (ts.value_type == Timeseries.ValueType.FILE):
-            file_ext = mimetypes.guess_extension(file_mime)
+            # Refs of files stored without a content type have None.
+            file_ext = (file_mime and mimetypes.guess_extension(file_mime)
+                        or '')
             file_name = "{!s}-{!s}{!s}".format(ts.uuid, dt, file_ext)
             response['Content-Disposition'] = 'attachment; filename={}'.format(
                 file_name)
             response.filename = file_name
-        if (file_size > 0):
-            response['Content-Length'] = file_size
         return response
 
+    def post(self, request, uuid=None, dt=None):
+        """Store the file of the event at dt."""
+        ts = Timeseries.objects.get(uuid=uuid)
+        if not ts.is_file:
+            raise MethodNotAllowed(
+                "Cannot POST single event detail of non-file timeseries.")
+        timestamp = serializers.parse_datetime_param(dt, 'timestamp')
+        ts.set_file(timestamp, request.FILES['file'], request.content_type)
+        url = reverse(
+            'timeseries-data-detail', args=[ts.uuid, timestamp],
+            request=request)
+        return Response(
+            {'timestamp': timestamp, 'url': url},
+            status=status.HTTP_201_CREATED)
+
 
 class TimeseriesTypeViewset(ExceptionMixin, ModelViewSet):
     model = TimeseriesType
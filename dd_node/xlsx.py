@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+# (c) Nelen & Schuurmans, see LICENSE.rst.
+
+"""Export of timeseries to Excel spreadsheets.
+
+Rows are written with openpyxl's write-only mode, which streams them to
+disk, so memory use does not depend on the number of rows. The first column
+has the datetime (UTC) and every timeseries has a column, or a column per
+position for a float array timeseries. The events of several timeseries are
+merged by timestamp on the fly, a chunk at a time.
+
+A sheet holds at most MAX_ROWS rows, Excel's limit; further rows continue on
+the next sheet, which repeats the header. Timeseries that need more than
+MAX_COLUMNS columns, Excel's other limit, can not be written.
+
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import heapq
+import logging
+import math
+
+from openpyxl import Workbook
+
+from dd_node.exports import iter_event_rows
+from dd_node.utils.conversion import timestamp_ms_as_datetime
+
+logger = logging.getLogger(__name__)
+
+XLSX_CONTENT_TYPE = (
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+MAX_ROWS = 1048576  # per sheet, including the header
+MAX_COLUMNS = 16384  # per sheet, including the datetime
+
+
+def _widths(timeseries, start=None, end=None):
+    """Return the number of columns of every timeseries.
+
+    That is the number of positions of the stored events of a float array
+    timeseries within start, end, and 1 for other timeseries.
+
+    """
+    return [ts.array_store.width(start, end)
+            if ts.value_type == ts.ValueType.FLOAT_ARRAY else 1
+            for ts in timeseries]
+
+
+def column_count(timeseries, start=None, end=None):
+    """Return the number of columns of the events of timeseries."""
+    return 1 + sum(_widths(timeseries, start, end))
+
+
+def _header(timeseries, widths):
+    header = ["datetime (UTC)"]
+    for ts, width in zip(timeseries, widths):
+        name = "{} - {}".format(ts.location.name, ts.name)
+        if ts.unit:
+            name += " [{}]".format(ts.unit)
+        if width == 1:
+            header.append(name)
+        else:
+            header.extend("{} ({})".format(name, position)
+                          for position in range(width))
+    return header
+
+
+def _cell(value):
+    # Excel has no NaN.
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def iter_merged_rows(timeseries, start=None, end=None, widths=None):
+    """Yield rows of the events of timeseries, merged by timestamp.
+
+    Args:
+      timeseries (list): Timeseries, in the order of the columns
+      start (int): optional start in ms, inclusive
+      end (int): optional end in ms, inclusive
+      widths (list): optional number of columns of every timeseries, by
+        default that of the stored events
+
+    Yields:
+      (timestamp in ms, list of values), with a value per column and None
+      for timeseries without an event at the timestamp
+
+    """
+    if widths is None:
+        widths = _widths(timeseries, start, end)
+    offsets = [sum(widths[:index]) for index in range(len(widths))]
+
+    def events(index, ts):
+        for chunk in iter_event_rows(ts, start, end):
+            for timestamp, values in chunk:
+                yield timestamp, index, values
+
+    row_timestamp, row = None, None
+    for timestamp, index, values in heapq.merge(
+            *[events(index, ts) for index, ts in enumerate(timeseries)]):
+        if timestamp != row_timestamp:
+            if row is not None:
+                yield row_timestamp, row
+            row_timestamp, row = timestamp, [None] * sum(widths)
+        offset = offsets[index]
+        values = values[:widths[index]]
+        row[offset:offset + len(values)] = values
+    if row is not None:
+        yield row_timestamp, row
+
+
+def write_timeseries_xlsx(path, timeseries, start=None, end=None):
+    """Write the events of timeseries to an Excel spreadsheet.
+
+    Args:
+      path (str): path of the file
+      timeseries: iterable of Timeseries
+      start (int): optional start in ms, inclusive
+      end (int): optional end in ms, inclusive
+
+    Returns:
+      number of rows written, without headers
+
+    Raises:
+      ValueError: if the timeseries need more than MAX_COLUMNS columns.
+
+    """
+    timeseries = list(timeseries)
+    widths = _widths(timeseries, start, end)
+    columns = 1 + sum(widths)
+    if columns > MAX_COLUMNS:
+        raise ValueError("Expected at most {} columns, got {}.".format(
+            MAX_COLUMNS, columns))
+    header = _header(timeseries, widths)
+
+    workbook = Workbook(write_only=True)
+    sheet, sheet_rows = None, MAX_ROWS
+
+    rows = 0
+    for timestamp, values in iter_merged_rows(
+            timeseries, start, end, widths):
+        if sheet_rows == MAX_ROWS:
+            sheet = workbook.create_sheet()
+            sheet.append(header)
+            sheet_rows = 1
+        sheet.append([timestamp_ms_as_datetime(timestamp)] +
+                     [_cell(value) for value in values])
+        sheet_rows += 1
+        rows += 1
+
+    if sheet is None:
+        workbook.create_sheet().append(header)
+
+    workbook.save(path)
+    return rows
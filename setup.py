@@ -16,6 +16,7 @@ install_requires = [
     'Django',
     'Jinja2',
     'Markdown',
+    'Pillow',
     'Werkzeug',
     'ciso8601',
     'configparser',
@@ -38,8 +39,11 @@ install_requires = [
     'gevent',
     'gunicorn',
     'hiredis',  # C implementation
+    'netCDF4',
+    'numpy',
     'python-magic',
     'pandas',
+    'pyarrow',
     'pyproj',
     'python-logstash',
     'python-mimeparse',
@@ -55,6 +59,7 @@ install_requires = [
 ],
 
 tests_require = [
+    'mock',
 ]
 
 setup(name='dd-node',